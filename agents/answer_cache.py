@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """In-memory cache of retrieval answers matched by question similarity.
+
+    A lookup hits when the cosine similarity between the incoming question
+    embedding and a stored one reaches `threshold`, the entry is younger than
+    `ttl_seconds` and it was produced against the same index version.
+    Least recently used entries are evicted beyond `max_entries`; with
+    max_entries <= 0 the cache is disabled.
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl_seconds: float = 3600, max_entries: int = 1000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None  # one normalized question vector per slot
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()  # slot -> (result, created_at, version)
+        self._free = list(range(max_entries - 1, -1, -1))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm else v
+
+    def lookup(self, vector, version: str = "") -> Optional[Dict]:
+        """Return the cached result for the closest matching question, if any."""
+        with self._lock:
+            if not self._entries:
+                return None
+            slots = np.fromiter(self._entries.keys(), dtype=np.int64, count=len(self._entries))
+            sims = self._matrix[slots] @ self._normalize(vector)
+            now = time.time()
+            # Closest first; stale entries met on the way are evicted
+            for i in np.argsort(-sims, kind="stable"):
+                if sims[i] < self.threshold:
+                    return None
+                slot = int(slots[i])
+                result, created_at, entry_version = self._entries[slot]
+                if entry_version != version or now - created_at > self.ttl_seconds:
+                    del self._entries[slot]
+                    self._free.append(slot)
+                    continue
+                self._entries.move_to_end(slot)
+                return result
+            return None
+
+    def store(self, vector, result: Dict, version: str = "") -> None:
+        if not self.enabled:
+            return
+        v = self._normalize(vector)
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, v.shape[0]), dtype=np.float32)
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot, _ = self._entries.popitem(last=False)
+            self._matrix[slot] = v
+            self._entries[slot] = (result, time.time(), version)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._free = list(range(self.max_entries - 1, -1, -1))
+
+    def __len__(self) -> int:
+        return len(self._entries)
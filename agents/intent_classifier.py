@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_SECTION_RE = re.compile(r"Examples of (\w+)\s*:", re.IGNORECASE)
+_EXAMPLE_RE = re.compile(r'^\s*-\s*"?(.+?)"?\s*$')
+
+
+def examples_from_prompt(prompt: str) -> List[Tuple[str, str]]:
+    """Extract the labelled examples ("Examples of RETRIEVAL:" ...) from a classifier prompt."""
+    examples: List[Tuple[str, str]] = []
+    intent = None
+    for line in prompt.splitlines():
+        section = _SECTION_RE.search(line)
+        if section:
+            intent = section.group(1).lower()
+            continue
+        if intent is None:
+            continue
+        m = _EXAMPLE_RE.match(line)
+        if m:
+            examples.append((m.group(1).strip(), intent))
+        elif line.strip():
+            intent = None
+    return examples
+
+
+def load_examples(path: str) -> List[Tuple[str, str]]:
+    """Read {"text", "intent"} JSON lines; a missing file means no extra examples."""
+    examples: List[Tuple[str, str]] = []
+    if not path or not os.path.exists(path):
+        return examples
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+                examples.append((row["text"], row["intent"]))
+            except (ValueError, KeyError) as e:
+                logging.warning(f"[IntentClassifier] Skipping bad example line in {path}: {e}")
+    return examples
+
+
+class IntentClassifier:
+    """Nearest-centroid intent classifier over sentence embeddings.
+
+    Each intent's centroid is the mean of its example embeddings. A query is
+    assigned to the closest centroid; the confidence is the cosine margin over
+    the runner-up, and callers should fall back to the LLM below min_margin.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], list],
+        examples: Iterable[Tuple[str, str]],
+        examples_path: Optional[str] = None,
+        min_margin: float = 0.05,
+    ):
+        self.embed_fn = embed_fn
+        self.examples_path = examples_path
+        self.min_margin = min_margin
+        self._examples = list(examples) + load_examples(examples_path)
+        self._lock = threading.Lock()
+        self._sums: Dict[str, np.ndarray] = {}
+        self._counts: Dict[str, int] = {}
+        self._centroids: Optional[Tuple[List[str], np.ndarray]] = None
+
+    @staticmethod
+    def _unit(v) -> np.ndarray:
+        v = np.asarray(v, dtype=np.float32)
+        n = float(np.linalg.norm(v))
+        return v / n if n else v
+
+    def _ensure_centroids(self):
+        if self._centroids is not None:
+            return
+        with self._lock:
+            if self._centroids is not None:
+                return
+            vectors = self.embed_fn([text for text, _ in self._examples]) if self._examples else []
+            for (_, intent), vec in zip(self._examples, vectors):
+                self._accumulate(intent, vec)
+            self._refresh()
+
+    def _accumulate(self, intent: str, vec):
+        v = self._unit(vec)
+        if intent in self._sums:
+            self._sums[intent] = self._sums[intent] + v
+        else:
+            self._sums[intent] = v
+        self._counts[intent] = self._counts.get(intent, 0) + 1
+
+    def _refresh(self):
+        labels = sorted(self._sums)
+        matrix = np.stack([self._unit(self._sums[label]) for label in labels]) if labels else np.zeros((0, 0), np.float32)
+        self._centroids = (labels, matrix)
+
+    def classify(self, text: str) -> Tuple[Optional[str], float]:
+        """Return (intent, margin); intent is None when the margin is below min_margin."""
+        self._ensure_centroids()
+        labels, matrix = self._centroids
+        if len(labels) < 2:
+            return None, 0.0
+        sims = matrix @ self._unit(self.embed_fn([text])[0])
+        order = np.argsort(-sims)
+        margin = float(sims[order[0]] - sims[order[1]])
+        intent = labels[int(order[0])]
+        return (intent if margin >= self.min_margin else None), margin
+
+    def add_example(self, text: str, intent: str, persist: bool = True) -> None:
+        """Add a labelled example, updating its centroid and the examples file."""
+        self._ensure_centroids()
+        vec = self.embed_fn([text])[0]
+        with self._lock:
+            self._examples.append((text, intent))
+            self._accumulate(intent, vec)
+            self._refresh()
+            if persist and self.examples_path:
+                os.makedirs(os.path.dirname(self.examples_path) or ".", exist_ok=True)
+                with open(self.examples_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"text": text, "intent": intent}, ensure_ascii=False) + "\n")
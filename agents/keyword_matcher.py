@@ -0,0 +1,97 @@
+import json
+import unicodedata
+from collections import deque
+from typing import Dict, List, Set, Tuple, Union
+
+# How a phrase must sit in the text: anywhere, at the start of a word, or as a whole word
+MATCH_MODES = ("substring", "prefix", "word")
+
+Phrase = Union[str, Dict[str, str]]
+
+
+def normalize(text: str) -> str:
+    """Casefold and strip accents so "Quel"/"quel" and "Téléphone"/"telephone" compare equal."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+class KeywordMatcher:
+    """Multi-pattern matcher returning every rule category found in a text.
+
+    All phrases are compiled into one Aho-Corasick automaton, so a text is
+    scanned once whatever the number of phrases. Rules map a category to
+    {"match": mode, "phrases": [...]}, where a phrase is a string or
+    {"phrase": ..., "match": ...} to override the category's mode.
+    """
+
+    def __init__(self, rules: Dict[str, Dict]):
+        self.categories = sorted(rules)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # state -> [(category, phrase length, phrase starts with alnum, ends with alnum, mode)]
+        self._out: List[List[Tuple[str, int, bool, bool, str]]] = [[]]
+        for category, rule in rules.items():
+            default_mode = rule.get("match", "substring")
+            for phrase in rule.get("phrases", []):
+                self._add(category, phrase, default_mode)
+        self._build_failure_links()
+
+    @classmethod
+    def from_file(cls, path: str) -> "KeywordMatcher":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _add(self, category: str, phrase: Phrase, default_mode: str):
+        if isinstance(phrase, dict):
+            text, mode = phrase["phrase"], phrase.get("match", default_mode)
+        else:
+            text, mode = phrase, default_mode
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode {mode!r} for phrase {text!r}")
+        text = normalize(text)
+        if not text:
+            return
+        state = 0
+        for ch in text:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((category, len(text), text[0].isalnum(), text[-1].isalnum(), mode))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0) if self._goto[f].get(ch, 0) != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def match(self, text: str) -> Set[str]:
+        """Return the set of categories with at least one phrase in text (single pass)."""
+        text = normalize(text)
+        found: Set[str] = set()
+        state = 0
+        n = len(text)
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for category, length, alnum_start, alnum_end, mode in self._out[state]:
+                if category in found:
+                    continue
+                start = i - length + 1
+                if mode != "substring" and alnum_start and start > 0 and text[start - 1].isalnum():
+                    continue
+                if mode == "word" and alnum_end and i + 1 < n and text[i + 1].isalnum():
+                    continue
+                found.add(category)
+        return found
@@ -1,7 +1,12 @@
 import json
 import re
 import logging
-from typing import Dict
+import os
+from functools import lru_cache
+from typing import Dict, Optional, Set
+
+from agents.intent_classifier import IntentClassifier
+from agents.keyword_matcher import KeywordMatcher
 
 logging.basicConfig(level=logging.INFO)
 
@@ -33,19 +38,47 @@ OR
 Do NOT add explanations, notes, or any other text."""
 
 
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "configs", "routing_rules.json")
+
+
+@lru_cache(maxsize=None)
+def default_matcher(path: str = "") -> KeywordMatcher:
+    """Compile the routing rules once per process (ROUTING_RULES_PATH or the bundled file)."""
+    return KeywordMatcher.from_file(path or os.getenv("ROUTING_RULES_PATH") or DEFAULT_RULES_PATH)
+
+
 class Orchestrator:
-    def __init__(self, llm_client):
+    def __init__(
+        self,
+        llm_client,
+        classifier: Optional[IntentClassifier] = None,
+        matcher: Optional[KeywordMatcher] = None,
+    ):
         self.llm = llm_client
+        self.classifier = classifier
+        self.matcher = matcher or default_matcher()
 
     def route(self, user_input: str) -> Dict:
         """Route user input to the appropriate agent."""
 
-        # First, try keyword-based routing (fast fallback)
-        intent = self._keyword_route(user_input)
+        # First, try keyword-based routing (fast fallback); one scan serves both passes
+        matches = self.matcher.match(user_input)
+        intent = self._keyword_route(user_input, matches=matches)
         if intent:
             logging.info(f"[Orchestrator] Keyword route: {intent}")
             return {"intent": intent, "notes": "keyword-based"}
 
+        # Then the local embedding classifier; the LLM is only asked when it is unsure
+        if self.classifier is not None:
+            try:
+                intent, margin = self.classifier.classify(user_input)
+                if intent in ("retrieval", "form"):
+                    logging.info(f"[Orchestrator] Classifier route: {intent} (margin {margin:.3f})")
+                    return {"intent": intent, "notes": "classifier"}
+                logging.info(f"[Orchestrator] Classifier unsure (margin {margin:.3f})")
+            except Exception as e:
+                logging.error(f"[Orchestrator] Classifier failed: {e}")
+
         # If no clear keywords, use LLM
         messages = [
             {"role": "system", "content": SYSTEM_PROMPT},
@@ -74,42 +107,32 @@ class Orchestrator:
             logging.error(f"[Orchestrator] LLM call failed: {e}")
 
         # Final fallback to keyword routing
-        fallback_intent = self._keyword_route(user_input, strict=False)
+        fallback_intent = self._keyword_route(user_input, strict=False, matches=matches) or "retrieval"
         logging.info(f"[Orchestrator] Fallback route: {fallback_intent}")
         return {"intent": fallback_intent, "notes": "fallback"}
 
-    def _keyword_route(self, text: str, strict: bool = True) -> str | None:
-        """Simple keyword-based routing as fallback."""
-        text_lower = text.lower()
-
-        # Strong form indicators
-        form_keywords_strong = [
-            "contact me", "call me", "email me", "speak with", "talk to",
-            "reach out", "get in touch", "my email", "my phone", "my number"
-        ]
+    def _keyword_route(self, text: str, strict: bool = True, matches: Optional[Set[str]] = None) -> str | None:
+        """Simple keyword-based routing as fallback.
 
-        # Weak form indicators
-        form_keywords_weak = [
-            "contact", "appel", "téléphone", "rendez-vous", "advisor",
-            "conseiller", "parler", "discuter"
-        ]
+        `matches` are the rule categories found in text; pass them to reuse one scan.
+        """
+        if matches is None:
+            matches = self.matcher.match(text)
 
         # Check strong form keywords
-        if any(kw in text_lower for kw in form_keywords_strong):
+        if "form_strong" in matches:
             return "form"
 
         # Check weak form keywords (only if strict=False)
-        if not strict and any(kw in text_lower for kw in form_keywords_weak):
+        if not strict and "form_weak" in matches:
             # Avoid false positives:  if user asks "How do I contact admissions?" -> retrieval
-            if any(q in text_lower for q in ["comment", "how", "qui", "who", "quel", "what"]):
+            if "question" in matches:
                 return "retrieval"
             return "form"
 
         # Check if likely retrieval (question words)
-        retrieval_indicators = ["? ", "quel", "quand", "comment", "pourquoi", "où",
-                                "what", "when", "how", "why", "where", "who"]
-        if any(ind in text_lower for ind in retrieval_indicators):
+        if "retrieval" in matches:
             return "retrieval"
 
-        # Default
-        return "retrieval" if strict else None
\ No newline at end of file
+        # No clear signal: let the classifier/LLM decide
+        return None
@@ -0,0 +1,149 @@
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from agents.orchestrator import Orchestrator
+from agents.retrieval_agent import RetrievalAgent
+from services import tracing
+
+# Shared by every session: speculative retrievals are short and mostly I/O or
+# ONNX/numpy work that releases the GIL
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _default_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative-retrieval")
+        return _EXECUTOR
+
+
+class StageTimings:
+    """Start/end offsets (seconds since the request started) of each pipeline stage."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.stages: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        return time.perf_counter() - self.t0
+
+    def record(self, stage: str, start: float, end: Optional[float] = None):
+        with self._lock:
+            self.stages[stage] = (start, self.now() if end is None else end)
+
+    def overlap(self, a: str, b: str) -> float:
+        """Seconds during which stages a and b were both running."""
+        if a not in self.stages or b not in self.stages:
+            return 0.0
+        (a0, a1), (b0, b1) = self.stages[a], self.stages[b]
+        return max(0.0, min(a1, b1) - max(a0, b0))
+
+    def wrap_stream(self, stream: Iterable[str], stage: str = "generate") -> Iterator[str]:
+        """Yield from stream, recording the stage and its first item as "<stage>_first"."""
+        start = self.now()
+        first = True
+        try:
+            for piece in stream:
+                if first:
+                    self.record(f"{stage}_first", start)
+                    first = False
+                yield piece
+        finally:
+            self.record(stage, start)
+
+    def summary(self) -> str:
+        parts: List[str] = []
+        for stage, (start, end) in sorted(self.stages.items(), key=lambda kv: kv[1][0]):
+            parts.append(f"{stage} {start * 1000:.0f}–{end * 1000:.0f} ms")
+        hidden = self.overlap("route", "retrieve")
+        if hidden:
+            parts.append(f"overlap {hidden * 1000:.0f} ms")
+        return ", ".join(parts)
+
+
+class ChatPipeline:
+    """Route a message and, for retrieval, prepare the LLM prompt.
+
+    In speculative mode the retrieval (answer cache, vector search, rerank,
+    context assembly) starts on a worker thread while the orchestrator is
+    still routing. Most traffic is retrieval, so routing latency is hidden
+    behind the search; if the route is "form" the prepared result is dropped.
+    """
+
+    def __init__(
+        self,
+        orchestrator: Orchestrator,
+        retrieval: RetrievalAgent,
+        speculative: bool = True,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
+        self.orch = orchestrator
+        self.retrieval = retrieval
+        self.speculative = speculative
+        self._executor = executor
+
+    def _retrieve(self, question: str, timings: StageTimings) -> Dict:
+        start = timings.now()
+        try:
+            with tracing.span("retrieve"):
+                return self.retrieval.prepare(question)
+        finally:
+            timings.record("retrieve", start)
+
+    def run(self, question: str, mode: str = "auto") -> Dict:
+        """Return {"intent", "route", "retrieval", "timings"}.
+
+        "retrieval" is the RetrievalAgent.answer_stream() result for the
+        retrieval intent and None otherwise; "route" is None unless routed.
+        """
+        with tracing.trace("chat", mode=mode, question_chars=len(question)) as span:
+            result = self._run(question, mode)
+            span.set(intent=result["intent"])
+            return result
+
+    def _run(self, question: str, mode: str) -> Dict:
+        timings = StageTimings()
+        if mode != "auto":
+            retrieval = None
+            if mode == "retrieval":
+                retrieval = self.retrieval.stream_prepared(self._retrieve(question, timings))
+            return {"intent": mode, "route": None, "retrieval": retrieval, "timings": timings}
+
+        future = None
+        if self.speculative:
+            # Copy the context so the retrieval's spans join this request's trace
+            future = (self._executor or _default_executor()).submit(
+                contextvars.copy_context().run, self._retrieve, question, timings
+            )
+
+        start = timings.now()
+        try:
+            with tracing.span("route") as span:
+                route = self.orch.route(question)
+                span.set(intent=route.get("intent"), method=route.get("notes"))
+        except Exception:
+            if future is not None:
+                future.cancel()
+            raise
+        timings.record("route", start)
+        intent = route.get("intent", "retrieval")
+
+        if intent != "retrieval":
+            if future is not None and not future.cancel():
+                logging.info(f"[Pipeline] Routed to {intent}, discarding speculative retrieval")
+            return {"intent": intent, "route": route, "retrieval": None, "timings": timings}
+
+        prepared = future.result() if future is not None else self._retrieve(question, timings)
+        return {
+            "intent": intent,
+            "route": route,
+            "retrieval": self.retrieval.stream_prepared(prepared),
+            "timings": timings,
+        }
@@ -1,5 +1,9 @@
-from typing import Dict
+from typing import Dict, Optional
 from rag.vector_store import VectorStore
+from rag.rerank import Reranker
+from rag.context import ContextAssembler
+from agents.answer_cache import SemanticAnswerCache
+from services import tracing
 
 SYSTEM_PROMPT = """You are the ESILV Retrieval Agent. 
 Answer ONLY with information explicitly present in the provided context.
@@ -10,48 +14,67 @@ Do NOT truncate names, abbreviate, or omit information.
 Do NOT include inline citations, URLs, or a 'Source:' line in your answer.
 The UI will add sources separately."""
 
-def _trim(text: str, max_chars: int = 5000) -> str:
-    if text is None:
-        return ""
-    return text if len(text) <= max_chars else text[:max_chars] + "..."
-
 class RetrievalAgent:
-    def __init__(self, vector_store: VectorStore, llm_client):
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        llm_client,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        reranker: Optional[Reranker] = None,
+        n_candidates: int = 12,
+        assembler: Optional[ContextAssembler] = None,
+    ):
         self.vs = vector_store
         self.llm = llm_client
+        self.answer_cache = answer_cache
+        self.reranker = reranker
+        self.n_candidates = n_candidates
+        self.assembler = assembler or ContextAssembler()
 
-    def answer(self, question: str) -> Dict:
-        docs = self.vs.query(question, k=8)
+    def prepare(self, question: str) -> Dict:
+        """Check the answer cache, retrieve passages and build the prompt.
+
+        Returns either {"result": ...} (cache hit or nothing found) or
+        {"messages": ..., "sources": ..., "question_vec": ...}.
+        """
+        question_vec = None
+        if self.answer_cache is not None or self.reranker is not None:
+            question_vec = self.vs.embed([question])[0]
+        if self.answer_cache is not None:
+            cached = self.answer_cache.lookup(question_vec, self.vs.version)
+            tracing.current_span().set(answer_cache="hit" if cached is not None else "miss")
+            if cached is not None:
+                return {"result": {**cached, "cached": True}}
+
+        if self.reranker is not None:
+            # Over-fetch, then let the reranker order them by relevance and diversity
+            docs, doc_vecs = self.vs.query_with_embeddings(question, k=self.n_candidates)
+            if docs:
+                with tracing.span("rerank", candidates=len(docs)):
+                    docs = self.reranker.rerank(question_vec, docs, doc_vecs)
+        else:
+            docs = self.vs.query(question, k=8)
 
         if not docs:
-            return {
+            return {"result": {
                 "answer": "Aucune information pertinente trouvée dans les documents.",
                 "sources": []
-            }
+            }}
 
-        context_parts = []
-        for d in docs:
-            # d is tuple:  (id, text, metadata)
-            doc_id, text, metadata = d
+        with tracing.span("prompt-build", candidates=len(docs)) as span:
+            # Deduplicate and pack the best passages into the model's token budget
+            context, docs = self.assembler.assemble(docs)
 
-            # Handle None or missing metadata
-            if metadata and isinstance(metadata, dict):
-                source = metadata.get('source', 'unknown')
-            else:
-                source = 'unknown'
-
-            context_parts.append(f"[{source}]\n{_trim(text)}")
-
-        context = "\n\n".join(context_parts)
-
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": f"Question: {question}\n\nContext:\n{context}"},
-        ]
-
-        answer = (self.llm.chat(messages) or "").strip()
-        if not answer:
-            answer = "I don't know based on the provided documents."
+            messages = [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": f"Question: {question}\n\nContext:\n{context}"},
+            ]
+            if span.recording:
+                span.set(
+                    passages=len(docs),
+                    context_chars=len(context),
+                    prompt_tokens=sum(self.assembler.count_tokens(m["content"]) for m in messages),
+                )
 
         sources = []
         for d in docs:
@@ -61,4 +84,70 @@ class RetrievalAgent:
             else:
                 sources.append("unknown")
 
-        return {"answer": answer, "sources": sources}
\ No newline at end of file
+        return {"messages": messages, "sources": sources, "question_vec": question_vec}
+
+    def _finish(self, prepared: Dict, answer: str) -> Dict:
+        answer = (answer or "").strip()
+        if not answer:
+            answer = "I don't know based on the provided documents."
+
+        result = {"answer": answer, "sources": prepared["sources"]}
+        if self.answer_cache is not None:
+            self.answer_cache.store(prepared["question_vec"], result, self.vs.version)
+        return result
+
+    def answer(self, question: str) -> Dict:
+        prepared = self.prepare(question)
+        if "result" in prepared:
+            return prepared["result"]
+        with tracing.span("generate") as span:
+            answer = self.llm.chat(prepared["messages"])
+            if span.recording:
+                answer_text = answer or ""
+                span.set(answer_chars=len(answer_text), answer_tokens=self.assembler.count_tokens(answer_text))
+        return self._finish(prepared, answer)
+
+    def answer_stream(self, question: str) -> Dict:
+        """Like answer(), but "stream" yields the answer text as it is generated.
+
+        "sources" is available immediately; the full answer is cached once
+        the stream has been consumed.
+        """
+        return self.stream_prepared(self.prepare(question))
+
+    def stream_prepared(self, prepared: Dict) -> Dict:
+        """answer_stream() for the output of prepare(), e.g. when retrieval ran ahead."""
+        if "result" in prepared:
+            result = prepared["result"]
+            return {**result, "stream": iter([result["answer"]])}
+
+        # Streams are consumed after the request's span has closed: parent explicitly
+        parent = tracing.current_span()
+
+        def _stream():
+            span = tracing.span("generate", parent=parent)
+            pieces = []
+            try:
+                for piece in self.llm.chat_stream(prepared["messages"]):
+                    if not pieces:
+                        span.set(first_chunk_ms=span.elapsed_ms())
+                    pieces.append(piece)
+                    yield piece
+            except GeneratorExit:
+                # The reader stopped early (e.g. the session went away)
+                span.set(cancelled=True, chunks=len(pieces))
+                span.end()
+                raise
+            except BaseException as e:
+                span.end(e)
+                raise
+            answer = "".join(pieces)
+            if span.recording:
+                span.set(chunks=len(pieces), answer_chars=len(answer), answer_tokens=self.assembler.count_tokens(answer))
+            span.end()
+            if not answer.strip():
+                yield self._finish(prepared, "")["answer"]
+            else:
+                self._finish(prepared, answer)
+
+        return {"sources": prepared["sources"], "stream": _stream()}
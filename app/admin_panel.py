@@ -1,10 +1,10 @@
 import os
-import sys
-import subprocess
 import streamlit as st
 from datetime import datetime
 from pathlib import Path
 
+from jobs import INDEX_JOB, SCRAPE_JOB, SUCCEEDED, JobRunner, python_module
+
 def list_docs(docs_dir:  str):
     files = []
     for root, _, filenames in os.walk(docs_dir):
@@ -19,10 +19,44 @@ def get_last_scrape_time():
         return datetime.fromisoformat(SCRAPE_META_FILE.read_text())
     return None
 
-def admin_panel(cfg):
+def scrape_commands(cfg):
+    """Scrape the site (only changed pages are rewritten), then update the index."""
+    rag = cfg["rag"]
+    return [
+        python_module("scraping.scraper", "--raw-dir", rag["scraping_dir"], "--parsed-dir", rag["docs_dir"]),
+        python_module("rag.index_builder", "--docs-dir", rag["docs_dir"], "--index-dir", rag["index_dir"]),
+    ]
+
+def index_commands(cfg):
+    rag = cfg["rag"]
+    return [python_module("rag.index_builder", "--docs-dir", rag["docs_dir"], "--index-dir", rag["index_dir"])]
+
+def _job_status(jobs: JobRunner, kind: str, was_active: bool):
+    job = jobs.latest(kind)
+    if job is None:
+        return
+    if was_active and not job.active:
+        # Finished while we were polling: rerun the whole page to show the result
+        st.rerun()
+    started = datetime.fromtimestamp(job.started_at or job.created_at).strftime('%d/%m/%Y %H:%M:%S')
+    if job.active:
+        st.info(f"{kind}: {job.status} (step {job.step + 1}/{len(job.commands)}, started {started})")
+    elif job.status == SUCCEEDED:
+        st.success(f"{kind}: succeeded ({started}, {job.finished_at - (job.started_at or job.created_at):.0f} s)")
+    else:
+        st.error(f"{kind}: {job.status} ({started}, exit code {job.returncode})")
+    log = jobs.tail(job)
+    if log:
+        st.code(log, language="text")
+
+def job_status(jobs: JobRunner, kind: str):
+    """Show the latest job of this kind; refreshes itself every 2 s while it runs."""
+    active = jobs.active(kind) is not None
+    st.fragment(_job_status, run_every=2 if active else None)(jobs, kind, active)
+
+def admin_panel(cfg, jobs: JobRunner):
     docs_dir = cfg["rag"]["docs_dir"]
     index_dir = cfg["rag"]["index_dir"]
-    scraping_dir = cfg["rag"]["scraping_dir"]
 
     # Button to launch scraping
     st.markdown("### Collect data from the website :")
@@ -31,23 +65,10 @@ def admin_panel(cfg):
         st.caption(f"Last run : {last_scrape.strftime('%d/%m/%Y à %H:%M:%S')}")
         st.caption(f"Time since last scraping: {(st.session_state.app_start_time - last_scrape).days} days.")
     if st.button("Launch collect", key="admin_scraping_btn"):
-        try:
-            py = sys.executable  # ensure same interpreter/venv as Streamlit
-            cmd = [py, "-m", "scraping.scraper", "--raw-dir", scraping_dir, "--parsed-dir", docs_dir]
-            with st.spinner("Collecting data..."):
-                result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode == 0:
-                st.success("Data collected successfully.")
-                # Signal Chat tab to reload the index automatically
-                st.session_state["needs_index_reload"] = True
-                if result.stdout:
-                    st.text(result.stdout)
-            else:
-                st.error("Scraping failed.")
-                st.text(result.stdout or "")
-                st.text(result.stderr or "")
-        except Exception as e:
-            st.error(f"Failed to collect data: {e}")
+        # Runs in the background; chat stays responsive and switches to the new index when done
+        job = jobs.submit(SCRAPE_JOB, *scrape_commands(cfg))
+        st.toast(f"Collect job {job.status}: {job.id}")
+    job_status(jobs, SCRAPE_JOB)
 
     st.markdown("---")
 
@@ -91,44 +112,7 @@ def admin_panel(cfg):
     st.caption(f"Index directory: {index_dir}")
 
     if st.button("Rebuild Index", key="rebuild_btn"):
-        docs_dir = cfg["rag"]["docs_dir"]
-        index_dir = cfg["rag"]["index_dir"]
-
-        st.info("Releasing index and rebuilding...")
-
-        try:
-            # Close and delete all references to the index
-            if "vs" in st.session_state:
-                del st.session_state.vs
-
-            if "retrieval" in st.session_state:
-                del st.session_state.retrieval
-
-            # Force garbage collection
-            import gc
-            gc.collect()
-
-            # Wait for file handles to close
-            import time
-            time.sleep(2)
-
-            st.info("Starting rebuild (this may take up to 30 seconds)...")
-
-            # Run rebuild subprocess
-            py = sys.executable
-            cmd = [py, "-m", "rag.index_builder", "--docs-dir", docs_dir, "--index-dir", index_dir]
-
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-
-            if result.returncode == 0:
-                st.success(" Index rebuild successful!")
-                st.session_state["needs_index_reload"] = True
-                if result.stdout:
-                    st.text(result.stdout)
-            else:
-                st.error(" Index rebuild failed.")
-                st.text(result.stdout or "")
-                st.text(result.stderr or "")
-
-        except Exception as e:
-            st.error(f"Failed to rebuild index: {e}")
\ No newline at end of file
+        # Incremental build in a background job; the new version goes live when it succeeds
+        job = jobs.submit(INDEX_JOB, *index_commands(cfg))
+        st.toast(f"Index job {job.status}: {job.id}")
+    job_status(jobs, INDEX_JOB)
@@ -3,51 +3,30 @@ import streamlit as st
 from dotenv import load_dotenv
 import time
 from datetime import datetime
-import sys
-import subprocess
 
 from configs.config import load_config
-from services.llm import LLMClient, LLMConfig, OllamaClient, VertexClient
-from rag.vector_store import VectorStore
-from agents.orchestrator import Orchestrator
-from agents.retrieval_agent import RetrievalAgent
-from agents.form_agent import FormAgent, Contact
-from admin_panel import admin_panel, get_last_scrape_time  # Admin-only controls
-
-def init_services():
+from services.registry import ServiceRegistry
+from agents.form_agent import Contact
+from admin_panel import admin_panel, get_last_scrape_time, job_status, scrape_commands  # Admin-only controls
+from jobs import SCRAPE_JOB, SUCCEEDED, JobRunner
+
+# Don't re-launch a failed automatic scrape on every page load
+AUTO_SCRAPE_RETRY_SECONDS = 6 * 3600
+
+@st.cache_resource
+def _job_runner(jobs_dir: str) -> JobRunner:
+    # One runner (and queue) per process, shared by every session
+    return JobRunner(jobs_dir)
+
+@st.cache_resource
+def _service_registry(cfg: dict) -> ServiceRegistry:
+    # One index handle, embedding model and LLM connection pool per config for
+    # the whole process; sessions only keep their chat history
+    return ServiceRegistry(cfg)
+
+def _get_registry() -> ServiceRegistry:
     load_dotenv()
-    cfg = load_config()
-    conf = LLMConfig(
-        provider=cfg["llm"]["provider"],
-        ollama_model=cfg["llm"]["ollama_model"],
-        vertex_model=cfg["llm"]["vertex_model"],
-        gcp_project_id=cfg["llm"].get("gcp_project_id"),
-        gcp_location=cfg["llm"].get("gcp_location"),
-    )
-    if conf.provider == "ollama":
-        llm = OllamaClient(conf)
-    elif conf.provider == "vertex":
-        llm = VertexClient(conf)
-    else:
-        llm = LLMClient(conf)
-    vs = VectorStore(cfg["rag"]["index_dir"])
-    return cfg, llm, vs
-
-def _ensure_services():
-    if "cfg" not in st.session_state or "llm" not in st.session_state or "vs" not in st.session_state:
-        cfg, llm, vs = init_services()
-        st.session_state.cfg = cfg
-        st.session_state.llm = llm
-        st.session_state.vs = vs
-        st.session_state.orch = Orchestrator(llm)
-        st.session_state.retrieval = RetrievalAgent(vs, llm)
-        st.session_state.form = FormAgent(llm)
-
-def _reload_index():
-    cfg = st.session_state.cfg
-    st.session_state.vs = VectorStore(cfg["rag"]["index_dir"])
-    st.session_state.retrieval = RetrievalAgent(st.session_state.vs, st.session_state.llm)
-    st.success("Index reloaded in app.")
+    return _service_registry(load_config())
 
 def _sanitize_answer(text: str) -> str:
     if not text:
@@ -60,7 +39,7 @@ def _sanitize_answer(text: str) -> str:
         lines.append(line)
     return "\n".join(lines).strip()
 
-def auto_scraping(docs_dir, scraping_dir):
+def auto_scraping(cfg, jobs: JobRunner):
     if "app_start_time" not in st.session_state:
         st.session_state.app_start_time = datetime.now()
     
@@ -70,24 +49,19 @@ def auto_scraping(docs_dir, scraping_dir):
         st.sidebar.caption(f"Time since last scraping: {(st.session_state.app_start_time - last_scrape).days} days.")
         if (st.session_state.app_start_time - last_scrape).days >= 2 :
             st.sidebar.caption("The retrieval database might be obsolete.")
-            st.sidebar.caption("Updating the database:")
-            try:
-                py = sys.executable  # ensure same interpreter/venv as Streamlit
-                cmd = [py, "-m", "scraping.scraper", "--raw-dir", scraping_dir, "--parsed-dir", docs_dir]
-                with st.sidebar.caption("Collecting data..."):
-                    result = subprocess.run(cmd, capture_output=True, text=True)
-                if result.returncode == 0:
-                    st.sidebar.success("Data collected successfully.")
-                    # Signal Chat tab to reload the index automatically
-                    st.session_state["needs_index_reload"] = True
-                    if result.stdout:
-                        st.text(result.stdout)
-                else:
-                    st.sidebar.error("Scraping failed.")
-                    st.sidebar.text(result.stdout or "")
-                    st.sidebar.text(result.stderr or "")
-            except Exception as e:
-                st.sidebar.error(f"Failed to collect data: {e}")
+            last_job = jobs.latest(SCRAPE_JOB)
+            recently_failed = (
+                last_job is not None
+                and not last_job.active
+                and last_job.status != SUCCEEDED
+                and time.time() - (last_job.finished_at or 0) < AUTO_SCRAPE_RETRY_SECONDS
+            )
+            if not recently_failed:
+                # Background job shared by all sessions: only one scrape runs at a time
+                st.sidebar.caption("Updating the database:")
+                jobs.submit(SCRAPE_JOB, *scrape_commands(cfg))
+            with st.sidebar:
+                job_status(jobs, SCRAPE_JOB)
     else:
         st.sidebar.caption("Aucun scraping détecté")
 
@@ -98,19 +72,17 @@ def chat_ui():
         page_icon="🎓",
         layout="wide"
     )
-    _ensure_services()
+    registry = _get_registry()
 
     st.image("assests/esilv_logo.jpg", width=160)
 
     st.title("ESILV Smart Assistant")
     st.caption("Factual Q&A, contact collection, and admin tools")
 
-    cfg = st.session_state.cfg
+    cfg = registry.cfg
 
-    auto_scraping(
-        docs_dir = cfg["rag"]["docs_dir"],
-        scraping_dir = cfg["rag"]["scraping_dir"]
-    )
+    jobs = _job_runner(cfg["app"]["jobs_dir"])
+    auto_scraping(cfg, jobs)
 
     tab_home, tab_chat, tab_admin = st.tabs(["Home", "Chat", "Admin"])
 
@@ -122,16 +94,16 @@ def chat_ui():
             st.metric("Docs", len(os.listdir(docs_dir)) if os.path.exists(docs_dir) else 0)
         with c2:
             st.metric("Index Path", cfg["rag"]["index_dir"])
+            st.caption(f"Index version: {registry.current.vs.version or 'unversioned'}")
         with c3:
             st.metric("Provider", cfg["llm"]["provider"])
 
     with tab_chat:
         st.subheader("Chat")
 
-        # Auto-reload index if Admin rebuild signaled
-        if st.session_state.get("needs_index_reload"):
-            _reload_index()
-            st.session_state["needs_index_reload"] = False
+        # The vector store switches to a newly published index version on its
+        # own (rag/index_versions.py); this snapshot only pins the agents
+        services = registry.current
 
         # Mode selector
         st.selectbox("Mode", ["auto", "retrieval", "form"], key="chat_mode_select")
@@ -153,31 +125,51 @@ def chat_ui():
             with st.chat_message("user"):
                 st.markdown(user_input)
 
+            start_time = time.time()
             with st.spinner("Le modèle réfléchit..."):
-                start_time = time.time()
-                intent = st.session_state.get("chat_mode_select", "auto")
-                if intent == "auto":
-                    route = st.session_state.orch.route(user_input)
-                    intent = route.get("intent", "retrieval")
-                    st.caption(f"🔀 Routed to: **{intent}** ({route.get('notes', '')})")
-
-                if intent == "retrieval":
-                    res = st.session_state.retrieval.answer(user_input)
-                    assistant_msg = _sanitize_answer(res["answer"])
+                # Routing and retrieval run concurrently; see agents/pipeline.py
+                run = services.pipeline.run(user_input, st.session_state.get("chat_mode_select", "auto"))
+                timings = run["timings"]
+                if run["route"] is not None:
+                    st.caption(f"🔀 Routed to: **{run['intent']}** ({run['route'].get('notes', '')})")
+
+                res = run["retrieval"]
+                if res is None:
+                    form_start = timings.now()
+                    assistant_msg = registry.form.next(st.session_state.transcript)
+                    timings.record("form", form_start)
+
+            with st.chat_message("assistant"):
+                if res is not None:
+                    first_token = []
+
+                    def _timed(stream):
+                        for piece in stream:
+                            if not first_token:
+                                first_token.append(time.time() - start_time)
+                            yield piece
+
+                    # Render tokens as they arrive, then replace with the cleaned answer + sources
+                    placeholder = st.empty()
+                    with placeholder.container():
+                        streamed = st.write_stream(_timed(timings.wrap_stream(res["stream"])))
+                    assistant_msg = _sanitize_answer(streamed if isinstance(streamed, str) else "".join(map(str, streamed)))
                     unique_sources = list(dict.fromkeys(res["sources"]))
                     if unique_sources:
                         assistant_msg += "\n\nSources:\n- " + "\n- ".join(unique_sources[:3])
+                    placeholder.markdown(assistant_msg)
                 else:
-                    assistant_msg = st.session_state.form.next(st.session_state.transcript)
+                    st.markdown(assistant_msg)
                 response_time = time.time() - start_time
                 st.session_state.messages.append({"role": "assistant", "content": assistant_msg})
-                with st.chat_message("assistant"):
-                    st.markdown(assistant_msg)
-                    st.caption(f"⏱️ Temps de réponse : {response_time:.2f} secondes")
+                cache_note = " (cache)" if res is not None and res.get("cached") else ""
+                ttft_note = f" — premier token : {first_token[0]:.2f} s" if res is not None and first_token else ""
+                st.caption(f"⏱️ Temps de réponse : {response_time:.2f} secondes{ttft_note}{cache_note}")
+                st.caption(f"Étapes : {timings.summary()}")
 
     with tab_admin:
         st.subheader("Admin")
-        admin_panel(cfg)
+        admin_panel(cfg, jobs)
 
 if __name__ == "__main__":
     chat_ui()
\ No newline at end of file
@@ -0,0 +1,180 @@
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+# Job states; "interrupted" marks jobs that were running when the app stopped
+QUEUED, RUNNING, SUCCEEDED, FAILED, INTERRUPTED = "queued", "running", "succeeded", "failed", "interrupted"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# Job kinds used by the app; both end with an (incremental) index build
+SCRAPE_JOB, INDEX_JOB = "scrape", "index"
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    commands: List[List[str]]
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    returncode: Optional[int] = None
+    step: int = 0
+    log_path: str = ""
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATES
+
+
+class JobRunner:
+    """Runs maintenance commands (scraping, index rebuilds) off the UI thread.
+
+    Jobs are queued and executed one at a time by a daemon thread, so a
+    rebuild never competes with a scrape and Streamlit sessions never wait on
+    either. Submitting a kind that is already queued or running returns the
+    existing job (single flight). Each job's status is persisted as JSON and
+    its output streamed to a log file under jobs_dir.
+    """
+
+    def __init__(self, jobs_dir: str = "data/jobs", keep: int = 50):
+        self.jobs_dir = jobs_dir
+        self.keep = keep
+        os.makedirs(jobs_dir, exist_ok=True)
+        # Reentrant: submit() holds it while looking for an active job
+        self._lock = threading.RLock()
+        self._queue: "queue.Queue[Job]" = queue.Queue()
+        self._jobs: Dict[str, Job] = {}
+        self._load()
+        threading.Thread(target=self._worker, name="job-runner", daemon=True).start()
+
+    # -- persistence ---------------------------------------------------
+
+    def _job_file(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job: Job):
+        tmp = self._job_file(job.id) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(job), f)
+        os.replace(tmp, self._job_file(job.id))
+
+    def _load(self):
+        for name in os.listdir(self.jobs_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.jobs_dir, name), encoding="utf-8") as f:
+                    job = Job(**json.load(f))
+            except (ValueError, TypeError) as e:
+                print(f"[WARNING] Skipping unreadable job file {name}: {e}")
+                continue
+            if job.active:
+                # The process that owned it is gone
+                job.status = INTERRUPTED
+                job.finished_at = job.finished_at or time.time()
+                self._save(job)
+            self._jobs[job.id] = job
+
+    def _prune(self):
+        finished = sorted((j for j in self._jobs.values() if not j.active), key=lambda j: j.created_at)
+        for job in finished[: max(0, len(finished) - self.keep)]:
+            self._jobs.pop(job.id, None)
+            for path in (self._job_file(job.id), job.log_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+    # -- public API ----------------------------------------------------
+
+    def submit(self, kind: str, *commands: List[str]) -> Job:
+        """Queue commands to run in order; returns the active job of this kind if there is one."""
+        with self._lock:
+            active = self.active(kind)
+            if active is not None:
+                return active
+            job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{kind}-{uuid.uuid4().hex[:6]}"
+            job = Job(
+                id=job_id,
+                kind=kind,
+                commands=[list(c) for c in commands],
+                log_path=os.path.join(self.jobs_dir, f"{job_id}.log"),
+            )
+            self._jobs[job.id] = job
+            self._save(job)
+            self._prune()
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, kind: Optional[str] = None) -> List[Job]:
+        """Jobs, newest first."""
+        # Snapshot: other sessions submit and prune while we iterate
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if kind is None or j.kind == kind]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def latest(self, kind: str, status: Optional[str] = None) -> Optional[Job]:
+        for job in self.jobs(kind):
+            if status is None or job.status == status:
+                return job
+        return None
+
+    def active(self, kind: str) -> Optional[Job]:
+        return next((j for j in self.jobs(kind) if j.active), None)
+
+    def tail(self, job: Job, lines: int = 40) -> str:
+        """Last lines of the job's output (progress bars' carriage returns become new lines)."""
+        if not job.log_path or not os.path.exists(job.log_path):
+            return ""
+        with open(job.log_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 64 * 1024))
+            text = f.read().decode("utf-8", errors="replace")
+        rows = [r for r in text.replace("\r", "\n").splitlines() if r.strip()]
+        return "\n".join(rows[-lines:])
+
+    # -- execution -----------------------------------------------------
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            except Exception as e:
+                print(f"[ERROR] Job {job.id} crashed: {e}")
+                job.status, job.finished_at = FAILED, time.time()
+                self._save(job)
+
+    def _run(self, job: Job):
+        job.status, job.started_at = RUNNING, time.time()
+        self._save(job)
+        env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+        with open(job.log_path, "ab") as log:
+            for i, cmd in enumerate(job.commands):
+                job.step = i
+                self._save(job)
+                log.write(f"$ {' '.join(cmd)}\n".encode("utf-8"))
+                log.flush()
+                proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, env=env)
+                job.returncode = proc.wait()
+                if job.returncode != 0:
+                    break
+        job.status = SUCCEEDED if job.returncode == 0 else FAILED
+        job.finished_at = time.time()
+        self._save(job)
+
+
+def python_module(module: str, *args: str) -> List[str]:
+    """Command running `python -m module args` with the app's interpreter/venv."""
+    return [sys.executable, "-m", module, *args]
@@ -0,0 +1,230 @@
+"""Deterministic synthetic corpus shaped like the scraped ESILV pages.
+
+Documents are plain text with "# " headings (what scraping.parse_html
+writes), built from French templates about programmes, admissions, fees,
+dates, campus life and contacts; they can also be written as raw HTML
+pages (with menus and footer) or PDFs. The same seed always gives the same
+corpus and questions, so benchmark runs are comparable across commits.
+"""
+import html
+import os
+import random
+from pathlib import Path
+from typing import List
+
+TOPICS = {
+    "admissions": [
+        "Les candidatures au cycle {cycle} sont ouvertes du {date} au {date2} sur la plateforme {platform}.",
+        "Le concours {contest} comprend une épreuve écrite de {subject} et un entretien de motivation de {minutes} minutes.",
+        "Les étudiants titulaires d'un {degree} peuvent intégrer directement la {year}e année après étude du dossier.",
+        "Les résultats d'admission sont publiés le {date} et l'inscription doit être confirmée sous {days} jours.",
+    ],
+    "programmes": [
+        "La majeure {major} forme des ingénieurs capables de concevoir des systèmes {adjective} pour l'industrie.",
+        "En {year}e année, les étudiants de la majeure {major} suivent {hours} heures de projets encadrés par des entreprises partenaires.",
+        "Le parcours {major} propose un double diplôme avec {partner} et un semestre à l'international.",
+        "Les cours de {subject} sont assurés par des enseignants-chercheurs du laboratoire {lab}.",
+    ],
+    "fees": [
+        "Les frais de scolarité du cycle {cycle} s'élèvent à {amount} euros par an.",
+        "Une bourse de {percent} % des frais de scolarité est accordée aux étudiants boursiers du CROUS échelon {echelon}.",
+        "Le paiement peut être échelonné en {installments} fois sans frais auprès du service financier.",
+        "Les étudiants en alternance ne paient pas de frais de scolarité : l'entreprise {partner} finance la formation.",
+    ],
+    "calendar": [
+        "La rentrée de la {year}e année a lieu le {date} au Pôle Léonard de Vinci.",
+        "Les examens du semestre {semester} se déroulent du {date} au {date2}.",
+        "Le stage de {year}e année dure {weeks} semaines et commence au plus tôt le {date}.",
+        "Les journées portes ouvertes sont organisées le {date} de 10h à 17h.",
+    ],
+    "campus": [
+        "L'association {association} organise chaque semestre des événements autour de {subject}.",
+        "Le campus de La Défense accueille {students} étudiants et dispose d'un fablab ouvert de 8h à 22h.",
+        "Le service des relations internationales accompagne les départs vers {partner} et {partner2}.",
+        "La bibliothèque du pôle propose {books} ouvrages et des salles de travail réservables en ligne.",
+    ],
+    "contacts": [
+        "Pour toute question sur les admissions, contactez le service au 01 41 16 {phone} ou par email.",
+        "Le responsable de la majeure {major} reçoit les étudiants sur rendez-vous le {weekday}.",
+        "Le bureau des stages répond aux entreprises partenaires du lundi au vendredi.",
+        "Les conseillers d'orientation peuvent être joints via le formulaire de contact du site.",
+    ],
+}
+
+VALUES = {
+    "cycle": ["préparatoire", "ingénieur", "bachelor", "master of science"],
+    "platform": ["Parcoursup", "Concours Avenir", "le site de l'école"],
+    "contest": ["Avenir", "Avenir Plus", "Avenir Bachelor"],
+    "subject": ["mathématiques", "physique", "informatique", "data science", "cybersécurité", "mécanique", "finance"],
+    "degree": ["BTS", "DUT", "BUT", "licence", "CPGE"],
+    "major": [
+        "Data & Intelligence Artificielle", "Cybersécurité & Cloud", "Ingénierie Financière",
+        "Fintech", "Énergie & Villes Durables", "Mécanique Numérique", "Objets Connectés", "Santé Biotech",
+    ],
+    "adjective": ["embarqués", "distribués", "intelligents", "durables", "critiques"],
+    "partner": ["Polytechnique Montréal", "TU Munich", "Politecnico di Milano", "Société Générale", "Airbus", "Capgemini"],
+    "lab": ["De Vinci Research Center", "DVRC", "Digital Lab"],
+    "association": ["BDE", "BDS", "Junior Entreprise", "DeVinci Robotics", "Hackathon Club"],
+    "weekday": ["lundi", "mardi", "mercredi", "jeudi", "vendredi"],
+    "month": ["septembre", "octobre", "novembre", "décembre", "janvier", "février", "mars", "avril", "mai", "juin"],
+}
+
+QUESTION_TEMPLATES = [
+    "Quels sont les frais de scolarité du cycle {cycle} ?",
+    "Quand a lieu la rentrée de la {year}e année ?",
+    "Comment candidater au concours {contest} ?",
+    "Quels cours propose la majeure {major} ?",
+    "Quelle bourse pour un étudiant boursier échelon {echelon} ?",
+    "Quand se déroulent les examens du semestre {semester} ?",
+    "Quelles associations parlent de {subject} ?",
+    "Peut-on faire un double diplôme avec {partner} ?",
+    "Combien de semaines dure le stage de {year}e année ?",
+    "Comment intégrer l'école avec un {degree} ?",
+]
+
+# Requests with no question word, "?" or contact phrase: the keyword pass has
+# no signal, so they go to the intent classifier, then the LLM if it is unsure
+OPEN_TEMPLATES = [
+    "Frais de scolarité du cycle {cycle}",
+    "Informations sur la majeure {major}",
+    "Je cherche le calendrier des examens du semestre {semester}",
+    "Double diplôme avec {partner}",
+    "Admission en {year}e année avec un {degree}",
+    "Bourses pour les étudiants boursiers échelon {echelon}",
+]
+
+# Messages the orchestrator should route to the contact form
+FORM_TEMPLATES = [
+    "Je voudrais être contacté par un conseiller au sujet de la majeure {major}",
+    "Can someone call me about the {cycle} programme?",
+    "J'aimerais prendre rendez-vous avec un conseiller",
+]
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    values = {key: rng.choice(options) for key, options in VALUES.items()}
+    day = rng.randint(1, 28)
+    values.update(
+        date=f"{day} {values['month']}",
+        date2=f"{min(28, day + rng.randint(1, 14))} {rng.choice(VALUES['month'])}",
+        partner2=rng.choice(VALUES["partner"]),
+        year=rng.randint(1, 5),
+        semester=rng.randint(1, 10),
+        minutes=rng.choice([20, 30, 45]),
+        days=rng.choice([5, 8, 15]),
+        hours=rng.randint(40, 300),
+        amount=rng.randrange(6000, 11000, 50),
+        percent=rng.choice([10, 20, 30, 50]),
+        echelon=rng.randint(0, 7),
+        installments=rng.choice([3, 5, 10]),
+        weeks=rng.choice([8, 12, 16, 24]),
+        students=rng.randrange(4000, 9000, 100),
+        books=rng.randrange(5000, 30000, 500),
+        phone=f"{rng.randint(60, 69)} {rng.randint(10, 99)}",
+    )
+    return template.format(**values)
+
+
+def make_document(index: int, seed: int = 0, sections: int = 4, sentences: int = 6) -> str:
+    """One page: a title, then `sections` headed sections of `sentences` sentences."""
+    rng = random.Random(seed * 1_000_003 + index)
+    topic = rng.choice(sorted(TOPICS))
+    lines = [f"# {topic.capitalize()} - page {index}"]
+    for s in range(sections):
+        section_topic = topic if s == 0 else rng.choice(sorted(TOPICS))
+        lines.append(f"## {section_topic.capitalize()} {s + 1}")
+        for _ in range(sentences):
+            lines.append(_fill(rng.choice(TOPICS[section_topic]), rng))
+    return "\n".join(lines)
+
+
+def make_html(text: str) -> str:
+    """Wrap a document in a page with the site's menus, cookie banner and footer."""
+    body = []
+    for line in text.splitlines():
+        level = len(line) - len(line.lstrip("#"))
+        if level:
+            body.append(f"<h{level}>{html.escape(line[level:].strip())}</h{level}>")
+        else:
+            body.append(f"<p>{html.escape(line)}</p>")
+    return (
+        "<!DOCTYPE html><html lang='fr'><head><meta charset='utf-8'><title>ESILV</title>"
+        "<script>window.dataLayer = [];</script><style>body { margin: 0 }</style></head><body>"
+        "<div id='tarteaucitron'>Ce site utilise des cookies. <button>Accepter</button></div>"
+        "<header><a href='/'>ESILV</a><nav class='main-menu'><ul>"
+        + "".join(f"<li><a href='/{t}/'>{t.capitalize()}</a></li>" for t in sorted(TOPICS))
+        + "</ul></nav></header><main><article>" + "".join(body) + "</article>"
+        "<div class='share-buttons'><a href='#'>Partager</a></div></main>"
+        "<p>École d'ingénieurs du Pôle Léonard de Vinci - Paris La Défense</p>"
+        "<footer><p>ESILV - 12 avenue Léonard de Vinci, 92400 Courbevoie</p><a href='/mentions'>Mentions légales</a></footer>"
+        "</body></html>"
+    )
+
+
+def make_pdf(text: str) -> bytes:
+    """Single-page PDF (Helvetica, one line per text line) that pypdf can extract."""
+    ops = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+    for line in text.splitlines():
+        escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        ops.append(f"({escaped}) '")
+    ops.append("ET")
+    stream = "\n".join(ops).encode("cp1252", errors="replace")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def generate_corpus(out_dir: str, n_docs: int = 200, seed: int = 0, fmt: str = "txt", **doc_kwargs) -> List[Path]:
+    """Write n_docs pages to out_dir as .txt, .html or .pdf (existing files with the same name are kept)."""
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(n_docs):
+        path = out / f"page_{i:06d}.{fmt}"
+        if not path.exists():
+            text = make_document(i, seed, **doc_kwargs)
+            if fmt == "html":
+                path.write_text(make_html(text), encoding="utf-8")
+            elif fmt == "pdf":
+                path.write_bytes(make_pdf(text))
+            else:
+                path.write_text(text, encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def make_questions(n: int, seed: int = 0, form_ratio: float = 0.1, open_ratio: float = 0.3) -> List[str]:
+    """n user messages; about form_ratio of them ask to be contacted and
+    open_ratio are requests without routing keywords."""
+    rng = random.Random(seed + 7919)
+    questions = []
+    for _ in range(n):
+        draw = rng.random()
+        if draw < form_ratio:
+            templates = FORM_TEMPLATES
+        elif draw < form_ratio + open_ratio:
+            templates = OPEN_TEMPLATES
+        else:
+            templates = QUESTION_TEMPLATES
+        questions.append(_fill(rng.choice(templates), rng))
+    return questions
+
+
+def corpus_size(paths: List[Path]) -> int:
+    return sum(os.path.getsize(p) for p in paths)
@@ -0,0 +1,107 @@
+"""In-process stand-in for Ollama's /api/chat, with configurable latency.
+
+Streams `answer_tokens` words as NDJSON after `first_token_delay` seconds,
+one every `token_delay` seconds, like a local model would. Routing prompts
+(the orchestrator asks for {"intent": ...}) get a JSON answer.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_WORDS = (
+    "Selon les documents de l'école, les informations demandées figurent dans la "
+    "brochure du programme et sur la page admissions du site."
+).split()
+
+
+class FakeOllama:
+    def __init__(
+        self,
+        first_token_delay: float = 0.2,
+        token_delay: float = 0.02,
+        answer_tokens: int = 40,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.answer_tokens = answer_tokens
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOllama":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _reply(self, messages) -> list:
+        if not messages:
+            return []  # warm-up: Ollama only loads the model
+        if any('"intent"' in (m.get("content") or "") for m in messages):
+            return ['{"intent": "retrieval"}']
+        return [_WORDS[i % len(_WORDS)] + " " for i in range(self.answer_tokens)]
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like Ollama
+
+            def log_message(self, *args):
+                pass
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with fake._lock:
+                    fake.requests += 1
+                pieces = fake._reply(body.get("messages") or [])
+                if pieces:
+                    time.sleep(fake.first_token_delay)
+
+                if not body.get("stream", True):
+                    time.sleep(fake.token_delay * max(0, len(pieces) - 1))
+                    out = json.dumps({"message": {"role": "assistant", "content": "".join(pieces)}, "done": True}).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(out)))
+                    self.end_headers()
+                    self.wfile.write(out)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, piece in enumerate(pieces):
+                    if i:
+                        time.sleep(fake.token_delay)
+                    line = json.dumps({"message": {"role": "assistant", "content": piece}, "done": False}) + "\n"
+                    self._write_chunk(line.encode())
+                self._write_chunk((json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}) + "\n").encode())
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
@@ -0,0 +1,233 @@
+"""Ingestion throughput benchmark.
+
+Generates (or reuses) a synthetic corpus of raw HTML pages, text pages and
+PDFs (benchmarks/corpus.py), then runs the real ingestion path and times
+each stage: HTML extraction (scraping.parse_html), then a full index build
+(rag.index_builder) broken down into scan, read per format, chunk, embed,
+write, BM25, validate and publish. An optional incremental rebuild after
+changing a fraction of the pages follows.
+
+    python -m benchmarks.ingest --docs 1000
+    python -m benchmarks.ingest --docs 100000 --workdir /data/bench --profile cprofile
+
+Reports documents/s, MB/s and peak memory, and saves them to a JSON file.
+"""
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from benchmarks.corpus import corpus_size, generate_corpus, make_document
+from benchmarks.latency import git_commit
+from rag import index_builder
+from scraping.parse_html import parse_html_folder
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    from pyinstrument import Profiler
+
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    PYINSTRUMENT_AVAILABLE = False
+
+
+def peak_memory_mb() -> Dict[str, Optional[float]]:
+    """Peak RSS of this process and of its largest finished child (extraction workers)."""
+    if resource is None:
+        return {"self": None, "children": None}
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes on macOS, KiB on Linux
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def build_corpus(workdir: Path, docs: int, html_ratio: float, pdf_ratio: float, seed: int) -> Dict:
+    """Split `docs` pages between raw HTML, PDF and text; returns their paths' sizes and counts."""
+    n_html = int(docs * html_ratio)
+    n_pdf = int(docs * pdf_ratio)
+    n_txt = docs - n_html - n_pdf
+    start = time.perf_counter()
+    # One seed per format so the formats don't hold the same pages
+    html_paths = generate_corpus(str(workdir / "raw"), n_html, seed, fmt="html")
+    pdf_paths = generate_corpus(str(workdir / "docs" / "pdf"), n_pdf, seed + 1, fmt="pdf")
+    txt_paths = generate_corpus(str(workdir / "docs" / "txt"), n_txt, seed + 2, fmt="txt")
+    return {
+        "html": {"files": n_html, "bytes": corpus_size(html_paths)},
+        "pdf": {"files": n_pdf, "bytes": corpus_size(pdf_paths)},
+        "txt": {"files": n_txt, "bytes": corpus_size(txt_paths)},
+        "generate_s": round(time.perf_counter() - start, 3),
+    }
+
+
+def touch_fraction(docs_dir: Path, fraction: float, seed: int) -> int:
+    """Rewrite `fraction` of the text pages with new content, as a re-scrape would."""
+    paths = sorted((docs_dir / "txt").glob("*.txt"))
+    step = max(1, round(1 / fraction)) if fraction > 0 else 0
+    changed = paths[::step] if step else []
+    for i, path in enumerate(changed):
+        path.write_text(make_document(i, seed + 100), encoding="utf-8")
+    return len(changed)
+
+
+def rate(count: float, seconds: float) -> float:
+    return round(count / seconds, 2) if seconds else 0.0
+
+
+def run(
+    workdir: Path,
+    docs: int,
+    html_ratio: float,
+    pdf_ratio: float,
+    seed: int,
+    batch_size: int,
+    embed_workers: int,
+    extract_workers: Optional[int],
+    incremental: float,
+) -> Dict:
+    raw_dir, docs_dir, index_dir = workdir / "raw", workdir / "docs", workdir / "index"
+    corpus = build_corpus(workdir, docs, html_ratio, pdf_ratio, seed)
+    print(f"Corpus in {workdir}: {json.dumps(corpus)}")
+
+    stages: Dict[str, Dict] = {}
+
+    if corpus["html"]["files"]:
+        start = time.perf_counter()
+        parse_html_folder(raw_dir, docs_dir / "html", workers=extract_workers)
+        sec = time.perf_counter() - start
+        stages["html_extract"] = {
+            "wall_s": round(sec, 3),
+            "docs_per_s": rate(corpus["html"]["files"], sec),
+            "mb_per_s": rate(corpus["html"]["bytes"] / 1e6, sec),
+        }
+        print(f"HTML extraction: {corpus['html']['files']} pages in {sec:.1f} s")
+
+    build = index_builder.main(
+        str(docs_dir), str(index_dir), full=True, batch_size=batch_size, workers=embed_workers, cache_dir=None
+    )
+    stages["index_full"] = build.as_dict()
+
+    if incremental:
+        changed = touch_fraction(docs_dir, incremental, seed)
+        print(f"Changed {changed} pages; incremental rebuild")
+        build = index_builder.main(
+            str(docs_dir), str(index_dir), batch_size=batch_size, workers=embed_workers, cache_dir=None
+        )
+        stages["index_incremental"] = {"changed_docs": changed, **build.as_dict()}
+
+    return {"workdir": str(workdir), "corpus": corpus, "stages": stages}
+
+
+def main(
+    docs: int = 1000,
+    html_ratio: float = 0.5,
+    pdf_ratio: float = 0.1,
+    seed: int = 0,
+    batch_size: int = 64,
+    embed_workers: int = 2,
+    extract_workers: Optional[int] = None,
+    incremental: float = 0.0,
+    profile: Optional[str] = None,
+    budget: float = 120.0,
+    workdir: Optional[str] = None,
+    out: Optional[str] = None,
+) -> Dict:
+    params = {
+        "docs": docs, "html_ratio": html_ratio, "pdf_ratio": pdf_ratio, "seed": seed,
+        "batch_size": batch_size, "embed_workers": embed_workers, "extract_workers": extract_workers,
+        "incremental": incremental,
+    }
+    commit = git_commit()
+    out = Path(out or os.path.join("benchmarks", "results", f"ingest-{commit}-{docs}.json"))
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if profile == "pyinstrument" and not PYINSTRUMENT_AVAILABLE:
+        raise RuntimeError("pyinstrument not installed; use --profile cprofile or pip install pyinstrument")
+    temp_workdir = workdir is None
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="esilv-ingest-"))
+
+    profile_path = None
+    try:
+        if profile == "pyinstrument":
+            profiler = Profiler()
+            profiler.start()
+            result = run(workdir, **params)
+            profiler.stop()
+            profile_path = out.with_suffix(".html")
+            profile_path.write_text(profiler.output_html(), encoding="utf-8")
+        elif profile == "cprofile":
+            profiler = cProfile.Profile()
+            result = profiler.runcall(run, workdir, **params)
+            profile_path = out.with_suffix(".prof")
+            profiler.dump_stats(str(profile_path))
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+        else:
+            result = run(workdir, **params)
+    finally:
+        if temp_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "benchmark": "ingest",
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "cpu_count": os.cpu_count(),
+            "params": {**params, "profile": profile},
+            "profile_path": str(profile_path) if profile_path else None,
+        },
+        **result,
+        "peak_memory_mb": peak_memory_mb(),
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    full = report["stages"]["index_full"]
+    print(f"\nFull build: {full['docs_per_s']} docs/s, {full['mb_per_s']} MB/s, peak RSS {report['peak_memory_mb']['self']} MB")
+    if full["wall_s"] > budget:
+        print(f"WARNING: full build took {full['wall_s']:.0f} s, over the {budget:.0f} s budget")
+    if profile_path:
+        print(f"Profile written to {profile_path}")
+    print(f"Saved results to {out}")
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Time each ingestion stage on a synthetic corpus")
+    ap.add_argument("--docs", type=int, default=1000, help="Pages to ingest (100 to 100k)")
+    ap.add_argument("--html-ratio", type=float, default=0.5, help="Share of pages scraped as raw HTML")
+    ap.add_argument("--pdf-ratio", type=float, default=0.1, help="Share of pages given as PDF")
+    ap.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    ap.add_argument("--batch-size", type=int, default=64, help="Chunks embedded per batch")
+    ap.add_argument("--embed-workers", type=int, default=2, help="Embedding worker threads")
+    ap.add_argument("--extract-workers", type=int, default=None, help="HTML extraction processes (default: one per core)")
+    ap.add_argument("--incremental", type=float, default=0.0, help="Then change this fraction of pages and rebuild incrementally")
+    ap.add_argument("--profile", choices=["cprofile", "pyinstrument"], default=None, help="Profile the run")
+    ap.add_argument("--budget", type=float, default=120.0, help="Warn when a full build takes longer (s)")
+    ap.add_argument("--workdir", default=None, help="Corpus/index directory, reused across runs (default: a temp dir, deleted afterwards)")
+    ap.add_argument("--out", default=None, help="Result file (default: benchmarks/results/ingest-<commit>-<docs>.json)")
+    args = ap.parse_args()
+    main(
+        docs=args.docs,
+        html_ratio=args.html_ratio,
+        pdf_ratio=args.pdf_ratio,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        embed_workers=args.embed_workers,
+        extract_workers=args.extract_workers,
+        incremental=args.incremental,
+        profile=args.profile,
+        budget=args.budget,
+        workdir=args.workdir,
+        out=args.out,
+    )
@@ -0,0 +1,330 @@
+"""End-to-end chat latency benchmark.
+
+Builds an index over a fixed synthetic corpus (benchmarks/corpus.py), starts
+a fake Ollama server and sends questions through the same ServiceRegistry /
+ChatPipeline as the app, with 1..N concurrent users. Per-stage durations come
+from the request tracer (services/tracing.py) with every request sampled.
+The config is built here, not from the environment or .env, so runs are
+comparable across machines. A share of the questions has no routing keyword
+and goes through the intent classifier, and the LLM when it is unsure
+(--intent-min-margin 1 sends all of them to the LLM).
+
+    python -m benchmarks.latency --docs 300 --users 1 4 8 --requests 100
+    python -m benchmarks.latency --baseline benchmarks/results/latency-<commit>.json
+
+Writes p50/p95/p99 per stage, throughput and peak RSS to a JSON file.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from agents.orchestrator import DEFAULT_RULES_PATH
+from benchmarks.corpus import generate_corpus, make_questions
+from benchmarks.fake_ollama import FakeOllama
+from rag import index_builder
+from services import tracing
+from services.registry import ServiceRegistry
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CONFIGS_DIR = os.path.dirname(DEFAULT_RULES_PATH)
+
+# Stages in pipeline order; "e2e" and "first_token" are measured by the client
+STAGES = ["chat", "route", "retrieve", "embed", "search", "rerank", "prompt-build", "generate", "first_token", "e2e"]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    arr = np.asarray(values)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "count": len(values),
+        "mean": round(float(arr.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(arr.max()), 3),
+    }
+
+
+class SpanCollector:
+    """Tracing exporter keeping span durations (ms) by name."""
+
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def __call__(self, record: Dict):
+        with self._lock:
+            self.durations[record["name"]].append(record["duration_ms"])
+
+    def add(self, name: str, ms: float):
+        self({"name": name, "duration_ms": ms})
+
+    def reset(self):
+        with self._lock:
+            self.durations = defaultdict(list)
+
+
+def bench_config(
+    index_dir: str, docs_dir: str, llm_url: str, answer_cache: bool, intent_min_margin: float = 0.05
+) -> dict:
+    """The app's default settings (configs/config.py), pointed at the benchmark's index and fake LLM."""
+    return {
+        "llm": {
+            "provider": "ollama",
+            "ollama_model": "mistral",
+            "ollama_base_url": llm_url,
+            "ollama_pool_size": 8,
+            "ollama_keep_alive": "30m",
+            "ollama_timeout": 300.0,
+            "vertex_model": "",
+            "gcp_project_id": "",
+            "gcp_location": "",
+        },
+        "rag": {
+            "docs_dir": docs_dir,
+            "index_dir": index_dir,
+            "embedding_cache_dir": "",
+            "embedding_cache_size": 100_000,
+            "hybrid_search": True,
+            "rerank_candidates": 12,
+            "rerank_lambda": 0.7,
+            "context_token_budget": 1500,
+            "llm_tokenizer": "",
+            # Cosine similarity never exceeds 1: with 1.01 every lookup misses
+            "answer_cache_threshold": 0.92 if answer_cache else 1.01,
+            "answer_cache_ttl": 3600.0,
+            "answer_cache_size": 1000,
+        },
+        "app": {
+            "intent_examples_path": os.path.join(CONFIGS_DIR, "intent_examples.jsonl"),
+            "intent_min_margin": intent_min_margin,
+            "routing_rules_path": DEFAULT_RULES_PATH,
+            "speculative_retrieval": True,
+            "trace_sample_rate": 0.0,
+            "trace_path": "",
+        },
+    }
+
+
+def ask(pipeline, question: str, collector: SpanCollector) -> Tuple[str, str]:
+    """One chat turn, consumed like the UI does; returns the intent and how it was routed."""
+    t0 = time.perf_counter()
+    result = pipeline.run(question)
+    if result["retrieval"] is not None:
+        first = True
+        for _ in result["retrieval"]["stream"]:
+            if first:
+                collector.add("first_token", (time.perf_counter() - t0) * 1000)
+                first = False
+    collector.add("e2e", (time.perf_counter() - t0) * 1000)
+    return result["intent"], (result["route"] or {}).get("notes", "none")
+
+
+def run_level(pipeline, questions: List[str], users: int, collector: SpanCollector) -> Dict:
+    collector.reset()
+    errors = []
+    intents: Dict[str, int] = defaultdict(int)
+    routes: Dict[str, int] = defaultdict(int)
+    lock = threading.Lock()
+
+    def _one(q):
+        try:
+            intent, method = ask(pipeline, q, collector)
+        except Exception as e:
+            with lock:
+                errors.append(repr(e))
+            return
+        with lock:
+            intents[intent] += 1
+            routes[method] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(_one, questions))
+    wall = time.perf_counter() - start
+    return {
+        "users": users,
+        "requests": len(questions),
+        "errors": len(errors),
+        "first_errors": errors[:3],
+        "intents": dict(intents),
+        "routes": dict(routes),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round((len(questions) - len(errors)) / wall, 3),
+        "stages_ms": {name: percentiles(collector.durations.get(name, [])) for name in STAGES},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_level(level: Dict):
+    print(f"\n== {level['users']} user(s): {level['requests']} requests in {level['wall_s']} s, "
+          f"{level['throughput_rps']} req/s, {level['errors']} errors, peak RSS {level['peak_rss_mb']} MB")
+    print("routed by " + ", ".join(f"{method}: {n}" for method, n in sorted(level["routes"].items())))
+    print(f"{'stage':<14}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, s in level["stages_ms"].items():
+        if s["count"]:
+            print(f"{name:<14}{s['count']:>6}{s['p50']:>10.1f}{s['p95']:>10.1f}{s['p99']:>10.1f}")
+
+
+def compare(report: Dict, baseline: Dict):
+    """Print p50/p95 changes against an earlier report, level by level."""
+    print(f"\n== Compared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')})")
+    old_levels = {lvl["users"]: lvl for lvl in baseline.get("levels", [])}
+    for level in report["levels"]:
+        old = old_levels.get(level["users"])
+        if old is None:
+            continue
+        print(f"-- {level['users']} user(s): throughput {old['throughput_rps']} -> {level['throughput_rps']} req/s")
+        for name, s in level["stages_ms"].items():
+            o = old["stages_ms"].get(name, {})
+            if not s.get("count") or not o.get("count"):
+                continue
+            deltas = [f"{p} {o[p]:.1f} -> {s[p]:.1f} ms ({(s[p] - o[p]) / o[p] * 100 if o[p] else 0:+.0f}%)" for p in ("p50", "p95")]
+            print(f"   {name:<14}" + ", ".join(deltas))
+
+
+def main(
+    docs: int = 300,
+    users: Sequence[int] = (1, 4, 8),
+    requests: int = 100,
+    warmup: int = 5,
+    seed: int = 0,
+    first_token_delay: float = 0.2,
+    token_delay: float = 0.02,
+    answer_tokens: int = 40,
+    answer_cache: bool = False,
+    open_ratio: float = 0.3,
+    intent_min_margin: float = 0.05,
+    workdir: Optional[str] = None,
+    out: Optional[str] = None,
+    baseline: Optional[str] = None,
+) -> Dict:
+    temp_workdir = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix="esilv-bench-")
+    docs_dir, index_dir = os.path.join(workdir, "docs"), os.path.join(workdir, "index")
+    try:
+        generate_corpus(docs_dir, docs, seed)
+
+        start = time.perf_counter()
+        index_builder.main(docs_dir, index_dir)
+        build_s = time.perf_counter() - start
+
+        collector = SpanCollector()
+        with FakeOllama(first_token_delay, token_delay, answer_tokens) as llm:
+            registry = ServiceRegistry(bench_config(index_dir, docs_dir, llm.url, answer_cache, intent_min_margin))
+            tracing.configure(1.0, exporter=collector)
+            pipeline = registry.current.pipeline
+
+            for q in make_questions(warmup, seed + 1, open_ratio=open_ratio):
+                ask(pipeline, q, collector)
+
+            levels = []
+            for n in users:
+                level = run_level(pipeline, make_questions(requests, seed, open_ratio=open_ratio), n, collector)
+                print_level(level)
+                levels.append(level)
+            tracing.configure(0.0)
+            registry.current.vs.close()
+    finally:
+        if temp_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "benchmark": "latency",
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {
+                "docs": docs, "requests": requests, "warmup": warmup, "seed": seed,
+                "first_token_delay": first_token_delay, "token_delay": token_delay,
+                "answer_tokens": answer_tokens, "answer_cache": answer_cache,
+                "open_ratio": open_ratio, "intent_min_margin": intent_min_margin,
+            },
+            "index_build_s": round(build_s, 3),
+        },
+        "levels": levels,
+    }
+
+    out = out or os.path.join("benchmarks", "results", f"latency-{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to {out}")
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="End-to-end chat latency benchmark with a fake Ollama server")
+    ap.add_argument("--docs", type=int, default=300, help="Synthetic documents to index")
+    ap.add_argument("--users", type=int, nargs="+", default=[1, 4, 8], help="Concurrency levels to run")
+    ap.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    ap.add_argument("--warmup", type=int, default=5, help="Unmeasured requests sent first")
+    ap.add_argument("--seed", type=int, default=0, help="Corpus and question seed")
+    ap.add_argument("--first-token-delay", type=float, default=0.2, help="Fake LLM delay before the first token (s)")
+    ap.add_argument("--token-delay", type=float, default=0.02, help="Fake LLM delay between tokens (s)")
+    ap.add_argument("--answer-tokens", type=int, default=40, help="Tokens in each fake answer")
+    ap.add_argument("--answer-cache", action="store_true", help="Keep the semantic answer cache enabled")
+    ap.add_argument("--open-ratio", type=float, default=0.3, help="Share of questions without routing keywords")
+    ap.add_argument("--intent-min-margin", type=float, default=0.05, help="Classifier margin below which the LLM routes (1 = always the LLM)")
+    ap.add_argument("--workdir", default=None, help="Where to put the corpus and index (default: a temp dir, deleted afterwards)")
+    ap.add_argument("--out", default=None, help="Result file (default: benchmarks/results/latency-<commit>.json)")
+    ap.add_argument("--baseline", default=None, help="Earlier result file to compare with")
+    args = ap.parse_args()
+    main(
+        docs=args.docs,
+        users=args.users,
+        requests=args.requests,
+        warmup=args.warmup,
+        seed=args.seed,
+        first_token_delay=args.first_token_delay,
+        token_delay=args.token_delay,
+        answer_tokens=args.answer_tokens,
+        answer_cache=args.answer_cache,
+        open_ratio=args.open_ratio,
+        intent_min_margin=args.intent_min_margin,
+        workdir=args.workdir,
+        out=args.out,
+        baseline=args.baseline,
+    )
@@ -7,6 +7,10 @@ def load_config():
         "llm": {
             "provider": os.getenv("LLM_PROVIDER", "ollama"),
             "ollama_model": os.getenv("OLLAMA_MODEL", "mistral"),
+            "ollama_base_url": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+            "ollama_pool_size": int(os.getenv("OLLAMA_POOL_SIZE", "8")),
+            "ollama_keep_alive": os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+            "ollama_timeout": float(os.getenv("OLLAMA_TIMEOUT", "300")),
             "vertex_model": os.getenv("VERTEX_MODEL", "gemini-1.5-flash"),
             "gcp_project_id": os.getenv("GCP_PROJECT_ID", ""),
             "gcp_location": os.getenv("GCP_LOCATION", "us-central1"),
@@ -15,8 +19,33 @@ def load_config():
             "docs_dir": os.getenv("DOCS_DIR", "data/docs"),
             "index_dir": os.getenv("INDEX_DIR", "data/index"),
             "scraping_dir": os.getenv("SCRAPING_DIR", "data/raw"),
+            "chunk_max_tokens": int(os.getenv("CHUNK_MAX_TOKENS", "200")),
+            "chunk_overlap_tokens": int(os.getenv("CHUNK_OVERLAP_TOKENS", "40")),
+            "embed_batch_size": int(os.getenv("EMBED_BATCH_SIZE", "64")),
+            "embed_workers": int(os.getenv("EMBED_WORKERS", str(min(4, os.cpu_count() or 1)))),
+            "embedding_cache_dir": os.getenv("EMBED_CACHE_DIR", "data/embedding_cache"),
+            "embedding_cache_size": int(os.getenv("EMBED_CACHE_SIZE", "100000")),
+            "hybrid_search": os.getenv("HYBRID_SEARCH", "1").strip() in ("1", "true", "True"),
+            "rerank_candidates": int(os.getenv("RERANK_CANDIDATES", "12")),
+            "rerank_lambda": float(os.getenv("RERANK_LAMBDA", "0.7")),
+            "context_token_budget": int(
+                os.getenv("CONTEXT_TOKEN_BUDGET")
+                # Ollama's default context window is small; Gemini's is not
+                or ("6000" if os.getenv("LLM_PROVIDER", "ollama") == "vertex" else "1500")
+            ),
+            "llm_tokenizer": os.getenv("LLM_TOKENIZER", ""),
+            "answer_cache_threshold": float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92")),
+            "answer_cache_ttl": float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+            "answer_cache_size": int(os.getenv("ANSWER_CACHE_SIZE", "1000")),
         },
         "app": {
             "persist_contacts_path": os.getenv("PERSIST_CONTACTS_PATH", "data/contacts.jsonl"),
+            "intent_examples_path": os.getenv("INTENT_EXAMPLES_PATH", "configs/intent_examples.jsonl"),
+            "intent_min_margin": float(os.getenv("INTENT_MIN_MARGIN", "0.05")),
+            "routing_rules_path": os.getenv("ROUTING_RULES_PATH", "configs/routing_rules.json"),
+            "jobs_dir": os.getenv("JOBS_DIR", "data/jobs"),
+            "speculative_retrieval": os.getenv("SPECULATIVE_RETRIEVAL", "1").strip() in ("1", "true", "True"),
+            "trace_sample_rate": float(os.getenv("TRACE_SAMPLE_RATE", "0")),
+            "trace_path": os.getenv("TRACE_PATH", "data/traces.jsonl"),
         },
     }
\ No newline at end of file
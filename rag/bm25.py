@@ -0,0 +1,143 @@
+import json
+import math
+import os
+import re
+import shutil
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# French elided articles/pronouns: l'école, d'admission, qu'est-ce
+_ELISION_RE = re.compile(r"\b(?:[cdjlmnst]|qu)['’]", re.IGNORECASE)
+
+STOPWORDS = frozenset("""
+a about an and are as at be by for from has have how i in is it its of on or that the this to was what
+when where which who why will with you your
+au aux avec ce ces cette dans de des du elle en est et etre il ils je la le les leur lui ma mais me meme ont sont
+mes moi mon ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une
+vos votre vous y quel quelle quels quelles comment quand est-ce
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, strip accents and French elisions, split on words and drop stopwords.
+
+    Digits are kept so program codes and years remain searchable.
+    """
+    text = _ELISION_RE.sub(" ", text or "")
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [t for t in _WORD_RE.findall(text) if t not in STOPWORDS and (len(t) > 1 or t.isdigit())]
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index stored as flat binary postings.
+
+    On disk (`<dir>/`): `meta.json` (parameters, doc ids), `vocab.json`
+    (term -> [offset, df]), `postings_docs.u32` / `postings_tf.u16` (postings
+    lists laid out term after term) and `doclens.u32`. The binary files are
+    memory-mapped on load.
+    """
+
+    def __init__(self, doc_ids: List[str], vocab: Dict[str, Tuple[int, int]], post_docs, post_tf, doc_lens,
+                 k1: float = 1.5, b: float = 0.75):
+        self.doc_ids = doc_ids
+        self.vocab = vocab
+        self.post_docs = post_docs
+        self.post_tf = post_tf
+        self.doc_lens = doc_lens
+        self.k1 = k1
+        self.b = b
+        self.avgdl = float(np.mean(doc_lens)) if len(doc_lens) else 0.0
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[str, str]], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        doc_ids: List[str] = []
+        lens: List[int] = []
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for doc_id, text in docs:
+            terms = Counter(tokenize(text))
+            idx = len(doc_ids)
+            doc_ids.append(doc_id)
+            lens.append(sum(terms.values()))
+            for term, tf in terms.items():
+                postings[term].append((idx, tf))
+
+        vocab: Dict[str, Tuple[int, int]] = {}
+        post_docs = np.empty(sum(len(p) for p in postings.values()), dtype=np.uint32)
+        post_tf = np.empty_like(post_docs, dtype=np.uint16)
+        offset = 0
+        for term in sorted(postings):
+            plist = postings[term]
+            vocab[term] = (offset, len(plist))
+            for i, (idx, tf) in enumerate(plist, start=offset):
+                post_docs[i] = idx
+                post_tf[i] = min(tf, 65535)
+            offset += len(plist)
+        return cls(doc_ids, vocab, post_docs, post_tf, np.asarray(lens, dtype=np.uint32), k1, b)
+
+    def save(self, path: str) -> None:
+        """Write the index to `path`, replacing any previous one in a single rename."""
+        tmp = path + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "doc_ids": self.doc_ids}, f)
+        with open(os.path.join(tmp, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(self.vocab, f, ensure_ascii=False, separators=(",", ":"))
+        np.asarray(self.post_docs, dtype=np.uint32).tofile(os.path.join(tmp, "postings_docs.u32"))
+        np.asarray(self.post_tf, dtype=np.uint16).tofile(os.path.join(tmp, "postings_tf.u16"))
+        np.asarray(self.doc_lens, dtype=np.uint32).tofile(os.path.join(tmp, "doclens.u32"))
+
+        old = path + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(path, "vocab.json"), encoding="utf-8") as f:
+            vocab = {term: tuple(v) for term, v in json.load(f).items()}
+
+        def _map(name, dtype):
+            file = os.path.join(path, name)
+            if os.path.getsize(file) == 0:
+                return np.empty(0, dtype=dtype)
+            return np.memmap(file, dtype=dtype, mode="r")
+
+        return cls(
+            meta["doc_ids"], vocab,
+            _map("postings_docs.u32", np.uint32),
+            _map("postings_tf.u16", np.uint16),
+            _map("doclens.u32", np.uint32),
+            meta.get("k1", 1.5), meta.get("b", 0.75),
+        )
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Return the top-k (doc id, score) pairs for the query."""
+        n = len(self.doc_ids)
+        if not n:
+            return []
+        scores = np.zeros(n, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * np.asarray(self.doc_lens, dtype=np.float32) / (self.avgdl or 1.0))
+        for term in set(tokenize(query)):
+            entry = self.vocab.get(term)
+            if entry is None:
+                continue
+            offset, df = entry
+            docs = np.asarray(self.post_docs[offset:offset + df])
+            tf = np.asarray(self.post_tf[offset:offset + df], dtype=np.float32)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm[docs])
+        hits = np.flatnonzero(scores)
+        if not len(hits):
+            return []
+        top = hits[np.argsort(-scores[hits], kind="stable")[:k]]
+        return [(self.doc_ids[i], float(scores[i])) for i in top]
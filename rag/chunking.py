@@ -0,0 +1,141 @@
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+
+# Word/punctuation tokens: a cheap stand-in for the embedding model's
+# wordpiece tokenizer (MiniLM truncates inputs at 256 wordpieces).
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_MD_HEADING_RE = re.compile(r"^\s{0,3}(#{1,6})\s+(.+?)\s*#*\s*$")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?;:])\s+")
+
+DEFAULT_MAX_TOKENS = 200
+DEFAULT_OVERLAP_TOKENS = 40
+
+
+@dataclass
+class Chunk:
+    text: str
+    start: int
+    end: int
+    section: str
+    ordinal: int
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count (words and punctuation marks)."""
+    if not text:
+        return 0
+    return len(_TOKEN_RE.findall(text))
+
+
+def _heading_title(line: str) -> str | None:
+    """Return the heading title if the line looks like a section heading."""
+    m = _MD_HEADING_RE.match(line)
+    if m:
+        return m.group(2).strip()
+    stripped = line.strip()
+    # Scraped pages often render headings as short all-caps lines
+    letters = [c for c in stripped if c.isalpha()]
+    if 3 <= len(letters) and len(stripped) <= 80 and stripped.isupper():
+        return stripped
+    return None
+
+
+def _split_sections(text: str) -> List[Tuple[str, int, int]]:
+    """Split text into (title, start, end) sections at heading lines."""
+    sections: List[Tuple[str, int, int]] = []
+    title, start, pos = "", 0, 0
+    for line in text.splitlines(keepends=True):
+        heading = _heading_title(line)
+        if heading is not None and pos > start:
+            sections.append((title, start, pos))
+            start = pos
+        if heading is not None:
+            title = heading
+        pos += len(line)
+    if pos > start:
+        sections.append((title, start, pos))
+    return sections
+
+
+def _split_units(text: str, start: int, end: int, max_tokens: int) -> List[Tuple[int, int, int]]:
+    """Split text[start:end] into (start, end, n_tokens) units no larger than max_tokens.
+
+    Units are lines/paragraphs; oversized ones are split on sentence
+    boundaries, then on token windows as a last resort.
+    """
+    units: List[Tuple[int, int, int]] = []
+    for m in re.finditer(r"[^\n]+", text[start:end]):
+        u_start, u_end = start + m.start(), start + m.end()
+        if not text[u_start:u_end].strip():
+            continue
+        n = count_tokens(text[u_start:u_end])
+        if n <= max_tokens:
+            units.append((u_start, u_end, n))
+            continue
+        s_start = u_start
+        pieces = [s.end() for s in _SENTENCE_END_RE.finditer(text, u_start, u_end)] + [u_end]
+        for s_end in pieces:
+            units.extend(_split_tokens(text, s_start, s_end, max_tokens))
+            s_start = s_end
+    return units
+
+
+def _split_tokens(text: str, start: int, end: int, max_tokens: int) -> List[Tuple[int, int, int]]:
+    spans = [(m.start(), m.end()) for m in _TOKEN_RE.finditer(text, start, end)]
+    out: List[Tuple[int, int, int]] = []
+    for i in range(0, len(spans), max_tokens):
+        window = spans[i:i + max_tokens]
+        out.append((window[0][0], window[-1][1], len(window)))
+    return out
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+) -> List[Chunk]:
+    """Split a document into heading-aware chunks of at most max_tokens.
+
+    Consecutive chunks of the same section share up to overlap_tokens worth
+    of trailing lines. Offsets refer to the original text, so
+    text[chunk.start:chunk.end] == chunk.text.
+    """
+    if max_tokens <= 0:
+        raise ValueError("max_tokens must be positive")
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+
+    chunks: List[Chunk] = []
+    for title, sec_start, sec_end in _split_sections(text or ""):
+        units = _split_units(text, sec_start, sec_end, max_tokens)
+        current: List[Tuple[int, int, int]] = []
+        size = 0
+        fresh = 0  # units in `current` not already emitted in the previous chunk
+
+        def flush():
+            chunk_start, chunk_end = current[0][0], current[-1][1]
+            chunks.append(Chunk(
+                text=text[chunk_start:chunk_end],
+                start=chunk_start,
+                end=chunk_end,
+                section=title,
+                ordinal=len(chunks),
+            ))
+
+        for unit in units:
+            if current and size + unit[2] > max_tokens:
+                flush()
+                # Carry trailing units over as overlap
+                carried, carried_size = [], 0
+                for prev in reversed(current):
+                    if carried_size + prev[2] > overlap_tokens or carried_size + prev[2] + unit[2] > max_tokens:
+                        break
+                    carried.insert(0, prev)
+                    carried_size += prev[2]
+                current, size, fresh = carried, carried_size, 0
+            current.append(unit)
+            size += unit[2]
+            fresh += 1
+        if current and fresh:
+            flush()
+    return chunks
@@ -0,0 +1,131 @@
+import logging
+import math
+import os
+import re
+import zlib
+from collections import Counter
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .rerank import Doc, fit_to_budget
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_MERSENNE = np.uint64((1 << 61) - 1)
+
+# Rough characters per token when the model's tokenizer is not available
+# (SentencePiece/BPE models on French text average ~3.5).
+DEFAULT_CHARS_PER_TOKEN = 3.5
+
+
+def make_token_counter(tokenizer: str = "", chars_per_token: float = DEFAULT_CHARS_PER_TOKEN) -> Callable[[str], int]:
+    """Return a function counting tokens with the target model's tokenizer.
+
+    `tokenizer` is a local tokenizer.json path or a Hugging Face repo id
+    loaded with the `tokenizers` package (installed with chromadb). Without
+    one, or if loading fails, tokens are estimated from the character count.
+    """
+    if tokenizer:
+        try:
+            from tokenizers import Tokenizer
+
+            tok = Tokenizer.from_file(tokenizer) if os.path.exists(tokenizer) else Tokenizer.from_pretrained(tokenizer)
+            return lambda text: len(tok.encode(text or "", add_special_tokens=False).ids)
+        except Exception as e:
+            logging.warning(f"[context] Could not load tokenizer {tokenizer!r}, estimating tokens: {e}")
+    return lambda text: math.ceil(len(text or "") / chars_per_token)
+
+
+class MinHasher:
+    """MinHash signatures over word shingles for near-duplicate detection."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 7):
+        rng = np.random.default_rng(seed)
+        self.shingle_size = shingle_size
+        self._a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        words = _WORD_RE.findall((text or "").lower())
+        n = self.shingle_size
+        shingles = {" ".join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # (a * h + b) mod p, with a, h < 2^32 so the product cannot overflow
+        perm = (np.outer(hashes, self._a) + self._b) % _MERSENNE
+        return perm.min(axis=0)
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the two shingle sets."""
+        return float(np.mean(sig_a == sig_b))
+
+
+class ContextAssembler:
+    """Build the prompt context from ranked passages.
+
+    Passages are taken best first. Lines already used by an earlier passage
+    (site headers, menus) are dropped, passages that are near-duplicates of
+    one already kept are skipped, and the rest are packed until the token
+    budget of the target model is reached.
+    """
+
+    def __init__(
+        self,
+        budget_tokens: int = 1500,
+        count_tokens: Optional[Callable[[str], int]] = None,
+        dup_threshold: float = 0.8,
+        min_line_chars: int = 20,
+    ):
+        self.budget_tokens = budget_tokens
+        self.count_tokens = count_tokens or make_token_counter()
+        self.dup_threshold = dup_threshold
+        self.min_line_chars = min_line_chars
+        self._minhash = MinHasher()
+
+    def dedupe(self, docs: Sequence[Doc]) -> List[Doc]:
+        def _key(line: str) -> str:
+            key = line.strip().lower()
+            return key if len(key) >= self.min_line_chars else ""
+
+        # Lines shared by several passages are boilerplate (headers, menus)
+        line_counts = Counter(k for _, text, _ in docs for k in {_key(l) for l in (text or "").splitlines()} if k)
+
+        kept: List[Doc] = []
+        signatures: List[np.ndarray] = []
+        emitted = set()
+        for doc_id, text, meta in docs:
+            lines, core = [], []
+            for line in (text or "").splitlines():
+                key = _key(line)
+                if key in emitted:
+                    continue
+                if key:
+                    emitted.add(key)
+                lines.append(line)
+                if line_counts.get(key, 0) < 2:
+                    core.append(line)
+            text = "\n".join(lines).strip()
+            if not text:
+                continue
+            # Compare passages on their own content, not on the boilerplate they share
+            sig = self._minhash.signature("\n".join(core) or text)
+            if any(MinHasher.similarity(sig, other) >= self.dup_threshold for other in signatures):
+                continue
+            signatures.append(sig)
+            kept.append((doc_id, text, meta))
+        return kept
+
+    def assemble(self, docs: Sequence[Doc]) -> Tuple[str, List[Doc]]:
+        """Return the context string and the passages it contains."""
+        used = fit_to_budget(self.dedupe(docs), self.budget_tokens, self.count_tokens)
+        parts = []
+        for _, text, metadata in used:
+            # Handle None or missing metadata
+            if metadata and isinstance(metadata, dict):
+                source = metadata.get("source", "unknown")
+                section = metadata.get("section")
+            else:
+                source, section = "unknown", None
+            label = f"{source} > {section}" if section else source
+            parts.append(f"[{label}]\n{text}")
+        return "\n\n".join(parts), used
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+_KEY_BYTES = 16
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text before hashing so trivial whitespace/Unicode variants share a key."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+class EmbeddingCache:
+    """Size-bounded on-disk LRU cache of embeddings.
+
+    Entries are keyed by (model id, normalized text hash). Storage is three
+    memory-mapped arrays of `capacity` rows in `cache_dir/<model slug>/`:
+    float32 vectors, 16-byte key digests and int64 last-use ticks. The key
+    array doubles as the index: it is scanned on open and every read is
+    checked against it, so a slot overwritten by another process (the index
+    builder and the app share the cache) is a miss, never a wrong vector.
+    """
+
+    def __init__(self, cache_dir: str, model_id: str, capacity: int = 100_000):
+        self.model_id = model_id
+        self.capacity = capacity
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "_", model_id)
+        self.path = os.path.join(cache_dir, slug)
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._slots: "OrderedDict[bytes, int]" = OrderedDict()  # LRU order, oldest first
+        self._free: List[int] = []
+        self._tick = 0
+        self.dim: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._open()
+
+    # ---- storage ----
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _open(self):
+        meta_path = self._file("meta.json")
+        if not os.path.exists(meta_path):
+            return
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get("model_id") != self.model_id or meta.get("capacity") != self.capacity:
+            # Different model or size: start over rather than mix layouts
+            return
+        self.dim = int(meta["dim"])
+        self._map(mode="r+")
+        self._index()
+
+    def _index(self):
+        """Rebuild the LRU order and free list from the mapped key and tick arrays."""
+        ticks = np.asarray(self._ticks)
+        occupied = np.flatnonzero(np.any(np.asarray(self._keys) != 0, axis=1))
+        for slot in occupied[np.argsort(ticks[occupied], kind="stable")]:
+            self._slots[bytes(self._keys[slot])] = int(slot)
+        self._free = sorted(set(range(self.capacity)) - set(self._slots.values()), reverse=True)
+        self._tick = int(ticks.max()) if len(ticks) else 0
+
+    def _create(self, dim: int):
+        # Another process (index builder or app) may have created the cache since we opened it
+        self._open()
+        if self.dim is not None:
+            return
+        row_bytes = {"vectors.f32": 4 * dim, "keys.bin": _KEY_BYTES, "ticks.i64": 8}
+        reuse = all(
+            os.path.exists(self._file(name)) and os.path.getsize(self._file(name)) == self.capacity * size
+            for name, size in row_bytes.items()
+        )
+        self.dim = dim
+        # Never truncate files of the same layout: their writer may not have saved meta.json yet
+        self._map(mode="r+" if reuse else "w+")
+        if reuse:
+            self._index()
+        else:
+            self._free = list(range(self.capacity - 1, -1, -1))
+        tmp = self._file(f"meta.json.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model_id": self.model_id, "dim": dim, "capacity": self.capacity}, f)
+        os.replace(tmp, self._file("meta.json"))
+
+    def _map(self, mode: str):
+        self._vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode=mode, shape=(self.capacity, self.dim))
+        self._keys = np.memmap(self._file("keys.bin"), dtype=np.uint8, mode=mode, shape=(self.capacity, _KEY_BYTES))
+        self._ticks = np.memmap(self._file("ticks.i64"), dtype=np.int64, mode=mode, shape=(self.capacity,))
+
+    def _key(self, text: str) -> bytes:
+        h = hashlib.blake2b(digest_size=_KEY_BYTES)
+        h.update(self.model_id.encode("utf-8"))
+        h.update(b"\0")
+        h.update(normalize_text(text).encode("utf-8"))
+        return h.digest()
+
+    # ---- public API ----
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return the cached vector for each text, or None on a miss."""
+        out: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for text in texts:
+                key = self._key(text)
+                slot = self._slots.get(key)
+                vec = None
+                if slot is not None and bytes(self._keys[slot]) == key:
+                    vec = np.array(self._vectors[slot])
+                    if bytes(self._keys[slot]) != key:
+                        vec = None
+                if vec is None:
+                    if slot is not None:
+                        # Slot was reused by another process
+                        del self._slots[key]
+                    self.misses += 1
+                else:
+                    self._tick += 1
+                    self._ticks[slot] = self._tick
+                    self._slots.move_to_end(key)
+                    self.hits += 1
+                out.append(vec)
+        return out
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence) -> None:
+        """Store vectors, evicting least recently used entries when full."""
+        if not texts:
+            return
+        with self._lock:
+            if self.dim is None:
+                self._create(len(vectors[0]))
+            for text, vec in zip(texts, vectors):
+                if len(vec) != self.dim:
+                    continue
+                key = self._key(text)
+                slot = self._slots.pop(key, None)
+                if slot is None:
+                    if self._free:
+                        slot = self._free.pop()
+                    else:
+                        _, slot = self._slots.popitem(last=False)
+                self._tick += 1
+                # Vector first, key last: readers validate against the key
+                self._keys[slot] = 0
+                self._vectors[slot] = np.asarray(vec, dtype=np.float32)
+                self._ticks[slot] = self._tick
+                self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+                self._slots[key] = slot
+
+    def flush(self) -> None:
+        with self._lock:
+            if self.dim is not None:
+                self._vectors.flush()
+                self._keys.flush()
+                self._ticks.flush()
+
+    def __len__(self) -> int:
+        return len(self._slots)
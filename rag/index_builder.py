@@ -1,11 +1,11 @@
-import os
-import uuid
 import argparse
+import hashlib
 import pathlib
-import shutil
+import threading
 import time
-import gc
-from typing import List
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
 from tqdm import tqdm
 
@@ -25,6 +25,9 @@ try:
 except ImportError:
     PDF_AVAILABLE = False
 
+from configs.config import load_config
+from . import index_versions
+from .chunking import chunk_text
 from .vector_store import VectorStore
 
 SUPPORTED_EXTENSIONS = {".txt", ".md"}
@@ -48,47 +51,57 @@ def _read_pdf_file(path: Path) -> str:
     return "\n".join(texts)
 
 
-def load_local_docs(docs_dir: str):
-    texts, metas, ids = [], [], []
-    base = pathlib.Path(docs_dir)
-    base.mkdir(parents=True, exist_ok=True)
+def _read_document(path: Path) -> str:
+    """Read a supported document (txt/md/pdf) as text."""
+    if path.suffix.lower() == ".pdf":
+        return _read_pdf_file(path)
+    return _read_text_file(path)
 
-    # DEBUG
-    print(f"\n=== LOADING DOCUMENTS ===")
-    print(f"docs_dir = {docs_dir}")
-    print(f"base = {base.absolute()}")
-    print(f"SUPPORTED_EXTENSIONS = {SUPPORTED_EXTENSIONS}")
 
-    all_files = list(base.glob("**/*"))
-    files_only = [f for f in all_files if f.is_file()]
-    print(f"Total files found: {len(files_only)}")
+def _content_hash(data: bytes, chunk_tokens: int, chunk_overlap: int) -> str:
+    """Hash document content together with the chunking settings it was indexed with."""
+    h = hashlib.sha256(data)
+    h.update(f"|chunks={chunk_tokens}/{chunk_overlap}".encode("utf-8"))
+    return h.hexdigest()
 
-    # Count by extension
-    from collections import Counter
-    exts = Counter([f.suffix.lower() for f in files_only])
-    print(f"Files by extension: {dict(exts)}")
-    print("=========================\n")
 
-    for p in base.glob("**/*"):
-        if not p.is_file():
-            continue
+def scan_local_docs(docs_dir: str) -> Dict[str, Path]:
+    """Map each supported file's source name (path relative to docs_dir) to its path."""
+    base = pathlib.Path(docs_dir)
+    base.mkdir(parents=True, exist_ok=True)
+    files_only = [f for f in base.glob("**/*") if f.is_file()]
+    return {
+        str(p.relative_to(base)): p
+        for p in sorted(files_only)
+        if p.suffix.lower() in SUPPORTED_EXTENSIONS
+    }
 
-        if p.suffix.lower() in SUPPORTED_EXTENSIONS:
-            try:
-                if p.suffix.lower() in {".txt", ".md"}:
-                    t = _read_text_file(p)
-                elif p.suffix.lower() == ".pdf":
-                    t = _read_pdf_file(p)
-                else:
-                    continue
-                texts.append(t)
-                metas.append({"source": str(p.relative_to(base))})
-                ids.append(str(uuid.uuid4()))
-            except Exception as e:
-                print(f"Failed to read {p}: {e}")
 
-    print(f"\nSuccessfully loaded {len(texts)} documents\n")
-    return ids, texts, metas
+def iter_chunks(
+    docs: Iterable[Tuple[str, str, dict]],
+    max_tokens: int,
+    overlap_tokens: int,
+    on_stage: Optional[Callable[[str, float], None]] = None,
+) -> Iterator[Tuple[str, str, dict]]:
+    """Lazily split (id, text, metadata) documents into (chunk id, text, metadata) chunks."""
+    for parent_id, text, meta in docs:
+        start = time.perf_counter()
+        chunks = chunk_text(text, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+        if on_stage is not None:
+            on_stage("chunk", time.perf_counter() - start)
+        for chunk in chunks:
+            # Embed the section title with the passage so heading context is not lost
+            doc = chunk.text
+            if chunk.section and not doc.lstrip("# ").startswith(chunk.section):
+                doc = f"{chunk.section}\n{doc}"
+            yield f"{parent_id}:{chunk.ordinal}", doc, {
+                **meta,
+                "parent_id": parent_id,
+                "chunk_index": chunk.ordinal,
+                "start": chunk.start,
+                "end": chunk.end,
+                "section": chunk.section,
+            }
 
 
 def crawl_urls(urls):
@@ -103,61 +116,255 @@ def crawl_urls(urls):
             text = soup.get_text(separator="\n", strip=True)
             texts.append(text)
             metas.append({"source": url})
-            ids.append(str(uuid.uuid4()))
+            ids.append(url)
         except Exception as e:
             print(f"Failed to crawl {url}: {e}")
     return ids, texts, metas
 
 
-def main(docs_dir: str, index_dir: str, urls=None):
-    """Build/rebuild the RAG index from local docs and optional URLs."""
+class BuildStats:
+    """Seconds spent in each stage of an index build, with document/byte/chunk counts.
 
-    print("Initializing VectorStore...")
+    Reading, chunking, embedding and writing are streamed, and "embed" adds
+    up every embedding worker, so stage times can sum to more than the wall
+    time.
+    """
 
-    # Delete and recreate collection for clean slate
-    try:
-        import chromadb
-        from chromadb.utils import embedding_functions
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.wall = 0.0
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
 
-        client = chromadb.PersistentClient(path=index_dir)
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.seconds[stage] += seconds
 
-        # Try to delete existing collection
+    def count(self, key: str, n: int = 1):
+        with self._lock:
+            self.counts[key] += n
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
         try:
-            client.delete_collection(name="esilv_docs")
-            print("Deleted existing collection 'esilv_docs'")
-        except:
-            print("No existing collection found (this is fine)")
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def finish(self) -> "BuildStats":
+        self.wall = time.perf_counter() - self.t0
+        return self
+
+    def as_dict(self) -> Dict:
+        wall = self.wall or (time.perf_counter() - self.t0)
+        docs, mb = self.counts["documents"], self.counts["bytes"] / 1e6
+        return {
+            "wall_s": round(wall, 3),
+            "stages_s": {stage: round(sec, 3) for stage, sec in self.seconds.items()},
+            "counts": dict(self.counts),
+            "docs_per_s": round(docs / wall, 2) if wall else 0.0,
+            "mb_per_s": round(mb / wall, 3) if wall else 0.0,
+        }
+
+    def summary(self) -> str:
+        d = self.as_dict()
+        lines = [f"{'stage':<12}{'seconds':>10}{'% wall':>8}"]
+        for stage, sec in sorted(d["stages_s"].items(), key=lambda kv: -kv[1]):
+            lines.append(f"{stage:<12}{sec:>10.2f}{sec / d['wall_s'] * 100 if d['wall_s'] else 0:>7.0f}%")
+        lines.append(
+            f"{self.counts['documents']} documents ({self.counts['bytes'] / 1e6:.1f} MB), "
+            f"{self.counts['chunks']} chunks in {d['wall_s']:.1f} s: "
+            f"{d['docs_per_s']} docs/s, {d['mb_per_s']} MB/s"
+        )
+        return "\n".join(lines)
+
+
+def main(
+    docs_dir: str,
+    index_dir: str,
+    urls=None,
+    chunk_tokens: int = 200,
+    chunk_overlap: int = 40,
+    full: bool = False,
+    batch_size: int = 64,
+    workers: int = 2,
+    cache_dir: Optional[str] = None,
+    cache_size: int = 100_000,
+) -> BuildStats:
+    """Build/update the RAG index from local docs and optional URLs.
 
-    except Exception as e:
-        print(f"Note: Could not access ChromaDB client: {e}")
+    By default the update is incremental: documents whose content hash is
+    unchanged are skipped, changed ones are re-embedded and sources that
+    disappeared are removed. Pass full=True to drop and rebuild everything.
 
-    # Create fresh VectorStore (creates new collection)
-    vs = VectorStore(index_dir)
-    print("Created fresh VectorStore")
+    The build never touches the live index: it works on a copy in a new
+    version directory (empty with full=True), which is validated and then
+    published by flipping index_dir/CURRENT, so the app keeps answering
+    from the previous version until the switch (see index_versions).
 
-    # Load local documents
-    ids, texts, metas = load_local_docs(docs_dir)
-    print(f"Loaded {len(texts)} local documents from {docs_dir}")
+    Returns the time spent in each stage, also printed at the end.
+    """
+    stats = BuildStats()
+    with stats.time("snapshot"):
+        version, build_dir = index_versions.create_version(index_dir, copy_current=not full)
+    print(f"Building index version {version} in {build_dir}")
+    vs = VectorStore(build_dir, cache_dir=cache_dir, cache_size=cache_size, watch=False)
+    try:
+        changed = _update_index(vs, docs_dir, urls, chunk_tokens, chunk_overlap, full, batch_size, workers, stats)
+        if changed:
+            with stats.time("validate"):
+                _validate_index(vs)
+    except BaseException:
+        vs.close()
+        index_versions.discard(index_dir, version)
+        raise
+    vs.close()
+
+    with stats.time("publish"):
+        if not changed and index_versions.current_version(index_dir):
+            index_versions.discard(index_dir, version)
+            print("Live index unchanged; discarded the new version")
+        else:
+            index_versions.publish(index_dir, version)
+            removed = index_versions.prune(index_dir, current=version)
+            print(f"Published index version {version}" + (f" (removed {len(removed)} old versions)" if removed else ""))
+    print(stats.finish().summary())
+    return stats
+
+
+def _validate_index(vs: VectorStore):
+    """Refuse to publish an index that could not answer queries."""
+    sample = next(vs.iter_documents(page_size=1), None)
+    if sample is None:
+        # Never replace a working index with an empty one
+        raise RuntimeError("Index validation failed: the collection is empty")
+    if not vs.query(sample[1][:200], k=1):
+        raise RuntimeError("Index validation failed: a sample query returned no results")
+    if vs.hybrid and vs.bm25 is None:
+        raise RuntimeError("Index validation failed: BM25 index is missing")
+
+
+def _update_index(
+    vs: VectorStore,
+    docs_dir: str,
+    urls,
+    chunk_tokens: int,
+    chunk_overlap: int,
+    full: bool,
+    batch_size: int,
+    workers: int,
+    stats: BuildStats,
+) -> bool:
+    """Apply new/changed/deleted documents to vs; True if the index changed."""
+    with stats.time("scan"):
+        indexed = {} if full else vs.source_hashes()
+    print(f"Opened VectorStore ({len(indexed)} sources already indexed)")
+
+    # (source, path or already-fetched text, metadata) for every new/changed document
+    pending: List[Tuple[str, object, dict]] = []
+    current = set()
+    unchanged = 0
+
+    # Local documents: hash raw bytes first so unchanged files are never parsed
+    with stats.time("scan"):
+        for source, path in scan_local_docs(docs_dir).items():
+            current.add(source)
+            try:
+                digest = _content_hash(path.read_bytes(), chunk_tokens, chunk_overlap)
+            except Exception as e:
+                print(f"Failed to read {path}: {e}")
+                continue
+            if indexed.get(source) == digest:
+                unchanged += 1
+                continue
+            pending.append((source, path, {"source": source, "content_hash": digest}))
+    print(f"Found {len(pending)} new/changed local documents in {docs_dir} ({unchanged} unchanged)")
 
     # Optionally crawl URLs
     if urls:
-        uids, utxts, umetas = crawl_urls(urls)
-        ids += uids
-        texts += utxts
-        metas += umetas
+        with stats.time("crawl"):
+            uids, utxts, umetas = crawl_urls(urls)
+        current.update(uids)
+        for uid, utxt, umeta in zip(uids, utxts, umetas):
+            digest = _content_hash(utxt.encode("utf-8"), chunk_tokens, chunk_overlap)
+            if indexed.get(uid) == digest:
+                unchanged += 1
+                continue
+            pending.append((uid, utxt, {**umeta, "content_hash": digest}))
         print(f"Crawled {len(uids)} URLs")
 
-    # Index documents
-    if texts:
-        vs.add_docs(ids, texts, metas)
-        print(f"SUCCESS: Indexed {len(texts)} documents into {index_dir}")
+    # Drop stale chunks of changed documents and of documents that disappeared
+    removed = set(indexed) - current
+    stale = removed | ({source for source, _, _ in pending} & set(indexed))
+    if stale:
+        with stats.time("delete"):
+            vs.delete_sources(stale)
+        print(f"Removed chunks of {len(stale)} sources ({len(removed)} deleted, {len(stale) - len(removed)} changed)")
+
+    loaded = 0
+
+    def _iter_pending():
+        # Documents are read one at a time so only the in-flight batches stay in memory
+        nonlocal loaded
+        for source, item, meta in pending:
+            if isinstance(item, Path):
+                try:
+                    with stats.time(f"read_{item.suffix.lower().lstrip('.')}"):
+                        size = item.stat().st_size
+                        item = _read_document(item)
+                except Exception as e:
+                    print(f"Failed to read {item}: {e}")
+                    continue
+            else:
+                size = len(item.encode("utf-8"))
+            loaded += 1
+            stats.count("documents")
+            stats.count("bytes", size)
+            yield source, item, meta
+
+    # Chunk, embed and write in a single streaming pass
+    chunks = iter_chunks(_iter_pending(), chunk_tokens, chunk_overlap, on_stage=stats.add)
+    n_chunks = vs.add_stream(chunks, batch_size=batch_size, workers=workers, on_stage=stats.add)
+    stats.count("chunks", n_chunks)
+
+    changed = bool(n_chunks or stale or vs.bm25 is None)
+    if changed:
+        with stats.time("bm25"):
+            n_bm25 = vs.rebuild_bm25()
+        print(f"Rebuilt BM25 index over {n_bm25} chunks")
+
+    if n_chunks:
+        print(f"SUCCESS: Indexed {n_chunks} chunks from {loaded} documents")
+    elif unchanged:
+        print(f"SUCCESS: Index already up to date ({unchanged} unchanged documents)")
     else:
         print("WARNING: No documents found to index.")
+    return changed
 
 if __name__ == "__main__":
+    rag_cfg = load_config()["rag"]
     ap = argparse.ArgumentParser(description="Build/update RAG index from local docs and optional URLs")
     ap.add_argument("--docs-dir", required=True, help="Directory containing . txt/. md/. pdf files")
     ap.add_argument("--index-dir", required=True, help="Directory to store the vector index")
     ap.add_argument("--urls", nargs="*", default=None, help="Optional list of URLs to crawl and index")
+    ap.add_argument("--chunk-tokens", type=int, default=rag_cfg["chunk_max_tokens"], help="Maximum tokens per chunk")
+    ap.add_argument("--chunk-overlap", type=int, default=rag_cfg["chunk_overlap_tokens"], help="Tokens shared between consecutive chunks")
+    ap.add_argument("--full", action="store_true", help="Drop the collection and re-embed every document")
+    ap.add_argument("--batch-size", type=int, default=rag_cfg["embed_batch_size"], help="Chunks embedded per batch")
+    ap.add_argument("--workers", type=int, default=rag_cfg["embed_workers"], help="Embedding worker threads")
+    ap.add_argument("--cache-dir", default=rag_cfg["embedding_cache_dir"], help="Embedding cache directory ('' to disable)")
     args = ap.parse_args()
-    main(args.docs_dir, args.index_dir, args.urls)
\ No newline at end of file
+    main(
+        args.docs_dir,
+        args.index_dir,
+        args.urls,
+        args.chunk_tokens,
+        args.chunk_overlap,
+        full=args.full,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        cache_dir=args.cache_dir or None,
+        cache_size=rag_cfg["embedding_cache_size"],
+    )
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""Versioned index directories.
+
+Each build goes to its own directory, index_dir/versions/<version>, and
+becomes live when index_dir/CURRENT (a one-line file holding the version
+name) is replaced atomically. Readers never see a half-built index: they
+keep using the previous version until the pointer flips, then switch on
+their next query (see VectorStore).
+
+An index_dir without CURRENT is a legacy, unversioned index and is used
+as is; its version is the id in its BUILD_ID file, if any.
+"""
+import os
+import shutil
+import time
+import uuid
+from typing import List, Optional, Tuple
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+# Build id written by unversioned builds
+LEGACY_BUILD_ID_FILE = "BUILD_ID"
+
+
+def pointer_path(index_dir: str) -> str:
+    return os.path.join(index_dir, CURRENT_FILE)
+
+
+def version_path(index_dir: str, version: str) -> str:
+    return os.path.join(index_dir, VERSIONS_DIR, version)
+
+
+def current_version(index_dir: str) -> str:
+    """Name of the live version ('' if index_dir is not versioned yet)."""
+    try:
+        with open(pointer_path(index_dir), encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def resolve(index_dir: str) -> Tuple[str, str]:
+    """Return (directory to open, version name) for the live index."""
+    version = current_version(index_dir)
+    if version and os.path.isdir(version_path(index_dir, version)):
+        return version_path(index_dir, version), version
+    try:
+        with open(os.path.join(index_dir, LEGACY_BUILD_ID_FILE), encoding="utf-8") as f:
+            return index_dir, f.read().strip()
+    except OSError:
+        return index_dir, ""
+
+
+def _has_legacy_index(index_dir: str) -> bool:
+    return any(name not in (VERSIONS_DIR, CURRENT_FILE) for name in os.listdir(index_dir))
+
+
+def create_version(index_dir: str, copy_current: bool = True) -> Tuple[str, str]:
+    """Create a new version directory and return (version, path).
+
+    With copy_current the live index (versioned or legacy) is copied in, so
+    an incremental build only applies the changes.
+    """
+    os.makedirs(os.path.join(index_dir, VERSIONS_DIR), exist_ok=True)
+    # Names sort by creation time (prune relies on it)
+    now = time.time()
+    version = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}-{uuid.uuid4().hex[:4]}"
+    path = version_path(index_dir, version)
+    source, live = resolve(index_dir)
+    if copy_current and (live or _has_legacy_index(index_dir)):
+        ignore = shutil.ignore_patterns(VERSIONS_DIR, CURRENT_FILE, CURRENT_FILE + ".tmp")
+        shutil.copytree(source, path, ignore=ignore)
+    else:
+        os.makedirs(path)
+    return version, path
+
+
+def publish(index_dir: str, version: str) -> None:
+    """Make `version` the live index (atomic for readers)."""
+    tmp = pointer_path(index_dir) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, pointer_path(index_dir))
+
+
+def discard(index_dir: str, version: str) -> None:
+    shutil.rmtree(version_path(index_dir, version), ignore_errors=True)
+
+
+def list_versions(index_dir: str) -> List[str]:
+    root = os.path.join(index_dir, VERSIONS_DIR)
+    return sorted(os.listdir(root)) if os.path.isdir(root) else []
+
+
+def prune(index_dir: str, keep: int = 2, current: Optional[str] = None) -> List[str]:
+    """Delete all but the `keep` newest previous versions; the live one is always kept.
+
+    Older versions are kept for a while because other processes may still
+    have them open until their next query. Returns the removed versions.
+    """
+    current = current or current_version(index_dir)
+    previous = [v for v in list_versions(index_dir) if v != current]
+    removed = previous[: max(0, len(previous) - keep)]
+    for version in removed:
+        discard(index_dir, version)
+    return removed
@@ -0,0 +1,77 @@
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .chunking import count_tokens
+
+Doc = Tuple[str, str, dict]
+
+
+def _unit_rows(vectors) -> np.ndarray:
+    m = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(m, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+def mmr_order(query_vec, doc_vecs, lambda_mult: float = 0.7) -> List[int]:
+    """Order candidates by maximal marginal relevance.
+
+    Each step picks the candidate maximising
+    lambda * sim(query, d) - (1 - lambda) * max sim(d, already selected),
+    so near-identical passages sink below distinct ones.
+    """
+    if len(doc_vecs) == 0:
+        return []
+    docs = _unit_rows(doc_vecs)
+    relevance = docs @ _unit_rows(query_vec)
+    pairwise = docs @ docs.T
+    remaining = list(range(len(docs)))
+    order: List[int] = []
+    redundancy = np.zeros(len(docs), dtype=np.float32)
+    while remaining:
+        scores = lambda_mult * relevance[remaining] - (1 - lambda_mult) * redundancy[remaining]
+        best = remaining[int(np.argmax(scores))]
+        order.append(best)
+        remaining.remove(best)
+        redundancy = np.maximum(redundancy, pairwise[best])
+    return order
+
+
+def fit_to_budget(docs: Sequence[Doc], budget_tokens: int, count_fn: Callable[[str], int] = count_tokens) -> List[Doc]:
+    """Keep docs in order while their total token count fits the budget.
+
+    Passages that do not fit are skipped so a shorter one further down can
+    still be used. The best passage is always kept, cut to the budget.
+    """
+    kept: List[Doc] = []
+    used = 0
+    for doc in docs:
+        n = count_fn(doc[1])
+        if used + n <= budget_tokens:
+            kept.append(doc)
+            used += n
+    if not kept and docs:
+        doc_id, text, meta = docs[0]
+        words = text.split()[:budget_tokens]
+        while len(words) > 1 and count_fn(" ".join(words)) > budget_tokens:
+            words = words[: int(len(words) * 0.8)]
+        kept.append((doc_id, " ".join(words), meta))
+    return kept
+
+
+class Reranker:
+    """CPU reranking stage: MMR over embeddings, then an optional token budget cut."""
+
+    def __init__(self, lambda_mult: float = 0.7, token_budget: Optional[int] = None):
+        self.lambda_mult = lambda_mult
+        self.token_budget = token_budget
+
+    def rerank(self, query_vec, docs: Sequence[Doc], doc_vecs) -> List[Doc]:
+        if not docs:
+            return []
+        order = mmr_order(query_vec, doc_vecs, self.lambda_mult)
+        ranked = [docs[i] for i in order]
+        if self.token_budget is None:
+            return ranked
+        return fit_to_budget(ranked, self.token_budget)
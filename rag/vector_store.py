@@ -1,83 +1,360 @@
 import os
-from typing import List, Tuple
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import chromadb
 from chromadb.utils import embedding_functions
+from tqdm import tqdm
 
-class VectorStore:
-    def __init__(self, index_dir: str):
-        os.makedirs(index_dir, exist_ok=True)
-        self.client = chromadb.PersistentClient(path=index_dir)
-        emb_fn = embedding_functions.DefaultEmbeddingFunction()
+from services import tracing
+from . import index_versions
+from .bm25 import BM25Index
+from .embedding_cache import EmbeddingCache
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+# Identifies chromadb's DefaultEmbeddingFunction in the embedding cache
+EMBEDDING_MODEL_ID = "chroma-default/all-MiniLM-L6-v2"
+
+
+def _rrf(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """Reciprocal-rank fusion of several ranked id lists."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class _IndexHandle:
+    """One opened index directory: Chroma client, collection and BM25 index.
+
+    Queries hold a reference while they run; a retired handle is closed once
+    the last of them finishes.
+    """
+
+    def __init__(self, path: str, version: str, embedding_function, hybrid: bool):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.version = version
+        self.client = chromadb.PersistentClient(path=path)
         self.collection = self.client.get_or_create_collection(
             name="esilv_docs",
-            embedding_function=emb_fn
+            embedding_function=embedding_function
         )
+        self.bm25_dir = os.path.join(path, "bm25")
+        self.bm25: Optional[BM25Index] = None
+        if hybrid and os.path.exists(os.path.join(self.bm25_dir, "meta.json")):
+            try:
+                self.bm25 = BM25Index.load(self.bm25_dir)
+            except Exception as e:
+                print(f"[WARNING] Could not load BM25 index, using dense retrieval only: {e}")
+        self._lock = threading.Lock()
+        self._users = 0
+        self._retired = False
 
-    def add_docs(self, doc_ids: List[str], texts: List[str], metadatas: List[dict]):
-        if not texts:
-            return
+    def acquire(self):
+        with self._lock:
+            self._users += 1
 
-        # ✅ DEBUG: Check what we're adding
-        print(f"[DEBUG VectorStore. add_docs] Adding {len(doc_ids)} documents")
-        print(f"[DEBUG] Sample metadata: {metadatas[0] if metadatas else 'None'}")
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            done = self._retired and self._users == 0
+        if done:
+            self.close()
 
-        self.collection.add(ids=doc_ids, documents=texts, metadatas=metadatas)
+    def retire(self):
+        with self._lock:
+            self._retired = True
+            done = self._users == 0
+        if done:
+            self.close()
 
-        # ✅ Verify documents were added
-        count = self.collection.count()
-        print(f"[DEBUG] Collection now has {count} documents")
+    def close(self):
+        self.bm25 = None
+        close = getattr(self.client, "close", None)  # chromadb >= 1.0
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                print(f"[WARNING] Could not close index {self.path}: {e}")
 
-    def query(self, text: str, k: int = 5) -> List[Tuple[str, str, dict]]:
-        # ✅ Check collection size before querying
-        count = self.collection.count()
-        print(f"[DEBUG VectorStore.query] Collection has {count} documents")
 
-        if count == 0:
-            print("[WARNING] Collection is empty!  No documents to query.")
-            return []
+class VectorStore:
+    def __init__(
+        self,
+        index_dir: str,
+        cache_dir: Optional[str] = None,
+        cache_size: int = 100_000,
+        hybrid: bool = True,
+        embedding_function=None,
+        cache: Optional[EmbeddingCache] = None,
+        watch: bool = True,
+    ):
+        """`embedding_function` and `cache` let several stores (e.g. successive
+        index reloads) share one loaded model and one embedding cache; by
+        default each store opens its own.
 
-        res = self.collection.query(query_texts=[text], n_results=k)
+        index_dir may be versioned (see index_versions): the live version is
+        opened and, with `watch`, a newly published version is picked up on
+        the next query while the previous one is released.
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        self.index_dir = index_dir
+        self.hybrid = hybrid
+        self._watch = watch
+        self._emb_fn = embedding_function or embedding_functions.DefaultEmbeddingFunction()
+        if cache is None and cache_dir:
+            cache = EmbeddingCache(cache_dir, EMBEDDING_MODEL_ID, cache_size)
+        self.cache = cache
+        self._swap_lock = threading.Lock()
+        self._pointer_mtime = self._pointer_stamp()
+        self._handle = _IndexHandle(*index_versions.resolve(index_dir), self._emb_fn, hybrid)
 
-        # ✅ DEBUG: Check what ChromaDB returned
-        print(f"[DEBUG] Query result keys: {res.keys()}")
-        print(f"[DEBUG] IDs: {res.get('ids', [[]])[0][:3] if res.get('ids') else 'None'}")
-        print(f"[DEBUG] Documents type: {type(res.get('documents'))}")
-        print(f"[DEBUG] Metadatas type:  {type(res.get('metadatas'))}")
+    # The live index; these change when a new version is published
+    @property
+    def client(self):
+        return self._handle.client
 
-        docs = []
+    @property
+    def collection(self):
+        return self._handle.collection
+
+    @property
+    def bm25(self) -> Optional[BM25Index]:
+        return self._handle.bm25
+
+    @property
+    def version(self) -> str:
+        # Answer caches key on this, so check for a newer published version first
+        self.refresh()
+        return self._handle.version
 
-        # ✅ Safety checks for each field
-        if not res.get("ids") or not res["ids"]:
-            print("[WARNING] No IDs returned from query")
-            return []
+    def _pointer_stamp(self) -> Optional[int]:
+        try:
+            return os.stat(index_versions.pointer_path(self.index_dir)).st_mtime_ns
+        except OSError:
+            return None
 
-        if not res.get("documents") or not res["documents"]:
-            print("[WARNING] No documents returned from query")
-            return []
+    def refresh(self) -> bool:
+        """Switch to the published version if it changed; True if it did."""
+        if not self._watch:
+            return False
+        stamp = self._pointer_stamp()
+        if stamp == self._pointer_mtime:
+            return False
+        with self._swap_lock:
+            if stamp == self._pointer_mtime:
+                return False
+            path, version = index_versions.resolve(self.index_dir)
+            self._pointer_mtime = stamp
+            if path == self._handle.path:
+                return False
+            old, self._handle = self._handle, _IndexHandle(path, version, self._emb_fn, self.hybrid)
+        print(f"[VectorStore] Switched to index version {version}")
+        old.retire()
+        return True
 
-        if not res.get("metadatas") or not res["metadatas"]:
-            print("[WARNING] No metadatas returned from query")
-            return []
+    @contextmanager
+    def _use(self):
+        self.refresh()
+        with self._swap_lock:
+            handle = self._handle
+            handle.acquire()
+        try:
+            yield handle
+        finally:
+            handle.release()
 
-        # ✅ Build results with validation
-        num_results = len(res["ids"][0])
-        print(f"[DEBUG] Processing {num_results} results")
+    def close(self):
+        self._handle.retire()
 
-        for i in range(num_results):
-            doc_id = res["ids"][0][i]
-            text_content = res["documents"][0][i] if i < len(res["documents"][0]) else None
-            metadata = res["metadatas"][0][i] if i < len(res["metadatas"][0]) else None
+    def embed(self, texts: List[str]) -> List:
+        """Embed texts with the collection's embedding model, reusing cached vectors."""
+        with tracing.span("embed", texts=len(texts)) as span:
+            if self.cache is None:
+                return self._emb_fn(texts)
+            vectors = self.cache.get_many(texts)
+            missing = [i for i, v in enumerate(vectors) if v is None]
+            span.set(cache_hits=len(texts) - len(missing))
+            if missing:
+                fresh = self._emb_fn([texts[i] for i in missing])
+                self.cache.put_many([texts[i] for i in missing], fresh)
+                for i, v in zip(missing, fresh):
+                    vectors[i] = v
+            return vectors
 
-            # ✅ Skip invalid results
+    def add_stream(
+        self,
+        docs: Iterable[Tuple[str, str, dict]],
+        batch_size: int = 64,
+        workers: int = 2,
+        progress: bool = True,
+        on_stage: Optional[Callable[[str, float], None]] = None,
+    ) -> int:
+        """Embed and write (id, text, metadata) tuples batch by batch.
+
+        Batches are embedded on a pool of `workers` threads (ONNX releases the
+        GIL) and written to the collection as soon as each one finishes. At
+        most 2 * workers batches are held in memory, whatever the corpus size.
+        on_stage, if given, is called with ("embed" | "write", seconds) for
+        each batch. Returns the number of documents written.
+        """
+        batches = _batched(docs, max(1, batch_size))
+        first = next(batches, None)
+        if first is None:
+            return 0
+
+        written = 0
+        bar = tqdm(desc="Embedding", unit="chunk", disable=not progress)
+
+        def _embed(batch):
+            start = time.perf_counter()
+            embeddings = self.embed([text for _, text, _ in batch])
+            if on_stage is not None:
+                on_stage("embed", time.perf_counter() - start)
+            return batch, embeddings
+
+        def _write(batch, embeddings):
+            nonlocal written
+            start = time.perf_counter()
+            self.collection.add(
+                ids=[doc_id for doc_id, _, _ in batch],
+                documents=[text for _, text, _ in batch],
+                metadatas=[meta for _, _, meta in batch],
+                embeddings=[e.tolist() if hasattr(e, "tolist") else list(e) for e in embeddings],
+            )
+            if on_stage is not None:
+                on_stage("write", time.perf_counter() - start)
+            written += len(batch)
+            bar.update(len(batch))
+
+        # First batch runs inline so the model is loaded once before fanning out
+        _write(*_embed(first))
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            in_flight = set()
+            for batch in batches:
+                if len(in_flight) >= 2 * max(1, workers):
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        _write(*fut.result())
+                in_flight.add(pool.submit(_embed, batch))
+            for fut in in_flight:
+                _write(*fut.result())
+
+        bar.close()
+        if self.cache is not None:
+            self.cache.flush()
+        return written
+
+    def source_hashes(self, page_size: int = 5000) -> Dict[str, str]:
+        """Map each indexed source to the content hash it was indexed with."""
+        hashes: Dict[str, str] = {}
+        offset = 0
+        while True:
+            res = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            metas = res.get("metadatas") or []
+            for m in metas:
+                if m and "source" in m:
+                    hashes[m["source"]] = m.get("content_hash", "")
+            if len(metas) < page_size:
+                return hashes
+            offset += page_size
+
+    def delete_sources(self, sources: Iterable[str], batch_size: int = 500):
+        """Delete every chunk belonging to the given sources."""
+        sources = list(sources)
+        for i in range(0, len(sources), batch_size):
+            self.collection.delete(where={"source": {"$in": sources[i:i + batch_size]}})
+
+    def iter_documents(self, page_size: int = 1000) -> Iterator[Tuple[str, str]]:
+        """Yield (id, text) for every chunk in the collection."""
+        offset = 0
+        while True:
+            res = self.collection.get(include=["documents"], limit=page_size, offset=offset)
+            ids = res.get("ids") or []
+            for doc_id, text in zip(ids, res.get("documents") or []):
+                yield doc_id, text or ""
+            if len(ids) < page_size:
+                return
+            offset += page_size
+
+    def rebuild_bm25(self) -> int:
+        """Rebuild the BM25 index from the collection's current contents."""
+        index = BM25Index.build(self.iter_documents())
+        index.save(self._handle.bm25_dir)
+        if self.hybrid:
+            self._handle.bm25 = index
+        return len(index.doc_ids)
+
+    def _query_embedding(self, text: str) -> List[List[float]]:
+        vec = self.embed([text])[0]
+        return [vec.tolist() if hasattr(vec, "tolist") else list(vec)]
+
+    def query(self, text: str, k: int = 5) -> List[Tuple[str, str, dict]]:
+        # Pin one index version for the whole query
+        with self._use() as h, tracing.span("search", k=k, hybrid=h.bm25 is not None, index_version=h.version) as span:
+            docs = self._query(h, text, k)
+            span.set(results=len(docs))
+            return docs
+
+    def query_with_embeddings(self, text: str, k: int = 5) -> Tuple[List[Tuple[str, str, dict]], List]:
+        """Like query(), plus the stored embedding of each result (for reranking).
+
+        Both come from the same index version; results without an embedding are dropped.
+        """
+        with self._use() as h, tracing.span("search", k=k, hybrid=h.bm25 is not None, index_version=h.version) as span:
+            docs = self._query(h, text, k)
+            res = h.collection.get(ids=[d[0] for d in docs], include=["embeddings"]) if docs else {}
+            vectors = res.get("embeddings")
+            by_id = dict(zip(res.get("ids") or [], vectors if vectors is not None else []))
+            docs = [d for d in docs if d[0] in by_id]
+            span.set(results=len(docs))
+            return docs, [by_id[d[0]] for d in docs]
+
+    def _query(self, h: _IndexHandle, text: str, k: int) -> List[Tuple[str, str, dict]]:
+        # Oversample dense results when they are fused with BM25
+        n_candidates = k if h.bm25 is None else k * 3
+        res = h.collection.query(query_embeddings=self._query_embedding(text), n_results=n_candidates)
+
+        # Empty collection: Chroma returns empty lists
+        ids = (res.get("ids") or [[]])[0]
+        texts = (res.get("documents") or [[]])[0]
+        metadatas = (res.get("metadatas") or [[]])[0]
+
+        docs = []
+        for doc_id, text_content, metadata in zip(ids, texts, metadatas):
             if text_content is None:
-                print(f"[WARNING] Skipping doc {doc_id} - text is None")
                 continue
+            docs.append((doc_id, text_content, metadata or {"source": "unknown"}))
 
-            if metadata is None:
-                print(f"[WARNING] Doc {doc_id} has None metadata, using default")
-                metadata = {"source": "unknown"}
+        if h.bm25 is not None:
+            docs = self._fuse_bm25(h, text, docs, k, n_candidates)
+        return docs[:k]
 
-            docs.append((doc_id, text_content, metadata))
+    def _fuse_bm25(self, h: _IndexHandle, text: str, dense: List[Tuple[str, str, dict]], k: int, n_candidates: int):
+        """Merge dense hits with BM25 hits using reciprocal-rank fusion."""
+        sparse = [doc_id for doc_id, _ in h.bm25.search(text, n_candidates)]
+        fused = _rrf([[d[0] for d in dense], sparse])[:k]
 
-        print(f"[DEBUG] Returning {len(docs)} valid documents\n")
-        return docs
\ No newline at end of file
+        by_id = {d[0]: d for d in dense}
+        missing = [doc_id for doc_id in fused if doc_id not in by_id]
+        if missing:
+            got = h.collection.get(ids=missing, include=["documents", "metadatas"])
+            for doc_id, doc, meta in zip(got.get("ids") or [], got.get("documents") or [], got.get("metadatas") or []):
+                if doc is not None:
+                    by_id[doc_id] = (doc_id, doc, meta or {"source": "unknown"})
+        return [by_id[doc_id] for doc_id in fused if doc_id in by_id]
\ No newline at end of file
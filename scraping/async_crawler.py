@@ -0,0 +1,480 @@
+"""
+Crawler asynchrone et poli pour esilv.fr.
+
+Plusieurs pages sont téléchargées en parallèle, avec pour chaque hôte une
+limite de connexions simultanées et un seau à jetons (token bucket) qui
+respecte le Crawl-delay de robots.txt. Le crawl est amorcé par les
+sitemaps, et la frontière (URLs restant à visiter + filtre de Bloom des
+URLs déjà vues) est sauvegardée régulièrement pour reprendre un crawl
+interrompu.
+"""
+import asyncio
+import gzip
+import hashlib
+import inspect
+import json
+import math
+import os
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Set
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import httpx
+import lxml.html
+from lxml import etree
+
+from .find_urls import BASE_URL, is_internal_url, normalize_url
+from .manifest import ScrapeManifest
+
+DEFAULT_USER_AGENT = "ESILV-crawler/1.0"
+DEFAULT_STATE_DIR = Path("data/crawl_state")
+
+
+@dataclass
+class Page:
+    """
+    Page HTML téléchargée une seule fois puis transmise à chaque étape du
+    pipeline. `changed` est faux si la page est identique au dernier crawl
+    (304, ou même empreinte) : html est alors la copie locale.
+    """
+
+    url: str
+    html: str
+    status: int
+    headers: Dict[str, str]
+    changed: bool = True
+
+
+# Étape de traitement d'une page : fonction ou coroutine appelée pour chaque page
+Stage = Callable[[Page], Any]
+
+
+class BloomFilter:
+    """
+    Ensemble probabiliste de taille fixe : pas de faux négatifs, faux positifs
+    ~error_rate jusqu'à `capacity` éléments. Borne la mémoire du « déjà vu »
+    (≈ 2,4 Mo pour 1 million d'URLs à 1e-4) quelle que soit la taille du site.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 1e-4):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        # Double hachage : h1 + i*h2 simule num_hashes fonctions indépendantes
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def save(self, path: Path) -> None:
+        header = json.dumps({"num_bits": self.num_bits, "num_hashes": self.num_hashes}).encode("utf-8")
+        _atomic_write(path, len(header).to_bytes(4, "little") + header + bytes(self.bits))
+
+    @classmethod
+    def load(cls, path: Path) -> "BloomFilter":
+        data = path.read_bytes()
+        size = int.from_bytes(data[:4], "little")
+        meta = json.loads(data[4:4 + size])
+        bloom = cls.__new__(cls)
+        bloom.num_bits, bloom.num_hashes = meta["num_bits"], meta["num_hashes"]
+        bloom.bits = bytearray(data[4 + size:])
+        return bloom
+
+
+class TokenBucket:
+    """Limiteur de débit : `rate` requêtes/seconde en moyenne, rafales jusqu'à `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostPolicy:
+    """Règles de politesse d'un hôte : robots.txt, connexions simultanées, débit."""
+
+    def __init__(self, robots: Optional[RobotFileParser], concurrency: int, rate: float):
+        self.robots = robots
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst=concurrency)
+
+    def can_fetch(self, user_agent: str, url: str) -> bool:
+        return self.robots is None or self.robots.can_fetch(user_agent, url)
+
+
+class Frontier:
+    """URLs à visiter (FIFO) + filtre de Bloom des URLs déjà mises en file."""
+
+    def __init__(self, seen: Optional[BloomFilter] = None):
+        self.seen = seen or BloomFilter()
+        self.pending: Deque[str] = deque()
+        self.in_progress: Set[str] = set()
+
+    def add(self, url: str) -> bool:
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        self.pending.append(url)
+        return True
+
+    def pop(self) -> Optional[str]:
+        if not self.pending:
+            return None
+        url = self.pending.popleft()
+        self.in_progress.add(url)
+        return url
+
+    def done(self, url: str) -> None:
+        self.in_progress.discard(url)
+
+    @property
+    def exhausted(self) -> bool:
+        return not self.pending and not self.in_progress
+
+    def save(self, state_dir: Path) -> None:
+        state_dir.mkdir(parents=True, exist_ok=True)
+        self.seen.save(state_dir / "seen.bloom")
+        # Les URLs en cours de téléchargement seront refaites à la reprise
+        pending = list(self.in_progress) + list(self.pending)
+        _atomic_write(state_dir / "frontier.json", json.dumps(pending).encode("utf-8"))
+
+    @classmethod
+    def load(cls, state_dir: Path) -> Optional["Frontier"]:
+        frontier_path, bloom_path = state_dir / "frontier.json", state_dir / "seen.bloom"
+        if not frontier_path.exists() or not bloom_path.exists():
+            return None
+        frontier = cls(BloomFilter.load(bloom_path))
+        frontier.pending.extend(json.loads(frontier_path.read_text(encoding="utf-8")))
+        return frontier
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+_LINK_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+
+def extract_links(html: str, base_url: str) -> List[str]:
+    """Liens <a href> d'une page, absolus et sans fragment."""
+    try:
+        root = lxml.html.document_fromstring(html.encode("utf-8"), parser=_LINK_PARSER)
+    except (etree.ParserError, ValueError):
+        return []
+    return [normalize_url(href, base=base_url) for href in root.xpath("//a/@href")]
+
+
+class AsyncCrawler:
+    """
+    Parcours en largeur des pages HTML internes à partir de base_url.
+
+    - `max_pages` : pages HTML à visiter par exécution ; un crawl repris
+      visite jusqu'à max_pages pages de plus ;
+    - `concurrency` : requêtes simultanées au total ;
+    - `per_host` / `rate` : connexions simultanées et requêtes/seconde par
+      hôte (le Crawl-delay de robots.txt, s'il est plus strict, l'emporte) ;
+    - `state_dir` : si fourni, la frontière y est sauvegardée toutes les
+      `checkpoint_every` pages et à l'arrêt ; un crawl interrompu reprend
+      là où il s'était arrêté, un crawl terminé efface son état ;
+    - `stages` : étapes appelées avec chaque Page (sauvegarde, extraction de
+      texte...), pour ne télécharger chaque page qu'une fois. L'extraction
+      des liens, elle, alimente directement la frontière ;
+    - `manifest` : si fourni, les pages connues sont revalidées avec
+      If-None-Match / If-Modified-Since ; une réponse 304 réutilise la copie
+      locale pour les liens et la page est marquée inchangée.
+    """
+
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        user_agent: str = DEFAULT_USER_AGENT,
+        max_pages: Optional[int] = None,
+        concurrency: int = 16,
+        per_host: int = 4,
+        rate: float = 8.0,
+        timeout: float = 10.0,
+        state_dir: Optional[Path | str] = None,
+        checkpoint_every: int = 50,
+        use_sitemaps: bool = True,
+        stages: Sequence[Stage] = (),
+        manifest: Optional[ScrapeManifest] = None,
+    ):
+        self.base_url = base_url
+        self.user_agent = user_agent
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.rate = rate
+        self.timeout = timeout
+        self.state_dir = Path(state_dir) if state_dir else None
+        self.checkpoint_every = checkpoint_every
+        self.use_sitemaps = use_sitemaps
+        self.stages = list(stages)
+        self.manifest = manifest
+
+        self.frontier = Frontier()
+        self.pages: List[str] = []
+        self._visited: Set[str] = set()
+        # Pages visitées pendant cette exécution, et places réservées par les
+        # téléchargements en cours (pour ne jamais dépasser max_pages)
+        self.fetched = 0
+        self._reserved = 0
+        self._hosts: Dict[str, HostPolicy] = {}
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self._changed: Optional[asyncio.Condition] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._since_checkpoint = 0
+
+    # -- politesse -----------------------------------------------------
+
+    async def _fetch_robots(self, host_url: str) -> Optional[RobotFileParser]:
+        try:
+            resp = await self._client.get(f"{host_url}/robots.txt")
+        except httpx.HTTPError as e:
+            print(f"Erreur lors de la récupération de robots.txt ({host_url}) :", e)
+            return None
+        print(f"robots.txt {host_url} status =", resp.status_code)
+        rp = RobotFileParser()
+        if resp.status_code in (401, 403):
+            # Accès refusé : tout est interdit, comme RobotFileParser.read()
+            rp.disallow_all = True
+            return rp
+        if resp.status_code >= 400:
+            return None
+        rp.parse(resp.text.splitlines())
+        return rp
+
+    async def _policy(self, url: str) -> HostPolicy:
+        parsed = urlparse(url)
+        host = parsed.netloc
+        if host in self._hosts:
+            return self._hosts[host]
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            if host not in self._hosts:
+                robots = await self._fetch_robots(f"{parsed.scheme}://{host}")
+                rate = self.rate
+                delay = robots.crawl_delay(self.user_agent) if robots else None
+                if delay:
+                    rate = min(rate, 1.0 / float(delay))
+                self._hosts[host] = HostPolicy(robots, 1 if delay else self.per_host, rate)
+        return self._hosts[host]
+
+    # -- amorçage ------------------------------------------------------
+
+    async def _sitemap_urls(self, sitemap_url: str, depth: int = 0) -> List[str]:
+        try:
+            resp = await self._client.get(sitemap_url)
+            resp.raise_for_status()
+        except httpx.HTTPError:
+            return []
+        data = resp.content
+        if sitemap_url.endswith(".gz"):
+            try:
+                data = gzip.decompress(data)
+            except OSError:
+                pass
+        try:
+            root = ET.fromstring(data)
+        except ET.ParseError:
+            return []
+        locs = [el.text.strip() for el in root.iter() if el.tag.endswith("loc") and el.text]
+        if root.tag.endswith("sitemapindex") and depth < 3:
+            urls: List[str] = []
+            for loc in locs:
+                urls.extend(await self._sitemap_urls(loc, depth + 1))
+            return urls
+        return locs
+
+    async def _seed(self) -> None:
+        self._enqueue(normalize_url(self.base_url))
+        if not self.use_sitemaps:
+            return
+        policy = await self._policy(self.base_url)
+        parsed = urlparse(self.base_url)
+        sitemaps = (policy.robots.site_maps() if policy.robots else None) or [
+            f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"
+        ]
+        for sitemap in sitemaps:
+            for url in await self._sitemap_urls(sitemap):
+                self._enqueue(normalize_url(url))
+
+    # -- parcours ------------------------------------------------------
+
+    def _enqueue(self, url: str) -> None:
+        if urlparse(url).scheme in ("http", "https") and is_internal_url(url):
+            self.frontier.add(url)
+
+    def _checkpoint(self) -> None:
+        if self.manifest is not None:
+            self.manifest.save()
+        if self.state_dir is None:
+            return
+        self.frontier.save(self.state_dir)
+        _atomic_write(self.state_dir / "pages.json", json.dumps(self.pages).encode("utf-8"))
+
+    def _restore(self) -> bool:
+        if self.state_dir is None:
+            return False
+        frontier = Frontier.load(self.state_dir)
+        if frontier is None:
+            return False
+        self.frontier = frontier
+        pages_path = self.state_dir / "pages.json"
+        if pages_path.exists():
+            self.pages = json.loads(pages_path.read_text(encoding="utf-8"))
+        if self.manifest is not None:
+            # Pages enregistrées avant l'arrêt mais pas encore traitées par les étapes : à refaire
+            pending = set(frontier.pending)
+            dirty = [url for url in self.manifest.dirty_urls() if url not in pending]
+            redo = set(dirty)
+            self.pages = [url for url in self.pages if url not in redo]
+            frontier.pending.extendleft(reversed(dirty))
+        self._visited = set(self.pages)
+        print(f"[crawler] Reprise : {len(self.pages)} pages déjà vues, {len(frontier.pending)} en attente")
+        return True
+
+    def _clear_state(self) -> None:
+        if self.state_dir is None:
+            return
+        for name in ("frontier.json", "seen.bloom", "pages.json"):
+            (self.state_dir / name).unlink(missing_ok=True)
+
+    def _limit_reached(self) -> bool:
+        return self.max_pages is not None and self.fetched >= self.max_pages
+
+    def _slots_full(self) -> bool:
+        return self.max_pages is not None and self.fetched + self._reserved >= self.max_pages
+
+    async def _fetch(self, url: str) -> None:
+        policy = await self._policy(url)
+        if not policy.can_fetch(self.user_agent, url):
+            return
+        headers = self.manifest.conditional_headers(url) if self.manifest else {}
+        async with policy.semaphore:
+            await policy.bucket.acquire()
+            try:
+                async with self._client.stream("GET", url, headers=headers) as resp:
+                    # On ne télécharge le corps que pour le HTML
+                    not_modified = resp.status_code == 304
+                    if not not_modified and (
+                        resp.status_code >= 400 or "text/html" not in resp.headers.get("Content-Type", "")
+                    ):
+                        return
+                    await resp.aread()
+            except httpx.HTTPError:
+                return
+        final_url = normalize_url(str(resp.url))
+        if not is_internal_url(final_url) or final_url in self._visited:
+            # Hors site, ou redirection vers une page déjà traitée
+            return
+        self._visited.add(final_url)
+
+        if not_modified:
+            html = self.manifest.cached_html(url)
+            if html is None:
+                return
+            self.manifest.touch(url)
+            page = Page(final_url, html, resp.status_code, dict(resp.headers), changed=False)
+        else:
+            changed = self.manifest.record(final_url, resp.headers, resp.text, requested_url=url) if self.manifest else True
+            page = Page(final_url, resp.text, resp.status_code, dict(resp.headers), changed=changed)
+
+        if final_url != url:
+            self.frontier.seen.add(final_url)
+        self.pages.append(final_url)
+        self.fetched += 1
+        for link in extract_links(page.html, final_url):
+            self._enqueue(link)
+        for stage in self.stages:
+            try:
+                result = stage(page)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                # Une page en échec (nom de fichier invalide, HTML illisible...) n'arrête pas le crawl
+                print(f"[crawler] Étape {type(stage).__name__} en échec pour {final_url} : {e!r}")
+
+    async def _worker(self) -> None:
+        while True:
+            async with self._changed:
+                while True:
+                    if self._limit_reached() or self.frontier.exhausted:
+                        self._changed.notify_all()
+                        return
+                    # Une place est réservée avant le GET et rendue si la page
+                    # n'est pas retenue (erreur, non-HTML, robots.txt)
+                    url = None if self._slots_full() else self.frontier.pop()
+                    if url is not None:
+                        self._reserved += 1
+                        break
+                    await self._changed.wait()
+            try:
+                await self._fetch(url)
+            finally:
+                async with self._changed:
+                    self._reserved -= 1
+                    self.frontier.done(url)
+                    self._changed.notify_all()
+                self._since_checkpoint += 1
+                if self.checkpoint_every and self._since_checkpoint >= self.checkpoint_every:
+                    self._since_checkpoint = 0
+                    self._checkpoint()
+
+    async def run(self) -> List[str]:
+        """Crawl le site et renvoie la liste des pages HTML visitées."""
+        self._changed = asyncio.Condition()
+        self.fetched = self._reserved = 0
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(
+            headers={"User-Agent": self.user_agent},
+            timeout=self.timeout,
+            limits=limits,
+            follow_redirects=True,
+        ) as client:
+            self._client = client
+            if not self._restore():
+                await self._seed()
+            try:
+                await asyncio.gather(*(self._worker() for _ in range(self.concurrency)))
+            except BaseException:
+                self._checkpoint()
+                raise
+        self._checkpoint()
+        if self.frontier.exhausted:
+            self._clear_state()
+        return list(self.pages)
+
+
+def crawl(base_url: str = BASE_URL, **kwargs) -> List[str]:
+    """Version synchrone de AsyncCrawler(...).run()."""
+    return asyncio.run(AsyncCrawler(base_url, **kwargs).run())
@@ -0,0 +1,98 @@
+"""
+Détection du texte répété d'une page à l'autre (en-tête, menus, pied de page)
+que l'extraction HTML ne reconnaît pas à ses balises.
+
+Chaque ligne de texte est hachée ; une ligne présente sur au moins
+`threshold` des pages du corpus est considérée comme du boilerplate et
+retirée avant l'écriture des .txt. Les empreintes de chaque page sont
+sauvegardées pour que les scrapings incrémentaux, qui ne re-parsent que
+les pages modifiées, filtrent avec les fréquences de tout le corpus.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+_WS_RE = re.compile(r"\s+")
+
+
+def line_hash(line: str) -> int:
+    key = _WS_RE.sub(" ", line).strip().casefold()
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class BoilerplateFilter:
+    """Fréquence documentaire des lignes du corpus, page par page."""
+
+    def __init__(self, threshold: float = 0.5, min_pages: int = 5):
+        self.threshold = threshold
+        self.min_pages = min_pages
+        self.pages: Dict[str, Set[int]] = {}
+        self.counts: Counter = Counter()
+
+    def update(self, page_id: str, text: str) -> None:
+        """Remplace les lignes connues de la page par celles de `text`."""
+        self.remove(page_id)
+        hashes = {line_hash(line) for line in text.splitlines() if line.strip()}
+        self.pages[page_id] = hashes
+        self.counts.update(hashes)
+
+    def remove(self, page_id: str) -> None:
+        old = self.pages.pop(page_id, None)
+        if old:
+            self.counts.subtract(old)
+            for h in old:
+                if self.counts[h] <= 0:
+                    del self.counts[h]
+
+    def retain(self, page_ids: Iterable[str]) -> None:
+        """Oublie les pages qui ne sont plus dans le corpus."""
+        keep = set(page_ids)
+        for page_id in [p for p in self.pages if p not in keep]:
+            self.remove(page_id)
+
+    def boilerplate(self) -> Set[int]:
+        """Empreintes des lignes présentes sur au moins `threshold` des pages."""
+        if len(self.pages) < self.min_pages:
+            return set()
+        min_count = max(2, math.ceil(self.threshold * len(self.pages)))
+        return {h for h, n in self.counts.items() if n >= min_count}
+
+    @staticmethod
+    def strip(text: str, boilerplate: Set[int]) -> Tuple[str, int]:
+        """Retire les lignes de boilerplate ; renvoie (texte, octets économisés)."""
+        if not boilerplate:
+            return text, 0
+        kept = [line for line in text.splitlines() if line_hash(line) not in boilerplate]
+        clean = "\n".join(kept)
+        return clean, len(text.encode("utf-8")) - len(clean.encode("utf-8"))
+
+    def save(self, path: Path | str) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "threshold": self.threshold,
+            "min_pages": self.min_pages,
+            "pages": {page_id: sorted(hashes) for page_id, hashes in self.pages.items()},
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path | str, threshold: Optional[float] = None, min_pages: Optional[int] = None) -> "BoilerplateFilter":
+        """Charge l'état sauvegardé (vide si absent) ; threshold/min_pages le remplacent s'ils sont donnés."""
+        path = Path(path)
+        data = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+        bp = cls(
+            threshold if threshold is not None else data.get("threshold", 0.5),
+            min_pages if min_pages is not None else data.get("min_pages", 5),
+        )
+        for page_id, hashes in data.get("pages", {}).items():
+            bp.pages[page_id] = set(hashes)
+            bp.counts.update(bp.pages[page_id])
+        return bp
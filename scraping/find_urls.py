@@ -1,30 +1,9 @@
-import time
-import requests
 from urllib.parse import urljoin, urlparse, urldefrag
-from urllib.robotparser import RobotFileParser
-from bs4 import BeautifulSoup
-from collections import deque
 
 
 BASE_DOMAIN = "esilv.fr"
 BASE_URL = "https://www.esilv.fr/"
 
-def init_robots_parser():
-    url = "https://www.esilv.fr/robots.txt"
-
-    try:
-        resp = requests.get(url, timeout=5)
-        status = resp.status_code
-        print("robots.txt status =", status)
-
-        rp = RobotFileParser()
-        rp.parse(resp.text.splitlines())
-        return rp
-
-    except requests.RequestException as e:
-        print("Erreur lors de la récupération de robots.txt :", e)
-        return None
-
 def is_internal_url(url):
     parsed = urlparse(url)
     # garde les sous-domaines éventuels de esilv.fr
@@ -39,55 +18,35 @@ def normalize_url(url, base=BASE_URL):
         abs_url = abs_url[:-1]
     return abs_url
 
-def discover_all_urls(base_url=BASE_URL, delay=0.5, max_pages=None, user_agent="ESILV-crawler/1.0"):
-    rp = init_robots_parser()
-    
-
-    to_visit = deque([base_url])
-    seen = set()
-    session = requests.Session()
-    session.headers.update({"User-Agent": user_agent})
-
-    while to_visit:
-        url = to_visit.popleft()
-
-        # Limite optionnelle de sécurité
-        if max_pages is not None and len(seen) >= max_pages:
-            break
-
-        if url in seen:
-            continue
-        seen.add(url)
-
-        # Respect robots.txt
-        if not rp.can_fetch(user_agent, url):
-            continue
-
-        try:
-            resp = session.get(url, timeout=10)
-        except requests.RequestException:
-            continue
-
-        # On ne suit que le HTML
-        content_type = resp.headers.get("Content-Type", "")
-        if "text/html" not in content_type:
-            continue
-
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        # Récupérer tous les liens <a href="...">
-        for a in soup.find_all("a", href=True):
-            href = a["href"]
-            new_url = normalize_url(href, base=resp.url)
-
-            if not is_internal_url(new_url):
-                continue
-
-            # Là encore, respecter robots.txt avant d'ajouter
-            if new_url not in seen and rp.can_fetch(user_agent, new_url):
-                to_visit.append(new_url)
-
-        # Politeness
-        time.sleep(delay)
-
-    return list(seen)
+def page_filename(url, suffix=".html"):
+    # nom de fichier local d'une page : chemin de l'URL avec "/" remplacés par "_"
+    rel_path = urlparse(url).path.lstrip("/")
+    safe_name = rel_path.strip("/").replace("/", "_") or "index"
+    return f"{safe_name}{suffix}"
+
+def discover_all_urls(
+    base_url=BASE_URL,
+    max_pages=None,
+    user_agent="ESILV-crawler/1.0",
+    concurrency=16,
+    per_host=4,
+    rate=8.0,
+    state_dir=None,
+):
+    """
+    Renvoie les URLs des pages HTML internes du site.
+
+    Délègue au crawler asynchrone (voir async_crawler) : téléchargements en
+    parallèle, limités par hôte, dans le respect de robots.txt.
+    """
+    from .async_crawler import crawl  # import local : async_crawler importe ce module
+
+    return crawl(
+        base_url,
+        user_agent=user_agent,
+        max_pages=max_pages,
+        concurrency=concurrency,
+        per_host=per_host,
+        rate=rate,
+        state_dir=state_dir,
+    )
@@ -1,8 +1,7 @@
 from pathlib import Path
 from typing import List
 
-from scraper import scrape_esilv_pages
-from parse_html import parse_html_folder
+from .pipeline import crawl_and_save
 
 
 def ingest_esilv_site(
@@ -10,11 +9,9 @@ def ingest_esilv_site(
     parsed_text_dir: Path | str = Path("data/processed/esilv_text"),
 ) -> List[Path]:
 
-    print("[scraping/ingest] Scraping ESILV website pages...")
-    scrape_esilv_pages(output_dir=raw_html_dir)
-
-    print("[scraping/ingest] Text extraction from HTML...")
-    out_files = parse_html_folder(raw_html_dir, parsed_text_dir)
+    print("[scraping/ingest] Scraping ESILV website pages and extracting text...")
+    result = crawl_and_save(raw_html_dir, parsed_text_dir)
+    out_files = result["text_files"]
 
     print(f"[scraping/ingest] {len(out_files)} text files generated.")
     return out_files
@@ -0,0 +1,132 @@
+"""
+Manifeste de scraping : pour chaque URL, ETag, Last-Modified, empreinte du
+contenu et date du dernier téléchargement.
+
+Il permet les requêtes conditionnelles (If-None-Match / If-Modified-Since) :
+une page inchangée revient en 304 sans corps, et seules les pages dont le
+contenu a changé sont re-parsées puis réindexées.
+
+Une page modifiée reste « sale » (dirty) tant que son texte n'a pas été
+écrit : si le crawl est interrompu, elle est retéléchargée sans requête
+conditionnelle et retraitée au crawl suivant.
+"""
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .find_urls import page_filename
+
+DEFAULT_MANIFEST_PATH = Path("data/scrape_manifest.json")
+
+
+@dataclass
+class ManifestEntry:
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    fetched_at: Optional[str] = None
+    dirty: bool = False
+    # URLs demandées qui redirigent vers `url` (slash final, http -> https...)
+    aliases: List[str] = field(default_factory=list)
+
+
+def content_hash(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+class ScrapeManifest:
+    """
+    Manifeste persistant (JSON) associé au dossier des HTML bruts, où l'on
+    relit une page revenue en 304 pour en extraire les liens.
+    """
+
+    def __init__(self, path: Path | str = DEFAULT_MANIFEST_PATH, raw_dir: Path | str = Path("data/raw/esilv_html")):
+        self.path = Path(path)
+        self.raw_dir = Path(raw_dir)
+        self.entries: Dict[str, ManifestEntry] = {}
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.entries = {url: ManifestEntry(**entry) for url, entry in data.items()}
+        self._aliases = {alias: url for url, entry in self.entries.items() for alias in entry.aliases}
+
+    def key(self, url: str) -> str:
+        """URL sous laquelle une page est enregistrée (celle d'arrivée, après redirection)."""
+        return self._aliases.get(url, url)
+
+    def raw_path(self, url: str) -> Path:
+        return self.raw_dir / page_filename(url)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """En-têtes de revalidation, seulement si la copie locale existe encore."""
+        url = self.key(url)
+        entry = self.entries.get(url)
+        if entry is None or entry.dirty or not self.raw_path(url).exists():
+            return {}
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def cached_html(self, url: str) -> Optional[str]:
+        path = self.raw_path(self.key(url))
+        return path.read_text(encoding="utf-8") if path.exists() else None
+
+    def record(self, url: str, headers: Dict[str, str], html: str, requested_url: Optional[str] = None) -> bool:
+        """
+        Enregistre une réponse 200 pour la page `url`, atteinte depuis
+        `requested_url` ; renvoie True si le contenu a changé (ou n'a pas
+        encore été traité).
+        """
+        digest = content_hash(html)
+        previous = self.entries.get(url)
+        aliases = list(previous.aliases) if previous else []
+        if requested_url and requested_url != url and requested_url not in aliases:
+            aliases.append(requested_url)
+            self._aliases[requested_url] = url
+        changed = (
+            previous is None
+            or previous.dirty
+            or previous.content_hash != digest
+            or not self.raw_path(url).exists()
+        )
+        self.entries[url] = ManifestEntry(
+            url=url,
+            etag=headers.get("etag"),
+            last_modified=headers.get("last-modified"),
+            content_hash=digest,
+            fetched_at=datetime.now().isoformat(),
+            dirty=changed,
+            aliases=aliases,
+        )
+        return changed
+
+    def touch(self, url: str) -> None:
+        """Page revalidée (304) : seule la date de vérification change."""
+        entry = self.entries.get(self.key(url))
+        if entry is not None:
+            entry.fetched_at = datetime.now().isoformat()
+
+    def dirty_urls(self) -> List[str]:
+        """Pages modifiées dont le texte n'a pas encore été écrit."""
+        return [url for url, entry in self.entries.items() if entry.dirty]
+
+    def mark_clean(self, urls: Iterable[str]) -> None:
+        """Texte des pages écrit : elles peuvent de nouveau être revalidées."""
+        for url in urls:
+            entry = self.entries.get(url)
+            if entry is not None:
+                entry.dirty = False
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        data = {url: asdict(entry) for url, entry in self.entries.items()}
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
@@ -1,30 +1,146 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, List, Optional
 
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+
+from .boilerplate import BoilerplateFilter
+
+# État du filtre de boilerplate, sauvegardé à côté des HTML bruts
+BOILERPLATE_STATE = "boilerplate.json"
+
+# Balises dont tout le sous-arbre est ignoré
+_DROP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "iframe", "canvas",
+    "nav", "footer", "aside", "form", "button", "select", "head",
+}
+# Rôles ARIA des zones de navigation / bandeaux du site
+_DROP_ROLES = {"navigation", "banner", "contentinfo", "search", "dialog", "alertdialog", "menu", "menubar"}
+# Classes / id des menus, bandeaux cookies, partages sociaux... répétés sur esilv.fr.
+# Comparés classe par classe, en entier : "main-menu" ou "share-buttons" sont du
+# boilerplate, pas "cookies-not-set" ni "offcanvas-push" (posées sur <body> ou
+# sur le conteneur de toute la page).
+_BOILERPLATE_RE = re.compile(
+    r"(?:[a-z0-9]+[-_])*"
+    r"(?:cookies?|consent|gdpr|rgpd|menu|navbar|nav|breadcrumbs?|fil-ariane|megamenu|submenu|"
+    r"share|sharing|social|newsletter|skip-?links?|popup|modal|offcanvas)"
+    r"(?:[-_](?:banner|bar|bandeau|notice|buttons?|links?|icons?|box|list|items?|toggle|overlay|popup|modal))*"
+    r"|(?:tarteaucitron|axeptio|didomi)\w*",
+    re.IGNORECASE,
+)
+# Jamais ignorées : la racine du parcours et les conteneurs du contenu principal
+_KEEP_TAGS = {"html", "body", "main", "article"}
+# Balises qui terminent une ligne de texte
+_BLOCK_TAGS = {
+    "address", "article", "blockquote", "body", "br", "dd", "div", "dl", "dt", "figcaption",
+    "figure", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "ol", "p",
+    "pre", "section", "table", "tbody", "td", "th", "thead", "tr", "ul",
+}
+_HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+_WS_RE = re.compile(r"\s+")
+_PARSER = lxml.html.HTMLParser(encoding="utf-8", remove_comments=True)
+
+
+def _is_boilerplate(el, in_content: bool) -> bool:
+    tag = el.tag
+    if tag in _KEEP_TAGS:
+        return False
+    if tag in _DROP_TAGS:
+        return True
+    # <header> de page = logo + menus ; <header> d'un article = son titre
+    if tag == "header" and not in_content:
+        return True
+    if (el.get("role") or "").lower() in _DROP_ROLES:
+        return True
+    if el.get("aria-hidden") == "true" or el.get("hidden") is not None:
+        return True
+    tokens = f"{el.get('class') or ''} {el.get('id') or ''}".split()
+    return any(_BOILERPLATE_RE.fullmatch(token) for token in tokens)
+
+
+class _TextWriter:
+    """Accumule le texte en lignes ; les titres sont préfixés de "#" (markdown)."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self._buf: List[str] = []
+        self.heading = 0
+        self._soft_space = False
+
+    def text(self, s: Optional[str]):
+        if s:
+            if self._soft_space and s[0].isalnum():
+                self._buf.append(" ")
+            self._soft_space = False
+            self._buf.append(s)
+
+    def soft_space(self):
+        """Espace à insérer si le texte suivant commence par une lettre ou un chiffre."""
+        self._soft_space = True
+
+    def newline(self):
+        line = _WS_RE.sub(" ", "".join(self._buf)).strip()
+        self._buf = []
+        self._soft_space = False
+        if line:
+            if self.heading:
+                line = "#" * self.heading + " " + line
+            self.lines.append(line)
+
+
+def _walk(el, out: _TextWriter, in_content: bool):
+    tag = el.tag
+    if not isinstance(tag, str):
+        # Commentaires et instructions : seul le texte qui suit compte
+        out.text(el.tail)
+        return
+    tag = tag.lower()
+    if _is_boilerplate(el, in_content):
+        out.text(el.tail)
+        return
+    block = tag in _BLOCK_TAGS
+    level = _HEADINGS.get(tag, 0)
+    if block:
+        out.newline()
+    if level:
+        out.heading = level
+    out.text(el.text)
+    child_in_content = in_content or tag in ("main", "article")
+    for child in el:
+        _walk(child, out, child_in_content)
+    if block:
+        out.newline()
+    if level:
+        out.heading = 0
+    if tag == "a":
+        # Liens côte à côte (<a>A</a><a>B</a>) : ne pas coller leurs textes
+        out.soft_space()
+    out.text(el.tail)
 
 
 def extract_main_text(html: str) -> str:
     """
     Extrait le texte principal d'une page HTML.
-    Version simple : enlève scripts, styles, nav, footer, puis récupère le <body>.
-    """
-    soup = BeautifulSoup(html, "html.parser")
 
-    # Supprimer les balises non textuelles
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
-
-    # Optionnel : supprimer les nav/footer
-    for tag in soup.find_all(["nav", "footer"]):
-        tag.decompose()
-
-    body = soup.body or soup
-    text = body.get_text(separator="\n")
-    # Nettoyage simple
-    lines = [line.strip() for line in text.splitlines()]
-    lines = [line for line in lines if line]
-    return "\n".join(lines)
+    Parsing lxml (C) puis un seul parcours de l'arbre : scripts, styles,
+    menus, en-têtes/pieds de page, bandeaux cookies et partages sociaux sont
+    sautés avec tout leur sous-arbre, et les titres <h1>-<h6> sont écrits
+    "# Titre" pour que le découpage en chunks retrouve les sections.
+    """
+    if not html or not html.strip():
+        return ""
+    try:
+        root = lxml.html.document_fromstring(html.encode("utf-8"), parser=_PARSER)
+    except (etree.ParserError, ValueError):
+        return ""
+    body = root.find("body")
+    out = _TextWriter()
+    _walk(body if body is not None else root, out, in_content=False)
+    out.newline()
+    return "\n".join(out.lines)
 
 
 def parse_html_file(path: Path) -> str:
@@ -33,20 +149,90 @@ def parse_html_file(path: Path) -> str:
     return extract_main_text(html)
 
 
-def parse_html_folder(input_dir: Path | str, output_dir: Path | str) -> List[Path]:
+def _extract_texts(html_paths: List[Path], workers: Optional[int] = None) -> List[str]:
+    """Texte de chaque fichier, réparti sur `workers` processus (défaut : un par cœur)."""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(html_paths) < 2:
+        return [parse_html_file(p) for p in html_paths]
+    chunksize = max(1, len(html_paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(parse_html_file, html_paths, chunksize=chunksize))
+
+
+def write_texts(
+    texts: Dict[Path, str],
+    raw_dir: Path | str,
+    output_dir: Path | str,
+    boilerplate: Optional[BoilerplateFilter] = None,
+    complete: bool = False,
+    workers: Optional[int] = None,
+    page_ids: Optional[Iterable[str]] = None,
+) -> Dict[Path, int]:
+    """
+    Retire le boilerplate du corpus puis écrit les textes (chemin .txt -> texte).
+
+    `complete` indique que `texts` couvre tout le corpus ; sinon (scraping
+    incrémental) les fréquences des autres pages viennent de l'état
+    sauvegardé, et si l'ensemble des lignes répétées change, les autres
+    pages de raw_dir sont ré-extraites pour être filtrées de la même façon.
+    `page_ids` (noms des fichiers sans extension) liste toutes les pages du
+    corpus quand on la connaît, par exemple à la fin d'un crawl complet ;
+    les pages absentes sont oubliées par le filtre. Par défaut, avec
+    `complete`, ce sont les pages de `texts`.
+    Renvoie le nombre d'octets retirés par fichier.
+    """
+    raw_dir, output_dir = Path(raw_dir), Path(output_dir)
+    if boilerplate is None:
+        boilerplate = BoilerplateFilter.load(raw_dir / BOILERPLATE_STATE)
+    before = boilerplate.boilerplate()
+    for out_path, text in texts.items():
+        boilerplate.update(out_path.stem, text)
+    if page_ids is None and complete:
+        page_ids = [out_path.stem for out_path in texts]
+    if page_ids is not None:
+        boilerplate.retain(page_ids)
+    repeated = boilerplate.boilerplate()
+
+    if not complete and repeated != before:
+        others = [p for p in sorted(raw_dir.glob("*.html")) if output_dir / (p.stem + ".txt") not in texts]
+        if others:
+            print(f"[parse_html] Boilerplate modifié : re-filtrage de {len(others)} autres pages")
+            texts = {**texts, **{output_dir / (p.stem + ".txt"): t for p, t in zip(others, _extract_texts(others, workers))}}
+
+    saved: Dict[Path, int] = {}
+    for out_path, text in texts.items():
+        clean, saved[out_path] = BoilerplateFilter.strip(text, repeated)
+        out_path.write_text(clean, encoding="utf-8")
+        print(f"[parse_html] {out_path.name} : {saved[out_path]} octets de boilerplate retirés")
+    print(f"[parse_html] {len(repeated)} lignes répétées, {sum(saved.values())} octets retirés au total")
+    boilerplate.save(raw_dir / BOILERPLATE_STATE)
+    return saved
+
+
+def parse_html_folder(
+    input_dir: Path | str,
+    output_dir: Path | str,
+    workers: Optional[int] = None,
+    paths: Optional[Iterable[Path | str]] = None,
+    boilerplate_threshold: Optional[float] = None,
+) -> List[Path]:
     """
     Parcourt un dossier de fichiers HTML et écrit les versions texte dans output_dir.
+
+    Les fichiers sont répartis sur `workers` processus (par défaut un par
+    cœur ; 1 = séquentiel). `paths` limite le traitement à ces fichiers
+    HTML, par exemple les pages modifiées depuis le dernier scraping. Les
+    lignes présentes sur au moins `boilerplate_threshold` des pages (0.5
+    par défaut) sont retirées (voir boilerplate.py).
     """
     input_dir = Path(input_dir)
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    output_files: List[Path] = []
-
-    for html_path in input_dir.glob("*.html"):
-        text = parse_html_file(html_path)
-        out_path = output_dir / (html_path.stem + ".txt")
-        out_path.write_text(text, encoding="utf-8")
-        output_files.append(out_path)
+    html_paths = [Path(p) for p in paths] if paths is not None else sorted(input_dir.glob("*.html"))
+    out_paths = [output_dir / (p.stem + ".txt") for p in html_paths]
+    texts = dict(zip(out_paths, _extract_texts(html_paths, workers)))
 
-    return output_files
+    boilerplate = BoilerplateFilter.load(input_dir / BOILERPLATE_STATE, threshold=boilerplate_threshold)
+    write_texts(texts, input_dir, output_dir, boilerplate, complete=paths is None, workers=workers)
+    return out_paths
@@ -0,0 +1,108 @@
+"""
+Pipeline crawl -> sauvegarde -> extraction de texte.
+
+Chaque page est téléchargée une seule fois par le crawler puis transmise,
+au fil de l'eau, à une étape de sauvegarde du HTML brut et à une étape
+d'extraction du texte (les liens, eux, alimentent directement le crawl).
+"""
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .async_crawler import AsyncCrawler, Page
+from .find_urls import BASE_URL, page_filename
+from .manifest import DEFAULT_MANIFEST_PATH, ScrapeManifest
+from .parse_html import extract_main_text, write_texts
+
+
+class SaveRawHtml:
+    """Étape de sauvegarde : écrit le HTML brut dans raw_dir (pages modifiées seulement)."""
+
+    def __init__(self, raw_dir: Path | str):
+        self.raw_dir = Path(raw_dir)
+        self.raw_dir.mkdir(parents=True, exist_ok=True)
+        self.files: List[Path] = []
+
+    async def __call__(self, page: Page) -> None:
+        if not page.changed:
+            return
+        out_file = self.raw_dir / page_filename(page.url)
+        await asyncio.to_thread(out_file.write_text, page.html, encoding="utf-8")
+        self.files.append(out_file)
+
+
+class ExtractText:
+    """
+    Étape d'extraction : extrait le texte principal des pages modifiées. Le
+    parsing, coûteux en CPU, tourne dans `executor` (un pool de processus
+    pour utiliser tous les cœurs), hors de la boucle asyncio qui continue
+    les téléchargements. Les textes sont écrits en fin de crawl, une fois
+    le boilerplate du corpus connu (voir parse_html.write_texts).
+    """
+
+    def __init__(self, parsed_dir: Path | str, executor: Optional[Executor] = None):
+        self.parsed_dir = Path(parsed_dir)
+        self.parsed_dir.mkdir(parents=True, exist_ok=True)
+        self.executor = executor
+        self.texts: Dict[Path, str] = {}
+        self.urls: List[str] = []
+
+    async def __call__(self, page: Page) -> None:
+        if not page.changed:
+            return
+        out_file = self.parsed_dir / page_filename(page.url, ".txt")
+        loop = asyncio.get_running_loop()
+        try:
+            self.texts[out_file] = await loop.run_in_executor(self.executor, extract_main_text, page.html)
+            self.urls.append(page.url)
+        except Exception as e:
+            print(f"[pipeline] Extraction impossible pour {page.url} : {e}")
+
+
+def crawl_and_save(
+    raw_dir: Path | str,
+    parsed_dir: Path | str,
+    base_url: str = BASE_URL,
+    manifest_path: Path | str | None = DEFAULT_MANIFEST_PATH,
+    extract_workers: Optional[int] = None,
+    **crawler_kwargs,
+) -> dict:
+    """
+    Crawle le site en ne téléchargeant chaque page qu'une fois : le HTML est
+    sauvegardé dans raw_dir et le texte extrait, sans le boilerplate
+    répété d'une page à l'autre, dans parsed_dir.
+
+    Le texte est extrait sur `extract_workers` processus (défaut : un par
+    cœur). Avec un manifeste, les pages déjà connues sont revalidées par requête
+    conditionnelle et seules celles qui ont changé sont réécrites ; une page
+    n'y est marquée traitée qu'une fois son texte écrit, pour qu'un crawl
+    interrompu la refasse.
+
+    Renvoie {"pages", "raw_files", "text_files", "unchanged"} ; text_files
+    ne contient que les textes nouveaux ou modifiés, à passer à l'indexeur.
+    """
+    manifest = ScrapeManifest(manifest_path, raw_dir) if manifest_path else None
+    with ProcessPoolExecutor(max_workers=extract_workers or os.cpu_count() or 1) as pool:
+        save, extract = SaveRawHtml(raw_dir), ExtractText(parsed_dir, executor=pool)
+        crawler = AsyncCrawler(base_url, stages=[save, extract], manifest=manifest, **crawler_kwargs)
+        pages = asyncio.run(crawler.run())
+    # Un crawl terminé connaît toutes les pages du site : le filtre oublie les autres.
+    # Sans manifeste, il a en plus ré-extrait tout le corpus.
+    exhausted = crawler.frontier.exhausted
+    page_ids = [Path(page_filename(url, ".txt")).stem for url in pages] if exhausted else None
+    write_texts(
+        extract.texts, raw_dir, parsed_dir,
+        complete=manifest is None and exhausted, workers=extract_workers, page_ids=page_ids,
+    )
+    if manifest is not None:
+        manifest.mark_clean(extract.urls)
+        manifest.save()
+    return {
+        "pages": pages,
+        "raw_files": save.files,
+        "text_files": list(extract.texts),
+        # Seules les pages visitées par cette exécution comptent (un crawl repris renvoie aussi les précédentes)
+        "unchanged": crawler.fetched - len(save.files),
+    }
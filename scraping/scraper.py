@@ -2,19 +2,17 @@ import os, argparse
 from pathlib import Path
 from datetime import datetime
 from typing import Iterable, List
-from urllib.parse import urlparse
 
 import requests
-from .parse_html import parse_html_folder
-from .find_urls import discover_all_urls
+from .pipeline import crawl_and_save, page_filename
 
 
 
 BASE_URL = "https://www.esilv.fr/"
 
-def fetch_page(url: str, timeout: int = 10) -> str:
+def fetch_page(url: str, timeout: int = 10, session: requests.Session | None = None) -> str:
     """Télécharge le contenu HTML brut d'une page."""
-    resp = requests.get(url, timeout=timeout)
+    resp = (session or requests).get(url, timeout=timeout)
     resp.raise_for_status()
     return resp.text
 
@@ -32,6 +30,9 @@ def scrape_esilv_pages(
     """
     Télécharge une liste de pages ESILV et les sauvegarde dans data/raw/esilv_html.
 
+    Pour un crawl complet, préférer crawl_and_save (pipeline.py), qui
+    sauvegarde les pages au moment du crawl au lieu de les retélécharger.
+
     Returns
     -------
     List[Path] : liste des chemins des fichiers HTML sauvegardés.
@@ -39,16 +40,14 @@ def scrape_esilv_pages(
     output_dir = Path(output_dir)
     downloaded_files: List[Path] = []
 
-    for url in urls:
-        parsed = urlparse(url)
-        rel_path = parsed.path.lstrip("/")
-        safe_name = rel_path.strip("/").replace("/", "_") or "index"
-        out_file = output_dir / f"{safe_name}.html"
+    with requests.Session() as session:
+        for url in urls:
+            out_file = output_dir / page_filename(url)
 
-        print(f"[scraper_esilv] Fetch {url} -> {out_file}")
-        html = fetch_page(url)
-        save_raw_html(html, out_file)
-        downloaded_files.append(out_file)
+            print(f"[scraper_esilv] Fetch {url} -> {out_file}")
+            html = fetch_page(url, session=session)
+            save_raw_html(html, out_file)
+            downloaded_files.append(out_file)
 
     return downloaded_files
 
@@ -57,27 +56,30 @@ if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--raw-dir", required=True)
     ap.add_argument("--parsed-dir", required=True)
+    ap.add_argument("--max-pages", type=int, default=None, help="Limite de pages (défaut : tout le site)")
+    ap.add_argument("--concurrency", type=int, default=16, help="Requêtes simultanées au total")
+    ap.add_argument("--per-host", type=int, default=4, help="Requêtes simultanées par hôte")
+    ap.add_argument("--rate", type=float, default=8.0, help="Requêtes/seconde par hôte (Crawl-delay prioritaire)")
+    ap.add_argument("--state-dir", default="data/crawl_state", help="Frontière sauvegardée pour reprendre un crawl")
+    ap.add_argument("--manifest", default="data/scrape_manifest.json", help="Manifeste ETag/Last-Modified des pages")
+    ap.add_argument("--full", action="store_true", help="Ignorer le manifeste et tout retélécharger")
     args = ap.parse_args()
 
-    pages_url = discover_all_urls(max_pages=100)
-
-    #print("[1] Téléchargement des pages HTML…")
-    downloaded = scrape_esilv_pages(
-        urls=pages_url,
-        output_dir=args.raw_dir,
+    # Un seul téléchargement par page : HTML brut -> raw-dir, texte -> parsed-dir
+    result = crawl_and_save(
+        raw_dir=args.raw_dir,
+        parsed_dir=args.parsed_dir,
+        max_pages=args.max_pages,
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        rate=args.rate,
+        state_dir=args.state_dir,
+        manifest_path=None if args.full else args.manifest,
     )
-    #print(f"   -> {len(downloaded)} pages téléchargées")
-    # for f in downloaded:
-    #     print(f"     - {f}")
-
-    #print("\n[2] Extraction du texte depuis les fichiers HTML…")
-    extracted = parse_html_folder(
-        input_dir=args.raw_dir,
-        output_dir=args.parsed_dir,
+    print(
+        f"[scraper_esilv] {len(result['pages'])} pages : {len(result['text_files'])} nouvelles ou modifiées, "
+        f"{result['unchanged']} inchangées"
     )
-    #print(f"   -> {len(extracted)} fichiers texte générés")
-    # for f in extracted:
-    #     print(f"     - {f}")
 
 
     SCRAPE_META_FILE = Path("data/last_scrape.txt")
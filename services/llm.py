@@ -1,16 +1,22 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
 import time
 import inspect
+import json
 import os
+import threading
 
-@dataclass
+@dataclass(frozen=True)
 class LLMConfig:
     provider: str
     ollama_model: str
     vertex_model: str
     gcp_project_id: Optional[str] = None
     gcp_location: Optional[str] = None
+    ollama_base_url: str = "http://localhost:11434"
+    ollama_pool_size: int = 8
+    ollama_keep_alive: Optional[str] = "30m"
+    ollama_timeout: float = 300
 
 def _normalize_vertex_model(name: str) -> str:
     if not name:
@@ -41,38 +47,77 @@ class LLMClient:
         # else:
         #     raise ValueError("Unknown LLM provider")
 
-    def chat(self, messages: List[dict]) -> str:
+    def chat(self, messages: List[dict], max_tokens: Optional[int] = None) -> str:
         raise ValueError(f"You called the parent class LLMClient. You may call either OllamaClient or VertexClient instead (your provider is {self.cfg.provider}).")
-        
+
+    def warmup(self, system_instructions: Iterable[str] = ()) -> None:
+        """Prepare the client before the first request (no-op by default)."""
+
+    def chat_stream(self, messages: List[dict], max_tokens: Optional[int] = None) -> Iterator[str]:
+        """Yield the answer in pieces as the model produces them.
+
+        Providers without streaming support yield the full answer at once.
+        """
+        yield self.chat(messages, max_tokens=max_tokens)
 
 
 class OllamaClient(LLMClient):
     def __init__(self, cfg: LLMConfig):
         super().__init__(cfg)
         import requests
+        from requests.adapters import HTTPAdapter
         self._requests = requests
-        self._base_url = "http://localhost:11434"
-    
-    def chat(self, messages: List[dict]) -> str:
+        self._base_url = cfg.ollama_base_url.rstrip("/")
+        # One keep-alive pool shared by every caller; pool_block makes extra
+        # concurrent requests wait for a free connection instead of opening more.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=cfg.ollama_pool_size, pool_block=True)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def _payload(self, messages: List[dict], stream: bool, max_tokens: Optional[int]) -> dict:
+        payload = {"model": self.cfg.ollama_model, "messages": messages, "stream": stream}
+        if self.cfg.ollama_keep_alive:
+            # Keep the model resident between requests
+            payload["keep_alive"] = self.cfg.ollama_keep_alive
+        if max_tokens:
+            payload["options"] = {"num_predict": max_tokens}
+        return payload
+
+    def warmup(self, system_instructions: Iterable[str] = ()) -> None:
+        """Ask Ollama to load the model now (an empty chat only loads it)."""
+        payload = {"model": self.cfg.ollama_model, "messages": []}
+        if self.cfg.ollama_keep_alive:
+            payload["keep_alive"] = self.cfg.ollama_keep_alive
+        self._session.post(f"{self._base_url}/api/chat", json=payload, timeout=self.cfg.ollama_timeout).raise_for_status()
+
+    @staticmethod
+    def _parse_line(line) -> str:
+        """Return the text carried by one NDJSON stream line."""
+        data = json.loads(line)
+        if data.get("error"):
+            raise RuntimeError(f"Ollama error: {data['error']}")
+        return (data.get("message") or {}).get("content") or data.get("response") or ""
+
+    def chat(self, messages: List[dict], max_tokens: Optional[int] = None) -> str:
         _log_debug("Chat called with provider:", self.cfg.provider)
         _log_debug("Messages:", messages)
 
         if self.cfg.provider == "ollama":
             # Ollama path unchanged
-            payload = {"model": self.cfg.ollama_model, "messages": messages, "stream": False}
+            payload = self._payload(messages, stream=False, max_tokens=max_tokens)
             _log_debug("Ollama payload:", payload)
             for attempt in range(2):  # one retry for cold start
                 try:
-                    resp = self._requests.post(
+                    resp = self._session.post(
                         f"{self._base_url}/api/chat",
                         json=payload,
-                        timeout=300,
+                        timeout=self.cfg.ollama_timeout,
                     )
                     _log_debug("Ollama HTTP status:", resp.status_code)
                     resp.raise_for_status()
                     data = resp.json()
-                    ## debugger print
-                    print("Ollama RAW JSON:", data)
+                    _log_debug("Ollama raw JSON:", data)
                     if isinstance(data, dict):
                         if "message" in data and isinstance(data["message"], dict):
                             content = data["message"].get("content", "")
@@ -97,76 +142,177 @@ class OllamaClient(LLMClient):
         else:
             raise ValueError(f"The LLM provider is {self.cfg.provider}, but you called OllamaClient.")
 
+    def chat_stream(self, messages: List[dict], max_tokens: Optional[int] = None) -> Iterator[str]:
+        """Stream the answer from Ollama's NDJSON /api/chat endpoint."""
+        if self.cfg.provider != "ollama":
+            raise ValueError(f"The LLM provider is {self.cfg.provider}, but you called OllamaClient.")
+
+        payload = self._payload(messages, stream=True, max_tokens=max_tokens)
+        _log_debug("Ollama streaming payload:", payload)
+        with self._session.post(f"{self._base_url}/api/chat", json=payload, stream=True, timeout=self.cfg.ollama_timeout) as resp:
+            _log_debug("Ollama HTTP status:", resp.status_code)
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if line:
+                    content = self._parse_line(line)
+                    if content:
+                        yield content
+
+
+class AsyncOllamaClient(OllamaClient):
+    """OllamaClient with asyncio variants of chat/chat_stream.
+
+    Requests go through one httpx.AsyncClient whose pool is capped at
+    ollama_pool_size connections, so many concurrent coroutines are
+    multiplexed over a bounded set of keep-alive connections. The async
+    client is created on first use and belongs to that event loop.
+    """
+
+    def __init__(self, cfg: LLMConfig):
+        super().__init__(cfg)
+        self._aclient = None
+
+    def _async_client(self):
+        if self._aclient is None:
+            import httpx
+            self._aclient = httpx.AsyncClient(
+                base_url=self._base_url,
+                timeout=self.cfg.ollama_timeout,
+                limits=httpx.Limits(
+                    max_connections=self.cfg.ollama_pool_size,
+                    max_keepalive_connections=self.cfg.ollama_pool_size,
+                ),
+            )
+        return self._aclient
+
+    async def achat(self, messages: List[dict], max_tokens: Optional[int] = None) -> str:
+        pieces = [piece async for piece in self.achat_stream(messages, max_tokens=max_tokens)]
+        return "".join(pieces)
+
+    async def achat_stream(self, messages: List[dict], max_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        payload = self._payload(messages, stream=True, max_tokens=max_tokens)
+        async with self._async_client().stream("POST", "/api/chat", json=payload) as resp:
+            _log_debug("Ollama HTTP status:", resp.status_code)
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if line:
+                    content = self._parse_line(line)
+                    if content:
+                        yield content
+
+    async def aclose(self):
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+
 
 class VertexClient(LLMClient):
+    # Distinct system prompts are few (one per agent); bound the registry anyway
+    _MAX_MODELS = 32
+
     def __init__(self, cfg: LLMConfig):
         super().__init__(cfg)
         from vertexai import init
+        from vertexai.generative_models import GenerativeModel, Part, Content
         init(project=cfg.gcp_project_id, location=cfg.gcp_location)
-    
-    def chat(self, messages: List[dict]) -> str:
+        self._GenerativeModel, self._Part, self._Content = GenerativeModel, Part, Content
+        self._model_name = _normalize_vertex_model(cfg.vertex_model)
+        _log_debug("Vertex normalized model:", self._model_name)
+        # (model name, system instruction) -> (GenerativeModel, generate_content accepts system_instruction)
+        self._models: Dict[Tuple[str, Optional[str]], Tuple[object, bool]] = {}
+        self._models_lock = threading.Lock()
+
+    def _build_model(self, system_instruction: Optional[str]) -> Tuple[object, bool]:
+        GenerativeModel = self._GenerativeModel
+        model_name = self._model_name
+
+        # Create model; some SDK versions accept system_instruction in constructor
+        try:
+            model = GenerativeModel(model_name, system_instruction=system_instruction) if system_instruction else GenerativeModel(model_name)
+            _log_debug("Vertex model constructed with constructor system_instruction:", bool(system_instruction))
+        except TypeError:
+            _log_debug("Vertex constructor does not accept system_instruction; using plain constructor")
+            model = GenerativeModel(model_name)
+
+        # Feature-detect support for system_instruction in generate_content
+        try:
+            supports_sys_kw = "system_instruction" in inspect.signature(model.generate_content).parameters
+        except Exception:
+            supports_sys_kw = False
+        _log_debug("Vertex generate_content supports system_instruction:", supports_sys_kw)
+        return model, supports_sys_kw
+
+    def _get_model(self, system_instruction: Optional[str]) -> Tuple[object, bool]:
+        """Return the cached model for this system instruction, building it once."""
+        key = (self._model_name, system_instruction)
+        entry = self._models.get(key)
+        if entry is None:
+            with self._models_lock:
+                entry = self._models.get(key)
+                if entry is None:
+                    entry = self._build_model(system_instruction)
+                    if len(self._models) >= self._MAX_MODELS:
+                        self._models.pop(next(iter(self._models)))
+                    self._models[key] = entry
+        return entry
+
+    def warmup(self, system_instructions: Iterable[str] = ()) -> None:
+        """Build the models for known system prompts ahead of the first request."""
+        self._get_model(None)
+        for instruction in system_instructions:
+            self._get_model(instruction or None)
+
+    def _prepare(self, messages: List[dict], max_tokens: Optional[int]):
+        """Build the model, contents and generate_content kwargs for a conversation."""
+        Part, Content = self._Part, self._Content
+
+        # Collect system messages separately
+        system_chunks: List[str] = []
+        vertex_contents: List[Content] = []
+
+        for m in messages:
+            role = m.get("role", "user")
+            text = m.get("content", "")
+            if not text:
+                continue
+            if role == "system":
+                system_chunks.append(text)
+            else:
+                # Vertex roles: "user" and "model" (assistant -> model)
+                vertex_role = "user" if role == "user" else "model"
+                vertex_contents.append(Content(role=vertex_role, parts=[Part.from_text(text)]))
+
+        system_instruction = "\n\n".join(system_chunks) if system_chunks else None
+        _log_debug("Vertex system_instruction:", system_instruction)
+        _log_debug("Vertex contents count:", len(vertex_contents))
+
+        model, supports_sys_kw = self._get_model(system_instruction)
+
+        # Fallback: if system_instruction not supported, prepend as first user message
+        if system_instruction and not supports_sys_kw:
+            prepend = Content(role="user", parts=[Part.from_text(f"System instructions:\n{system_instruction}")])
+            vertex_contents.insert(0, prepend)
+            _log_debug("Prepended system instructions as first user content")
+
+        kwargs = {}
+        if system_instruction and supports_sys_kw:
+            kwargs["system_instruction"] = system_instruction
+        if max_tokens:
+            kwargs["generation_config"] = {"max_output_tokens": max_tokens}
+        return model, vertex_contents, kwargs
+
+    def chat(self, messages: List[dict], max_tokens: Optional[int] = None) -> str:
         _log_debug("Chat called with provider:", self.cfg.provider)
         _log_debug("Messages:", messages)
 
         if self.cfg.provider == "vertex":
             # Vertex-specific handling
-            from vertexai.generative_models import GenerativeModel, Part, Content
-
-            model_name = _normalize_vertex_model(self.cfg.vertex_model)
-            _log_debug("Vertex normalized model:", model_name)
-
-            # Collect system messages separately
-            system_chunks: List[str] = []
-            vertex_contents: List[Content] = []
-
-            for m in messages:
-                role = m.get("role", "user")
-                text = m.get("content", "")
-                if not text:
-                    continue
-                if role == "system":
-                    system_chunks.append(text)
-                else:
-                    # Vertex roles: "user" and "model" (assistant -> model)
-                    vertex_role = "user" if role == "user" else "model"
-                    vertex_contents.append(Content(role=vertex_role, parts=[Part.from_text(text)]))
-
-            system_instruction = "\n\n".join(system_chunks) if system_chunks else None
-            _log_debug("Vertex system_instruction:", system_instruction)
-            _log_debug("Vertex contents count:", len(vertex_contents))
-
-            # Create model; some SDK versions accept system_instruction in constructor
-            try:
-                model = GenerativeModel(model_name, system_instruction=system_instruction) if system_instruction else GenerativeModel(model_name)
-                _log_debug("Vertex model constructed with constructor system_instruction:", bool(system_instruction))
-            except TypeError:
-                _log_debug("Vertex constructor does not accept system_instruction; using plain constructor")
-                model = GenerativeModel(model_name)
-
-            # Feature-detect support for system_instruction in generate_content
-            try:
-                supports_sys_kw = "system_instruction" in inspect.signature(model.generate_content).parameters
-            except Exception:
-                supports_sys_kw = False
-            _log_debug("Vertex generate_content supports system_instruction:", supports_sys_kw)
-
-            # Fallback: if system_instruction not supported, prepend as first user message
-            if system_instruction and not supports_sys_kw:
-                prepend = Content(role="user", parts=[Part.from_text(f"System instructions:\n{system_instruction}")])
-                vertex_contents.insert(0, prepend)
-                _log_debug("Prepended system instructions as first user content")
+            model, vertex_contents, kwargs = self._prepare(messages, max_tokens)
 
             # Generate
             try:
-                if system_instruction and supports_sys_kw:
-                    resp = model.generate_content(vertex_contents, system_instruction=system_instruction)
-                    # debugger print
-                    print("response:", resp)
-                    _log_debug("Vertex generate_content called with system_instruction kwarg")
-                else:
-                    resp = model.generate_content(vertex_contents)
-                    print("response:", resp)
-                    _log_debug("Vertex generate_content called without system_instruction kwarg")
+                resp = model.generate_content(vertex_contents, **kwargs)
+                _log_debug("Vertex generate_content called with kwargs:", list(kwargs))
             except Exception as e:
                 _log_debug("Vertex generate_content exception:", repr(e))
                 raise
@@ -182,3 +328,18 @@ class VertexClient(LLMClient):
 
         else:
             raise ValueError(f"The LLM provider is {self.cfg.provider}, but you called VertexClient.")
+
+    def chat_stream(self, messages: List[dict], max_tokens: Optional[int] = None) -> Iterator[str]:
+        """Stream the answer with generate_content(stream=True)."""
+        if self.cfg.provider != "vertex":
+            raise ValueError(f"The LLM provider is {self.cfg.provider}, but you called VertexClient.")
+
+        model, vertex_contents, kwargs = self._prepare(messages, max_tokens)
+        for chunk in model.generate_content(vertex_contents, stream=True, **kwargs):
+            try:
+                text = chunk.text
+            except (ValueError, AttributeError):
+                # Chunks without text parts (e.g. safety or finish metadata)
+                continue
+            if text:
+                yield text
@@ -0,0 +1,120 @@
+from dataclasses import dataclass
+from typing import List
+
+from chromadb.utils import embedding_functions
+
+from agents.answer_cache import SemanticAnswerCache
+from agents.form_agent import FormAgent, SYSTEM_PROMPT as FORM_PROMPT
+from agents.intent_classifier import IntentClassifier, examples_from_prompt
+from agents.orchestrator import Orchestrator, default_matcher, SYSTEM_PROMPT as ORCHESTRATOR_PROMPT
+from agents.pipeline import ChatPipeline
+from agents.retrieval_agent import RetrievalAgent, SYSTEM_PROMPT as RETRIEVAL_PROMPT
+from rag.context import ContextAssembler, make_token_counter
+from rag.embedding_cache import EmbeddingCache
+from rag.rerank import Reranker
+from rag.vector_store import EMBEDDING_MODEL_ID, VectorStore
+from services import tracing
+from services.llm import LLMClient, LLMConfig, OllamaClient, VertexClient
+
+
+def llm_config(cfg: dict) -> LLMConfig:
+    llm = cfg["llm"]
+    return LLMConfig(
+        provider=llm["provider"],
+        ollama_model=llm["ollama_model"],
+        vertex_model=llm["vertex_model"],
+        gcp_project_id=llm.get("gcp_project_id"),
+        gcp_location=llm.get("gcp_location"),
+        ollama_base_url=llm["ollama_base_url"],
+        ollama_pool_size=llm["ollama_pool_size"],
+        ollama_keep_alive=llm["ollama_keep_alive"] or None,
+        ollama_timeout=llm["ollama_timeout"],
+    )
+
+
+def make_llm_client(conf: LLMConfig) -> LLMClient:
+    if conf.provider == "ollama":
+        llm = OllamaClient(conf)
+    elif conf.provider == "vertex":
+        llm = VertexClient(conf)
+    else:
+        return LLMClient(conf)
+    try:
+        llm.warmup([RETRIEVAL_PROMPT, ORCHESTRATOR_PROMPT, FORM_PROMPT])
+    except Exception as e:
+        # The first real request will retry; don't block startup on it
+        print(f"[WARNING] LLM warm-up failed: {e}")
+    return llm
+
+
+@dataclass(frozen=True)
+class Services:
+    """The services tied to the index, built together."""
+
+    vs: VectorStore
+    retrieval: RetrievalAgent
+    pipeline: ChatPipeline
+
+
+class ServiceRegistry:
+    """Process-wide owner of the expensive services for one config.
+
+    Holds a single LLM client (and its connection pool), embedding model,
+    embedding cache, answer cache and routing agents, shared by every
+    session and thread. Everything tied to the index lives in `current`
+    (a Services snapshot). Newly published index versions don't need a
+    rebuild: the VectorStore switches to them by itself.
+    """
+
+    def __init__(self, cfg: dict):
+        rag, app = cfg["rag"], cfg["app"]
+        self.cfg = cfg
+        tracing.configure(app["trace_sample_rate"], app["trace_path"])
+        self.llm = make_llm_client(llm_config(cfg))
+        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        self.embedding_cache = (
+            EmbeddingCache(rag["embedding_cache_dir"], EMBEDDING_MODEL_ID, rag["embedding_cache_size"])
+            if rag["embedding_cache_dir"] else None
+        )
+        self.answer_cache = SemanticAnswerCache(
+            threshold=rag["answer_cache_threshold"],
+            ttl_seconds=rag["answer_cache_ttl"],
+            max_entries=rag["answer_cache_size"],
+        )
+        self.count_tokens = make_token_counter(rag["llm_tokenizer"])
+        self.form = FormAgent(self.llm)
+        classifier = IntentClassifier(
+            self._embed,
+            examples_from_prompt(ORCHESTRATOR_PROMPT),
+            examples_path=app["intent_examples_path"],
+            min_margin=app["intent_min_margin"],
+        )
+        self.orch = Orchestrator(self.llm, classifier, default_matcher(app["routing_rules_path"]))
+        self._current = self._build()
+
+    @property
+    def current(self) -> Services:
+        return self._current
+
+    def _embed(self, texts: List[str]) -> List:
+        return self._current.vs.embed(texts)
+
+    def _build(self) -> Services:
+        rag = self.cfg["rag"]
+        vs = VectorStore(
+            rag["index_dir"],
+            cache_size=rag["embedding_cache_size"],
+            hybrid=rag["hybrid_search"],
+            embedding_function=self.embedding_function,
+            cache=self.embedding_cache,
+        )
+        retrieval = RetrievalAgent(
+            vs,
+            self.llm,
+            answer_cache=self.answer_cache,
+            reranker=Reranker(lambda_mult=rag["rerank_lambda"]),
+            n_candidates=rag["rerank_candidates"],
+            assembler=ContextAssembler(budget_tokens=rag["context_token_budget"], count_tokens=self.count_tokens),
+        )
+        pipeline = ChatPipeline(self.orch, retrieval, speculative=self.cfg["app"]["speculative_retrieval"])
+        return Services(vs=vs, retrieval=retrieval, pipeline=pipeline)
@@ -0,0 +1,172 @@
+"""Sampled request tracing.
+
+A trace covers one chat request. Its spans (route, embed, search,
+prompt-build, generate...) record their duration and a few attributes
+(token counts, sizes) and are exported one JSON object per line, in an
+OpenTelemetry-like shape (trace_id, span_id, parent_id, start/end in unix
+nanoseconds, attributes).
+
+Code opens spans with `span(name)` without knowing whether the request is
+traced: the current span lives in a context variable, and when tracing is
+off or the request was not sampled, trace() and span() return a shared
+no-op object, so the cost is one ContextVar lookup.
+"""
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    recording = False
+
+    def set(self, **attrs) -> "_NoopSpan":
+        return self
+
+    def elapsed_ms(self) -> float:
+        return 0.0
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    recording = True
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str], attrs: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attrs
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self._t0 = time.perf_counter_ns()
+        self._token: Optional[contextvars.Token] = None
+
+    def set(self, **attrs) -> "Span":
+        self.attributes.update(attrs)
+        return self
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter_ns() - self._t0) / 1e6, 3)
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """Finish and export the span (for spans not used as a context manager, e.g. in a generator)."""
+        duration_ns = time.perf_counter_ns() - self._t0
+        if error is not None:
+            self.status = "error"
+            self.attributes["error"] = f"{type(error).__name__}: {error}"
+        self.tracer.export({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.start_ns + duration_ns,
+            "duration_ms": round(duration_ns / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        })
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current.reset(self._token)
+        self.end(exc)
+        return False
+
+
+class JsonlExporter:
+    """Append finished spans to a JSON-lines file (thread-safe)."""
+
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def __call__(self, record: Dict) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    """Samples requests at `sample_rate` (0 = off, 1 = all) and sends their spans to `exporter`."""
+
+    def __init__(self, sample_rate: float = 0.0, exporter: Optional[Callable[[Dict], None]] = None):
+        self.sample_rate = sample_rate if exporter is not None else 0.0
+        self.exporter = exporter
+
+    def trace(self, name: str, **attrs):
+        """Root span of a request, or the no-op span if the request is not sampled."""
+        if self.sample_rate <= 0 or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return NOOP_SPAN
+        return Span(self, name, uuid.uuid4().hex, None, attrs)
+
+    def span(self, name: str, parent: Optional[Span] = None, **attrs):
+        """Child of `parent` (default: the current span); no-op outside a sampled trace."""
+        parent = parent or _current.get()
+        if parent is None or not parent.recording:
+            return NOOP_SPAN
+        return Span(parent.tracer, name, parent.trace_id, parent.span_id, attrs)
+
+    def export(self, record: Dict) -> None:
+        try:
+            self.exporter(record)
+        except Exception as e:
+            # Tracing must never break a request
+            print(f"[WARNING] Could not export span {record.get('name')}: {e}")
+
+
+_tracer = Tracer()
+
+
+def configure(sample_rate: float = 0.0, path: str = "", exporter: Optional[Callable[[Dict], None]] = None) -> Tracer:
+    """Install the process-wide tracer; spans go to `exporter` or, by default, the JSONL file at `path`."""
+    global _tracer
+    if exporter is None and sample_rate > 0 and path:
+        exporter = JsonlExporter(path)
+    _tracer = Tracer(sample_rate, exporter)
+    return _tracer
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def trace(name: str, **attrs):
+    return _tracer.trace(name, **attrs)
+
+
+def span(name: str, parent: Optional[Span] = None, **attrs):
+    return _tracer.span(name, parent, **attrs)
+
+
+def current_span():
+    """The active span, to parent spans opened later in another context (e.g. a stream)."""
+    return _current.get() or NOOP_SPAN
@@ -0,0 +1,125 @@
+import hashlib
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+from chromadb.utils import embedding_functions
+
+from scraping import find_urls
+
+
+class FakeSite:
+    """Tiny local web site: HTML pages with ETags, redirects and a robots.txt."""
+
+    def __init__(self):
+        self.pages = {}
+        self.redirects = {}
+        self.robots = (200, "User-agent: *\nDisallow:\n")
+        self.hits = {}
+        self.conditional_hits = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/"
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path
+                with site._lock:
+                    site.hits[path] = site.hits.get(path, 0) + 1
+                    if self.headers.get("If-None-Match"):
+                        site.conditional_hits[path] = site.conditional_hits.get(path, 0) + 1
+                if path == "/robots.txt":
+                    status, body = site.robots
+                    return self._send(status, body, "text/plain")
+                if path in site.redirects:
+                    self.send_response(301)
+                    self.send_header("Location", site.redirects[path])
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if path not in site.pages:
+                    return self._send(404, "not found", "text/plain")
+                body = site.pages[path]
+                etag = '"' + hashlib.md5(body.encode("utf-8")).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self._send(200, body, "text/html; charset=utf-8", {"ETag": etag})
+
+            def _send(self, status, body, content_type, headers=None):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def site(monkeypatch):
+    fake = FakeSite()
+    fake.start()
+    # The crawler only follows links on BASE_DOMAIN
+    monkeypatch.setattr(find_urls, "BASE_DOMAIN", f"127.0.0.1:{fake._server.server_address[1]}")
+    yield fake
+    fake.stop()
+
+
+class FakeEmbeddingFunction:
+    """Deterministic bag-of-words embeddings standing in for the MiniLM model."""
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            v = np.zeros(64, dtype=np.float32)
+            for word in re.findall(r"\w+", text.lower()):
+                v[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % 64] += 1
+            norm = np.linalg.norm(v)
+            vectors.append(v / norm if norm else v)
+        return vectors
+
+    # Lets Chroma persist the collection as if it used its default function
+    def name(self):
+        return "default"
+
+    @staticmethod
+    def build_from_config(config):
+        return FakeEmbeddingFunction()
+
+    def get_config(self):
+        return {}
+
+    def is_legacy(self):
+        return True
+
+
+@pytest.fixture
+def fake_embeddings(monkeypatch):
+    fake = FakeEmbeddingFunction()
+    monkeypatch.setattr(embedding_functions, "DefaultEmbeddingFunction", lambda: fake)
+    return fake
@@ -0,0 +1,56 @@
+import time
+
+from agents.answer_cache import SemanticAnswerCache
+
+A = [1.0, 0.0, 0.0]
+B = [0.0, 1.0, 0.0]
+NEAR_A = [0.99, 0.1, 0.0]
+
+
+def test_hit_above_threshold_and_miss_below():
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.store(A, {"answer": "a"}, "v1")
+    assert cache.lookup(NEAR_A, "v1") == {"answer": "a"}
+    assert cache.lookup(B, "v1") is None
+
+
+def test_expired_entry_is_a_miss_and_evicted(monkeypatch):
+    cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=10)
+    cache.store(A, {"answer": "a"}, "v1")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.lookup(A, "v1") is None
+    assert len(cache) == 0
+
+
+def test_other_index_version_is_a_miss():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store(A, {"answer": "a"}, "v1")
+    assert cache.lookup(A, "v2") is None
+    assert len(cache) == 0
+
+
+def test_stale_best_match_falls_back_to_next_valid_entry():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store(NEAR_A, {"answer": "fresh"}, "v2")
+    cache.store(A, {"answer": "stale"}, "v1")
+    assert cache.lookup(A, "v2") == {"answer": "fresh"}
+    assert len(cache) == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticAnswerCache(threshold=0.9, max_entries=2)
+    cache.store(A, {"answer": "a"})
+    cache.store(B, {"answer": "b"})
+    assert cache.lookup(A) == {"answer": "a"}  # B is now the oldest
+    cache.store([0.0, 0.0, 1.0], {"answer": "c"})
+    assert len(cache) == 2
+    assert cache.lookup(B) is None
+    assert cache.lookup(A) == {"answer": "a"}
+
+
+def test_size_zero_disables_the_cache():
+    cache = SemanticAnswerCache(max_entries=0)
+    cache.store(A, {"answer": "a"})
+    assert cache.lookup(A) is None
+    assert len(cache) == 0
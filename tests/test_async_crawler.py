@@ -0,0 +1,52 @@
+from scraping import pipeline
+from scraping.pipeline import crawl_and_save
+
+
+def crawl_kwargs(site, tmp_path):
+    return dict(
+        raw_dir=tmp_path / "raw",
+        parsed_dir=tmp_path / "txt",
+        base_url=site.url,
+        manifest_path=tmp_path / "manifest.json",
+        extract_workers=1,
+        use_sitemaps=False,
+        rate=1000,
+    )
+
+
+def test_failing_stage_does_not_abort_the_crawl(site, tmp_path, monkeypatch):
+    site.pages = {
+        "/": '<html><body><main><a href="/p1">p1</a><a href="/p2">p2</a></main></body></html>',
+        "/p1": "<html><body><main><p>Page un</p></main></body></html>",
+        "/p2": "<html><body><main><p>Page deux</p></main></body></html>",
+    }
+    save = pipeline.SaveRawHtml.__call__
+
+    async def failing_save(self, page):
+        if page.url.endswith("/p1"):
+            raise OSError("File name too long")
+        await save(self, page)
+
+    monkeypatch.setattr(pipeline.SaveRawHtml, "__call__", failing_save)
+    result = crawl_and_save(**crawl_kwargs(site, tmp_path))
+    assert len(result["pages"]) == 3
+    assert "Page deux" in (tmp_path / "txt" / "p2.txt").read_text(encoding="utf-8")
+
+
+def test_redirects_to_an_already_fetched_page_are_processed_once(site, tmp_path):
+    site.pages = {
+        "/": '<html><body><main><a href="/a">a</a><a href="/b">b</a><a href="/target">t</a></main></body></html>',
+        "/target": "<html><body><main><p>Cible</p></main></body></html>",
+    }
+    site.redirects = {"/a": "/target", "/b": "/target"}
+    result = crawl_and_save(**crawl_kwargs(site, tmp_path))
+    assert [url for url in result["pages"] if url.endswith("/target")] == [site.url + "target"]
+    assert len(result["raw_files"]) == 2
+
+
+def test_forbidden_robots_txt_disallows_the_whole_site(site, tmp_path):
+    site.pages = {"/": "<html><body><main><p>Accueil</p></main></body></html>"}
+    site.robots = (403, "forbidden")
+    result = crawl_and_save(**crawl_kwargs(site, tmp_path))
+    assert result["pages"] == []
+    assert "/" not in site.hits
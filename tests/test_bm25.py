@@ -0,0 +1,20 @@
+from rag.bm25 import BM25Index, tokenize
+
+
+def test_tokenize_folds_accents_and_elisions():
+    assert tokenize("L'École d’ingénieurs qu'elle préfère") == ["ecole", "ingenieurs", "prefere"]
+    assert tokenize("Promo 2025 : cycle A") == ["promo", "2025", "cycle"]
+
+
+def test_search_matches_across_accents_and_elisions(tmp_path):
+    index = BM25Index.build([
+        ("admissions", "Les candidatures à l'école d'ingénieurs ouvrent en janvier."),
+        ("campus", "Le campus est à la Défense."),
+    ])
+    assert index.search("ecole ingenieur candidatures")[0][0] == "admissions"
+    assert index.search("defense")[0][0] == "campus"
+    assert index.search("inconnu") == []
+
+    index.save(str(tmp_path / "bm25"))
+    reloaded = BM25Index.load(str(tmp_path / "bm25"))
+    assert reloaded.search("l'École") == index.search("ecole")
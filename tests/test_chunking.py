@@ -0,0 +1,46 @@
+from rag.chunking import chunk_text, count_tokens
+from rag.index_builder import iter_chunks
+
+DOC = "# Admissions\n" + "".join(
+    f"Le dossier de candidature numéro {i} doit être déposé avant la date limite.\n" for i in range(12)
+) + "# Frais de scolarité\nLes frais annuels sont publiés chaque année sur le site.\n"
+
+
+def test_offsets_point_into_the_original_text():
+    chunks = chunk_text(DOC, max_tokens=40, overlap_tokens=15)
+    assert len(chunks) > 2
+    for chunk in chunks:
+        assert DOC[chunk.start:chunk.end] == chunk.text
+        assert count_tokens(chunk.text) <= 40
+    assert [c.ordinal for c in chunks] == list(range(len(chunks)))
+    assert chunks[0].section == "Admissions"
+    assert chunks[-1].section == "Frais de scolarité"
+
+
+def test_consecutive_chunks_of_a_section_overlap():
+    chunks = [c for c in chunk_text(DOC, max_tokens=40, overlap_tokens=15) if c.section == "Admissions"]
+    assert len(chunks) > 1
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt.start < prev.end
+        assert nxt.end > prev.end
+
+
+def test_no_overlap_when_disabled():
+    chunks = chunk_text(DOC, max_tokens=40, overlap_tokens=0)
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt.start >= prev.end
+
+
+def test_chunk_ids_are_stable_across_builds():
+    docs = [("admissions.txt", DOC, {"source": "admissions.txt"})]
+    first = list(iter_chunks(docs, 40, 15))
+    second = list(iter_chunks(docs, 40, 15))
+    assert [c[0] for c in first] == [c[0] for c in second]
+    assert first[0][0] == "admissions.txt:0"
+    assert {c[2]["parent_id"] for c in first} == {"admissions.txt"}
+
+    # Editing the last section leaves the ids and texts of earlier chunks unchanged
+    edited = [("admissions.txt", DOC.replace("chaque année", "en septembre"), {"source": "admissions.txt"})]
+    third = list(iter_chunks(edited, 40, 15))
+    assert third[:-1] == first[:-1]
+    assert third[-1][0] == first[-1][0] and third[-1][1] != first[-1][1]
@@ -0,0 +1,60 @@
+import pytest
+
+from scraping import pipeline
+from scraping.pipeline import crawl_and_save
+
+
+class Interrupted(BaseException):
+    pass
+
+
+def make_pages(version):
+    links = "".join(f'<a href="/p{i}">p{i}</a>' for i in range(1, 6))
+    pages = {"/": f"<html><body><main><p>Accueil {version}</p>{links}</main></body></html>"}
+    for i in range(1, 6):
+        pages[f"/p{i}"] = f"<html><body><main><h1>Page {i}</h1><p>Contenu {version} de la page {i}</p></main></body></html>"
+    return pages
+
+
+def test_interrupted_crawl_rewrites_changed_texts_on_resume(site, tmp_path, monkeypatch):
+    kwargs = dict(
+        raw_dir=tmp_path / "raw",
+        parsed_dir=tmp_path / "txt",
+        base_url=site.url,
+        manifest_path=tmp_path / "manifest.json",
+        extract_workers=1,
+        state_dir=tmp_path / "state",
+        checkpoint_every=1,
+        concurrency=1,
+        use_sitemaps=False,
+        rate=1000,
+    )
+    site.pages = make_pages("v1")
+    crawl_and_save(**kwargs)
+    assert "v1" in (tmp_path / "txt" / "p3.txt").read_text(encoding="utf-8")
+
+    # Every page changes; the next crawl stops after three extractions
+    site.pages = make_pages("v2")
+    extract = pipeline.ExtractText.__call__
+    calls = []
+
+    async def interrupting_extract(self, page):
+        if len(calls) == 3:
+            raise Interrupted()
+        calls.append(page.url)
+        await extract(self, page)
+
+    monkeypatch.setattr(pipeline.ExtractText, "__call__", interrupting_extract)
+    with pytest.raises(Interrupted):
+        crawl_and_save(**kwargs)
+    monkeypatch.setattr(pipeline.ExtractText, "__call__", extract)
+
+    crawl_and_save(**kwargs)
+    for i in range(1, 6):
+        text = (tmp_path / "txt" / f"p{i}.txt").read_text(encoding="utf-8")
+        assert f"Contenu v2 de la page {i}" in text
+
+    # Everything written: the next run only revalidates
+    result = crawl_and_save(**kwargs)
+    assert result["text_files"] == []
+    assert result["unchanged"] == 6
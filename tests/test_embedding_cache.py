@@ -0,0 +1,47 @@
+import numpy as np
+
+from rag.embedding_cache import EmbeddingCache
+
+
+def vec(x):
+    return [float(x), 1.0, 0.0]
+
+
+def test_hits_ignore_whitespace_variants(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", capacity=4)
+    cache.put_many(["Frais  de\nscolarité"], [vec(1)])
+    assert np.allclose(cache.get_many(["Frais de scolarité"])[0], vec(1))
+    assert cache.get_many(["Autre texte"]) == [None]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", capacity=2)
+    cache.put_many(["a", "b"], [vec(1), vec(2)])
+    cache.get_many(["a"])  # b is now the oldest
+    cache.put_many(["c"], [vec(3)])
+    a, b, c = cache.get_many(["a", "b", "c"])
+    assert b is None
+    assert np.allclose(a, vec(1)) and np.allclose(c, vec(3))
+    assert len(cache) == 2
+
+
+def test_reopen_keeps_entries_and_lru_order(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", capacity=2)
+    cache.put_many(["a", "b"], [vec(1), vec(2)])
+    cache.get_many(["a"])
+    cache.flush()
+
+    reopened = EmbeddingCache(str(tmp_path), "model", capacity=2)
+    assert len(reopened) == 2
+    assert np.allclose(reopened.get_many(["b"])[0], vec(2))
+    reopened.put_many(["c"], [vec(3)])  # a is now the oldest
+    assert reopened.get_many(["a"]) == [None]
+
+
+def test_other_model_or_capacity_starts_empty(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model", capacity=2)
+    cache.put_many(["a"], [vec(1)])
+    cache.flush()
+    assert len(EmbeddingCache(str(tmp_path), "other-model", capacity=2)) == 0
+    assert len(EmbeddingCache(str(tmp_path), "model", capacity=3)) == 0
@@ -0,0 +1,46 @@
+from rag import index_builder, index_versions
+from rag.vector_store import VectorStore
+
+
+def build(docs_dir, index_dir):
+    return index_builder.main(str(docs_dir), str(index_dir), chunk_tokens=40, chunk_overlap=10, workers=1)
+
+
+def indexed_sources(index_dir, embedding_function):
+    vs = VectorStore(str(index_dir), embedding_function=embedding_function, watch=False)
+    try:
+        return vs.source_hashes()
+    finally:
+        vs.close()
+
+
+def test_incremental_build_reembeds_only_changed_sources(tmp_path, fake_embeddings):
+    docs, index = tmp_path / "docs", tmp_path / "index"
+    docs.mkdir()
+    (docs / "admissions.txt").write_text("Les candidatures ouvrent en janvier.", encoding="utf-8")
+    (docs / "campus.txt").write_text("Le campus est à la Défense.", encoding="utf-8")
+    (docs / "stages.md").write_text("# Stages\nUn stage de fin d'études de six mois.", encoding="utf-8")
+    assert build(docs, index).counts["documents"] == 3
+    first = indexed_sources(index, fake_embeddings)
+    assert set(first) == {"admissions.txt", "campus.txt", "stages.md"}
+
+    (docs / "campus.txt").write_text("Le campus est à Nantes.", encoding="utf-8")
+    (docs / "stages.md").unlink()
+    stats = build(docs, index)
+    assert (stats.counts["documents"], stats.counts["chunks"]) == (1, 1)
+
+    second = indexed_sources(index, fake_embeddings)
+    assert set(second) == {"admissions.txt", "campus.txt"}
+    assert second["admissions.txt"] == first["admissions.txt"]
+    assert second["campus.txt"] != first["campus.txt"]
+
+
+def test_unchanged_docs_do_not_publish_a_new_version(tmp_path, fake_embeddings):
+    docs, index = tmp_path / "docs", tmp_path / "index"
+    docs.mkdir()
+    (docs / "admissions.txt").write_text("Les candidatures ouvrent en janvier.", encoding="utf-8")
+    build(docs, index)
+    live = index_versions.current_version(str(index))
+    assert build(docs, index).counts["documents"] == 0
+    assert index_versions.current_version(str(index)) == live
+    assert index_versions.list_versions(str(index)) == [live]
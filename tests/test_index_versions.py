@@ -0,0 +1,49 @@
+from rag import index_versions
+
+
+def test_publish_switches_the_live_version(tmp_path):
+    index_dir = str(tmp_path)
+    version, path = index_versions.create_version(index_dir)
+    assert index_versions.resolve(index_dir) == (index_dir, "")
+    index_versions.publish(index_dir, version)
+    assert index_versions.current_version(index_dir) == version
+    assert index_versions.resolve(index_dir) == (path, version)
+
+
+def test_new_version_copies_the_live_one(tmp_path):
+    index_dir = str(tmp_path)
+    v1, path1 = index_versions.create_version(index_dir)
+    (tmp_path / "versions" / v1 / "data.bin").write_text("v1")
+    index_versions.publish(index_dir, v1)
+    v2, path2 = index_versions.create_version(index_dir)
+    assert (tmp_path / "versions" / v2 / "data.bin").read_text() == "v1"
+    v3, path3 = index_versions.create_version(index_dir, copy_current=False)
+    assert not (tmp_path / "versions" / v3 / "data.bin").exists()
+
+
+def test_prune_keeps_the_live_and_two_previous_versions(tmp_path):
+    index_dir = str(tmp_path)
+    versions = sorted(index_versions.create_version(index_dir)[0] for _ in range(5))
+    assert index_versions.list_versions(index_dir) == versions
+    index_versions.publish(index_dir, versions[1])
+    removed = index_versions.prune(index_dir, keep=2)
+    assert removed == [versions[0], versions[2]]
+    assert index_versions.list_versions(index_dir) == [versions[1], versions[3], versions[4]]
+
+
+def test_legacy_index_is_read_in_place_with_its_build_id(tmp_path):
+    (tmp_path / "chroma.sqlite3").write_text("legacy")
+    (tmp_path / index_versions.LEGACY_BUILD_ID_FILE).write_text("build-42\n")
+    assert index_versions.resolve(str(tmp_path)) == (str(tmp_path), "build-42")
+
+    # The first versioned build starts from a copy of the legacy index
+    version, path = index_versions.create_version(str(tmp_path))
+    assert (tmp_path / "versions" / version / "chroma.sqlite3").read_text() == "legacy"
+    index_versions.publish(str(tmp_path), version)
+    assert index_versions.resolve(str(tmp_path)) == (path, version)
+
+
+def test_dangling_pointer_falls_back_to_the_legacy_index(tmp_path):
+    (tmp_path / index_versions.LEGACY_BUILD_ID_FILE).write_text("build-42")
+    index_versions.publish(str(tmp_path), "missing")
+    assert index_versions.resolve(str(tmp_path)) == (str(tmp_path), "build-42")
@@ -0,0 +1,47 @@
+import pytest
+
+from agents.orchestrator import Orchestrator
+
+
+class FailingLLM:
+    def chat(self, messages, **kwargs):
+        raise RuntimeError("LLM unavailable")
+
+
+@pytest.fixture
+def orchestrator():
+    return Orchestrator(FailingLLM())
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Appelez-moi ou envoyez-moi un email",
+        "Je voudrais un rendez-vous ou un appel",
+        "Pouvez-vous m'appeler ?",
+        "J'aimerais parler à un conseiller ?",
+    ],
+)
+def test_form_requests_are_not_strict_routed_to_retrieval(orchestrator, text):
+    assert orchestrator._keyword_route(text) is None
+    assert orchestrator.route(text)["intent"] == "form"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Quels sont les frais de scolarité ?",
+        "Comment candidater au concours Avenir ?",
+        "When does the semester start?",
+    ],
+)
+def test_questions_are_strict_routed_to_retrieval(orchestrator, text):
+    assert orchestrator._keyword_route(text) == "retrieval"
+
+
+def test_weak_form_keyword_in_a_question_falls_back_to_retrieval(orchestrator):
+    assert orchestrator.route("Comment contacter le service des admissions ?")["intent"] == "retrieval"
+
+
+def test_strong_form_keyword_wins(orchestrator):
+    assert orchestrator._keyword_route("How can you contact me?") == "form"
@@ -0,0 +1,37 @@
+from scraping.manifest import ScrapeManifest
+from scraping.pipeline import crawl_and_save
+
+
+def test_redirected_page_is_revalidated_under_its_requested_url(tmp_path):
+    manifest = ScrapeManifest(tmp_path / "manifest.json", tmp_path)
+    (tmp_path / "page.html").write_text("<html>v1</html>", encoding="utf-8")
+    manifest.record("https://www.esilv.fr/page", {"etag": '"v1"'}, "<html>v1</html>", requested_url="http://esilv.fr/page/")
+    manifest.mark_clean(["https://www.esilv.fr/page"])
+    manifest.save()
+
+    reopened = ScrapeManifest(tmp_path / "manifest.json", tmp_path)
+    assert reopened.conditional_headers("http://esilv.fr/page/") == {"If-None-Match": '"v1"'}
+    assert reopened.cached_html("http://esilv.fr/page/") == "<html>v1</html>"
+
+
+def test_crawl_sends_conditional_requests_through_redirects(site, tmp_path):
+    site.pages = {
+        "/": '<html><body><main><a href="/old">ancienne adresse</a></main></body></html>',
+        "/new": "<html><body><main><p>Nouvelle page</p></main></body></html>",
+    }
+    site.redirects = {"/old": "/new"}
+    kwargs = dict(
+        raw_dir=tmp_path / "raw",
+        parsed_dir=tmp_path / "txt",
+        base_url=site.url,
+        manifest_path=tmp_path / "manifest.json",
+        extract_workers=1,
+        use_sitemaps=False,
+        rate=1000,
+    )
+    crawl_and_save(**kwargs)
+    result = crawl_and_save(**kwargs)
+    assert site.conditional_hits.get("/old") == 1
+    assert site.conditional_hits.get("/new") == 1
+    assert result["text_files"] == []
+    assert result["unchanged"] == 2
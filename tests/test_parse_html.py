@@ -0,0 +1,29 @@
+from scraping.parse_html import extract_main_text
+
+ARTICLE = "<h1>Admissions</h1><p>Les candidatures sont ouvertes en janvier.</p>"
+
+
+def test_body_class_mentioning_cookies_keeps_the_page():
+    html = f'<html><body class="home page cookies-not-set">{ARTICLE}</body></html>'
+    assert extract_main_text(html) == "# Admissions\nLes candidatures sont ouvertes en janvier."
+
+
+def test_offcanvas_page_wrapper_keeps_the_page():
+    html = (
+        '<html><body><div class="site-wrapper offcanvas-push">'
+        f"<main>{ARTICLE}</main></div></body></html>"
+    )
+    assert extract_main_text(html) == "# Admissions\nLes candidatures sont ouvertes en janvier."
+
+
+def test_boilerplate_blocks_are_dropped():
+    html = (
+        "<html><body>"
+        '<div id="tarteaucitronRoot">Ce site utilise des cookies.</div>'
+        '<ul class="main-menu"><li>Programmes</li></ul>'
+        f"<main>{ARTICLE}"
+        '<div class="share-buttons">Partager</div>'
+        '<div class="cookie-banner">Accepter</div>'
+        "</main></body></html>"
+    )
+    assert extract_main_text(html) == "# Admissions\nLes candidatures sont ouvertes en janvier."